@@ -17,6 +17,8 @@ def create_app(config_name='default'):
     # Load configuration
     if config_name == 'development':
         app.config.from_object('config.development.Config')
+    elif config_name == 'testing':
+        app.config.from_object('config.testing.TestingConfig')
     else:
         app.config.from_object('config.default.Config')
     
@@ -39,6 +41,11 @@ def create_app(config_name='default'):
     from app.routes.config import config_bp
     from app.routes.alerts import alerts_bp
     from app.routes.streams import streams_bp
+    from app.routes.analytics import analytics_bp
+    from app.routes.map import map_bp
+    from app.routes.tiles import tiles_bp
+    from app.routes.geofences import geofences_bp
+    from app.routes.subscribers import subscribers_bp
     
     app.register_blueprint(dashboard_bp)  # dashboard has '/' route for root
     app.register_blueprint(detections_bp, url_prefix='/api')
@@ -47,12 +54,48 @@ def create_app(config_name='default'):
     app.register_blueprint(alerts_bp, url_prefix='/api')
     app.register_blueprint(streams_bp, url_prefix='/api')
     app.register_blueprint(config_bp, url_prefix='/api')
+    app.register_blueprint(subscribers_bp, url_prefix='/api')
     app.register_blueprint(pages_bp)
+    app.register_blueprint(analytics_bp)  # includes /api/analytics prefix
+    app.register_blueprint(map_bp)  # includes /api/map prefix
+    app.register_blueprint(tiles_bp)  # includes /tiles prefix
+    app.register_blueprint(geofences_bp)  # includes /api/geofences prefix
 
     #creating all database tables
     with app.app_context():
         db.create_all()
 
+        # Detection counters and rollups are kept up to date by flush hooks
+        # in stats_service and rollup_service
+        from app.services import stats_service, rollup_service
+        try:
+            stats_service.ensure_stats()
+            rollup_service.ensure_rollups()
+        except Exception as e:
+            app.logger.warning(f'Could not seed detection stats: {e}')
+
+    # Bind the detection write-behind queue (writer thread starts on first use)
+    from app.services.write_queue import write_queue
+    write_queue.init_app(app)
+
+    # Bind the notification outbox dispatcher (workers start when a notification is queued)
+    from app.services.outbox_service import notification_dispatcher
+    notification_dispatcher.init_app(app)
+
+    # Response cache for polled dashboard endpoints (invalidated on commit)
+    from app.services.cache_service import response_cache
+    response_cache.init_app(app)
+
+    # Point indexes, geofences and cooldowns are cached per process; reload them from this app's database
+    from app.services.map_services import map_service
+    from app.services.geofence_service import geofence_service
+    from app.services.notification_services import invalidate_subscriber_index
+    from app.services.cooldown_service import cooldown_engine
+    map_service.invalidate_indexes()
+    geofence_service.invalidate()
+    invalidate_subscriber_index()
+    cooldown_engine.invalidate()
+
     # Register socket.io events
     register_socket_events(socketio)
 
@@ -83,8 +83,19 @@ def register_commands(app):
                         candidate = img_path
                     image_paths.append(candidate)
 
+            from app.services.stats_service import rebuild_stats
+            from app.services.rollup_service import rebuild_rollups
+            from app.services.tile_service import reset_tiles
+            from app.models import AlertCooldown, OutboxMessage
+
+            # Notifications still owed for the deleted detections go with them
+            db.session.query(AlertCooldown).delete()
+            db.session.query(OutboxMessage).delete()
             deleted = db.session.query(Detection).delete()
-            db.session.commit()
+            # Bulk deletes bypass the counter hooks; rebuilding also commits the delete
+            rebuild_stats()
+            rebuild_rollups()
+            reset_tiles()
             click.echo(f'Deleted {deleted} detection rows.')
 
             removed_count = 0
@@ -97,3 +108,91 @@ def register_commands(app):
                     except Exception as e:
                         click.echo(f'Failed to remove {p}: {e}')
                 click.echo(f'Removed {removed_count} image files (if present).')
+
+    @app.cli.command('watch-folder')
+    @click.argument('folder', type=click.Path(file_okay=False))
+    @click.option('--camera-id', default=None, help='Camera id for all images (default: first sub-folder name)')
+    @click.option('--batch-size', default=None, type=int, help='Images per inference batch')
+    @click.option('--batch-timeout', default=None, type=float, help='Seconds to wait for a batch to fill')
+    @click.option('--burst-gap', default=None, type=float, help='Max seconds between frames of one burst')
+    @click.option('--voting', type=click.Choice(['max', 'mean']), default=None,
+                  help='How confidences are combined across a burst')
+    @click.option('--include-existing', is_flag=True, help='Also ingest images already in the folder')
+    @click.option('--poll', 'force_polling', is_flag=True, help='Poll the folder instead of using inotify')
+    @click.option('--real', is_flag=True, help='Use the YOLOv8 detector instead of the mock detector')
+    def watch_folder_cmd(folder, camera_id, batch_size, batch_timeout, burst_gap, voting,
+                         include_existing, force_polling, real):
+        """Watch FOLDER for camera-trap JPEGs and ingest them in batches."""
+        import time
+        from app.services.ingest_service import FolderWatcher
+
+        kwargs = {}
+        if batch_size is not None:
+            kwargs['batch_size'] = batch_size
+        if batch_timeout is not None:
+            kwargs['batch_timeout'] = batch_timeout
+        if burst_gap is not None:
+            kwargs['burst_gap'] = burst_gap
+        if voting is not None:
+            kwargs['voting'] = voting
+
+        watcher = FolderWatcher(
+            app, folder, camera_id=camera_id, use_mock=not real,
+            include_existing=include_existing, force_polling=force_polling, **kwargs
+        )
+        watcher.start()
+        click.echo(f'Watching {watcher.watch_dir} ({watcher.mode}). Press Ctrl+C to stop.')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.stop()
+            click.echo(f"Ingested {watcher.stats['files_ingested']} files in {watcher.stats['batches']} batches "
+                       f"({watcher.stats['bursts']} bursts, {watcher.stats['detections']} detections).")
+
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_cmd():
+        """Recompute the detection_stats counters from the detections table."""
+        from app.services.stats_service import rebuild_stats
+
+        with app.app_context():
+            counters = rebuild_stats()
+        click.echo(f"Rebuilt detection stats: {counters['total']} detections, "
+                   f"{counters['verified']} verified, {counters['false_positives']} false positives.")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--since', default=None, help='Only rebuild from this date on (YYYY-MM-DD)')
+    def rebuild_rollups_cmd(since):
+        """Recompute the hourly/daily detection rollups from the detections table."""
+        from app.services.rollup_service import rebuild_rollups
+
+        start = datetime.fromisoformat(since) if since else None
+        with app.app_context():
+            scanned = rebuild_rollups(since=start)
+        click.echo(f'Rebuilt detection rollups from {scanned} detections'
+                   + (f' since {start.date()}.' if start else '.'))
+
+    @app.cli.command('build-heat-tiles')
+    @click.option('--full', is_flag=True, help='Discard existing tiles and render everything')
+    def build_heat_tiles_cmd(full):
+        """Render the heatmap tiles touched by detections changed since the last build."""
+        from app.services.tile_service import build_tiles
+
+        with app.app_context():
+            result = build_tiles(full=full)
+        click.echo(f"Rendered {result['rendered']} heatmap tiles ({result['removed']} now empty) "
+                   f"from {result['detections']} changed detections.")
+
+    @app.cli.command('send-notifications')
+    @click.option('--timeout', default=300.0, show_default=True, help='Seconds to wait for the outbox to drain')
+    def send_notifications_cmd(timeout):
+        """Send every due notification in the outbox and wait for the workers to finish."""
+        from app.services.outbox_service import notification_dispatcher
+
+        drained = notification_dispatcher.flush(timeout=timeout)
+        metrics = notification_dispatcher.metrics()
+        notification_dispatcher.shutdown()
+        click.echo(f"Sent {metrics['sent']} notifications ({metrics['retried']} to retry, "
+                   f"{metrics['failed']} failed)" + ('.' if drained else '; timed out before the outbox drained.'))
@@ -3,8 +3,16 @@ from app import db
 from datetime import datetime
 from .detection import Detection
 from .alert import Alert
+from .detection_stats import DetectionStat
+from .detection_rollup import DetectionRollupHourly, DetectionRollupDaily
+from .geofence import Geofence
+from .notification_outbox import OutboxMessage
+from .alert_cooldown import AlertCooldown
+from .registry_version import RegistryVersion
 
-__all__ = ['Detection', 'Camera', 'Subscriber', 'Alert']
+__all__ = ['Detection', 'Camera', 'Subscriber', 'Alert', 'DetectionStat',
+           'DetectionRollupHourly', 'DetectionRollupDaily', 'Geofence', 'OutboxMessage',
+           'AlertCooldown', 'RegistryVersion']
 
 class Camera(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -16,10 +24,44 @@ class Camera(db.Model):
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'camera_id': self.camera_id,
+            'name': self.name,
+            'location': {
+                'lat': self.latitude,
+                'lng': self.longitude
+            },
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'is_active': self.is_active,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None
+        }
+
 class Subscriber(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100))
     phone = db.Column(db.String(20))
     email = db.Column(db.String(100))
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Home location; subscribers without one receive every alert
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    alert_radius_km = db.Column(db.Float, nullable=True)  # NULL = SUBSCRIBER_DEFAULT_RADIUS_KM
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'phone': self.phone,
+            'email': self.email,
+            'location': {
+                'lat': self.latitude,
+                'lng': self.longitude
+            } if self.latitude is not None and self.longitude is not None else None,
+            'alert_radius_km': self.alert_radius_km,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
\ No newline at end of file
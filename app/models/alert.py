@@ -13,6 +13,17 @@ class Alert(db.Model):
     sms_sent = db.Column(db.Boolean, default=False)
     email_sent = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Per-recipient delivery outcome, written by outbox_service (migrations 0015 and 0016)
+    subscriber_id = db.Column(db.Integer, nullable=True)
+    channel = db.Column(db.String(10), nullable=True)  # 'sms' or 'email'
+    status = db.Column(db.String(20), nullable=True)  # 'sent' or 'failed'
+    error = db.Column(db.Text, nullable=True)
+    provider = db.Column(db.String(20), nullable=True)  # 'africastalking', 'twilio' or 'smtp'
+    provider_status = db.Column(db.String(50), nullable=True)  # per-recipient status reported by the provider
+    provider_message_id = db.Column(db.String(100), nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    idempotency_key = db.Column(db.String(150), unique=True, index=True, nullable=True)  # '<outbox key>:subscriber:<id>'
+    sent_at = db.Column(db.DateTime, nullable=True)
     
     def to_dict(self):
         return {
@@ -23,5 +34,14 @@ class Alert(db.Model):
             'recipients': self.recipients,
             'sms_sent': self.sms_sent,
             'email_sent': self.email_sent,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None
+            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'subscriber_id': self.subscriber_id,
+            'channel': self.channel,
+            'status': self.status,
+            'error': self.error,
+            'provider': self.provider,
+            'provider_status': self.provider_status,
+            'provider_message_id': self.provider_message_id,
+            'attempts': self.attempts,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
         }
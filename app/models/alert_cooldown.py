@@ -0,0 +1,21 @@
+from app import db
+
+
+class AlertCooldown(db.Model):
+    """Open cooldown window of a (camera, species), kept by cooldown_service so it survives restarts"""
+    __tablename__ = 'alert_cooldowns'
+
+    camera_id = db.Column(db.String(50), primary_key=True)
+    species = db.Column(db.String(50), primary_key=True)
+    window_start = db.Column(db.DateTime, nullable=False)  # when the last alert went out
+    window_end = db.Column(db.DateTime, nullable=False)  # detections before this are folded into the digest
+    digest_id = db.Column(db.Integer, db.ForeignKey('notification_outbox.id'), nullable=True)
+
+    def to_dict(self):
+        return {
+            'camera_id': self.camera_id,
+            'species': self.species,
+            'window_start': self.window_start.isoformat(),
+            'window_end': self.window_end.isoformat(),
+            'digest_id': self.digest_id
+        }
@@ -1,6 +1,27 @@
+import math
 from app import db
 from datetime import datetime
 
+# Spatial grid: GEO_CELL_DEG-degree cells numbered row by row from (-90, -180),
+# so the cells of one latitude row form a contiguous range of ids
+GEO_CELL_DEG = 0.01  # ~1.1 km
+GEO_CELL_COLUMNS = int(round(360 / GEO_CELL_DEG)) + 1
+
+
+def geo_cell(latitude, longitude):
+    """Grid cell id of a point (keep in sync with migration 0012's SQL)"""
+    if latitude is None or longitude is None:
+        return None
+    row = math.floor((latitude + 90.0) / GEO_CELL_DEG)
+    column = math.floor((longitude + 180.0) / GEO_CELL_DEG)
+    return row * GEO_CELL_COLUMNS + column
+
+
+def _geo_cell_default(context):
+    params = context.get_current_parameters()
+    return geo_cell(params.get('latitude'), params.get('longitude'))
+
+
 class Detection(db.Model):
     __tablename__ = 'detections'
     
@@ -14,6 +35,25 @@ class Detection(db.Model):
     image_path = db.Column(db.String(200))
     is_verified = db.Column(db.Boolean, default=False)
     is_false_positive = db.Column(db.Boolean, default=False)
+    frame_count = db.Column(db.Integer, default=1)  # frames in the camera-trap burst
+    track_id = db.Column(db.String(64), nullable=True)  # stream track this detection reports
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # map delta watermark
+    # Computed from latitude/longitude on every INSERT, bulk ones included
+    # (locations are not edited afterwards)
+    geo_cell = db.Column(db.Integer, default=_geo_cell_default)
+
+    # Match the list endpoints: filter on false-positive/species/camera, newest first.
+    # Keep in sync with migrations 0006, 0007, 0010 and 0012
+    __table_args__ = (
+        db.Index('ix_detections_timestamp_id', 'timestamp', 'id'),
+        db.Index('ix_detections_active_timestamp', 'timestamp',
+                 sqlite_where=is_false_positive == db.false(),
+                 postgresql_where=is_false_positive == db.false()),
+        db.Index('ix_detections_species_fp_timestamp', 'species', 'is_false_positive', 'timestamp'),
+        db.Index('ix_detections_camera_timestamp', 'camera_id', 'timestamp'),
+        db.Index('ix_detections_updated_at', 'updated_at'),
+        db.Index('ix_detections_geo_cell', 'geo_cell', 'latitude', 'longitude'),
+    )
     
     def to_dict(self):
         return {
@@ -29,6 +69,9 @@ class Detection(db.Model):
             'latitude': self.latitude,
             'longitude': self.longitude,
             'is_verified': self.is_verified,
+            'frame_count': self.frame_count,
+            'track_id': self.track_id,
             'timestamp': self.timestamp.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'image_path': self.image_path
         }
\ No newline at end of file
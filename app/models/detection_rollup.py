@@ -0,0 +1,37 @@
+from app import db
+
+
+class _DetectionRollup(db.Model):
+    """Detection counts per time bucket, species and camera (false positives excluded)"""
+    __abstract__ = True
+
+    bucket = db.Column(db.DateTime, primary_key=True)  # start of the hour/day (UTC)
+    species = db.Column(db.String(50), primary_key=True)
+    camera_id = db.Column(db.String(50), primary_key=True, default='')  # '' when the camera is unknown
+    count = db.Column(db.Integer, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def to_dict(self):
+        return {
+            'bucket': self.bucket.isoformat(),
+            'species': self.species,
+            'camera_id': self.camera_id or None,
+            'count': self.count,
+            'avg_confidence': self.confidence_sum / self.count if self.count else None
+        }
+
+
+class DetectionRollupHourly(_DetectionRollup):
+    __tablename__ = 'detection_rollups_hourly'
+    __table_args__ = (
+        db.Index('ix_detection_rollups_hourly_species_bucket', 'species', 'bucket'),
+        db.Index('ix_detection_rollups_hourly_camera_bucket', 'camera_id', 'bucket'),
+    )
+
+
+class DetectionRollupDaily(_DetectionRollup):
+    __tablename__ = 'detection_rollups_daily'
+    __table_args__ = (
+        db.Index('ix_detection_rollups_daily_species_bucket', 'species', 'bucket'),
+        db.Index('ix_detection_rollups_daily_camera_bucket', 'camera_id', 'bucket'),
+    )
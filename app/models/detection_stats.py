@@ -0,0 +1,15 @@
+from app import db
+
+
+class DetectionStat(db.Model):
+    """Running detection counters, kept in step with the detections table by stats_service"""
+    __tablename__ = 'detection_stats'
+
+    key = db.Column(db.String(120), primary_key=True)  # e.g. 'total', 'verified', 'species:elephant'
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'key': self.key,
+            'value': self.value
+        }
@@ -0,0 +1,49 @@
+import json
+from app import db
+from datetime import datetime
+
+
+class Geofence(db.Model):
+    """Polygon (village, farm, corridor, ...) that detections are checked against by geofence_service"""
+    __tablename__ = 'geofences'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    zone_type = db.Column(db.String(30), default='village')  # 'village', 'farm', 'corridor', ...
+    coordinates = db.Column(db.Text, nullable=False)  # JSON list of [lat, lng] vertices
+    species = db.Column(db.String(200), nullable=True)  # comma-separated species that breach; NULL = all
+    # Bounding box of the vertices, set by set_vertices
+    min_lat = db.Column(db.Float, nullable=False)
+    max_lat = db.Column(db.Float, nullable=False)
+    min_lng = db.Column(db.Float, nullable=False)
+    max_lng = db.Column(db.Float, nullable=False)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @property
+    def vertices(self):
+        return json.loads(self.coordinates)
+
+    def set_vertices(self, vertices):
+        """Store [lat, lng] vertices and their bounding box"""
+        vertices = [[float(lat), float(lng)] for lat, lng in vertices]
+        self.coordinates = json.dumps(vertices)
+        self.min_lat = min(lat for lat, _ in vertices)
+        self.max_lat = max(lat for lat, _ in vertices)
+        self.min_lng = min(lng for _, lng in vertices)
+        self.max_lng = max(lng for _, lng in vertices)
+
+    @property
+    def species_list(self):
+        return [s.strip() for s in self.species.split(',') if s.strip()] if self.species else []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'zone_type': self.zone_type,
+            'coordinates': self.vertices,
+            'species': self.species_list,
+            'is_active': self.is_active,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
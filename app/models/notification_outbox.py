@@ -0,0 +1,45 @@
+from app import db
+from datetime import datetime
+
+
+class OutboxMessage(db.Model):
+    """Notification owed for a detection, written in the detection's transaction and sent by outbox_service"""
+    __tablename__ = 'notification_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    detection_id = db.Column(db.Integer, db.ForeignKey('detections.id'), nullable=False)
+    idempotency_key = db.Column(db.String(100), unique=True, nullable=False)  # 'detection:<id>' or 'digest:...'
+    kind = db.Column(db.String(20), nullable=False, default='detection')  # 'detection' or 'digest'
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher is sent first (priority_service)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, processing, sent, failed, cancelled
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)  # lease held by the worker sending it
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    # Digests: detections folded in during a cooldown; detection_id is the latest of them
+    digest_count = db.Column(db.Integer, nullable=True)
+    digest_since = db.Column(db.DateTime, nullable=True)
+
+    # Keep in sync with migrations 0015, 0017 and 0018
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_priority', 'status', 'priority', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'detection_id': self.detection_id,
+            'idempotency_key': self.idempotency_key,
+            'kind': self.kind,
+            'priority': self.priority,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None,
+            'digest_count': self.digest_count,
+            'digest_since': self.digest_since.isoformat() if self.digest_since else None
+        }
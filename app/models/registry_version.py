@@ -0,0 +1,15 @@
+from app import db
+
+
+class RegistryVersion(db.Model):
+    """Version stamp of a cached registry, bumped in every transaction that changes it"""
+    __tablename__ = 'registry_versions'
+
+    name = db.Column(db.String(50), primary_key=True)  # e.g. 'subscribers'
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version
+        }
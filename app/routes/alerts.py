@@ -1,13 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
 from app import db, socketio
 from app.models import Detection
-from app.services.notification_services import send_notifications
+from app.services import outbox_service
+from app.services.geofence_service import geofence_service
+from app.services.detection_services import detection_service
+from app.services.alert_batch_service import BatchError, decode_batch, validate_batch
+from app.services.cooldown_service import ALERT, COOLDOWN, LATE
 import random
 from datetime import datetime
 
 
 alerts_bp = Blueprint('alerts', __name__)
 
+# /alerts/batch item status by cooldown outcome
+BATCH_STATUS = {ALERT: 'created', COOLDOWN: 'cooldown', LATE: 'late'}
+
 
 @alerts_bp.route('/alert', methods=['POST'])
 def receive_alert():
@@ -25,7 +32,13 @@ def receive_alert():
         )
 
         db.session.add(detection)
+        db.session.flush()
+
+        # Notifications are sent by the outbox workers once this commits;
+        # inside the camera's cooldown the detection goes into a digest instead
+        outbox = outbox_service.enqueue([detection])
         db.session.commit()
+        in_cooldown = outbox[0].kind == 'digest'
 
         # Emit via socketio so UI updates immediately
         try:
@@ -33,14 +46,14 @@ def receive_alert():
         except Exception:
             current_app.logger.exception('Failed to emit new_detection')
 
-        # Send notifications (SMS / email) and return count
-        notifications_sent = send_notifications(detection)
+        breaches = geofence_service.check_detections([detection], socketio)
 
         return jsonify({
-            'status': 'success',
-            'message': 'Alert processed',
+            'status': 'cooldown' if in_cooldown else 'success',
+            'message': 'Alert added to the cooldown digest' if in_cooldown else 'Alert processed',
             'detection_id': detection.id,
-            'notifications_sent': notifications_sent
+            'notification': outbox[0].to_dict(),
+            'geofence_breaches': [breach['geofence'] for breach in breaches]
         }), 201
 
     except Exception as e:
@@ -48,9 +61,43 @@ def receive_alert():
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
 
+@alerts_bp.route('/alerts/batch', methods=['POST'])
+def receive_alert_batch():
+    """Store a batch of buffered edge detections (JSON or MessagePack, optionally gzip) in one
+    transaction. Invalid items are rejected individually; the rest are stored and notified."""
+    try:
+        items = decode_batch(request.get_data(cache=False), request.content_type,
+                             request.headers.get('Content-Encoding'))
+        rows, indexes, errors = validate_batch(items)
+        detections, outcomes = detection_service.process_alerts(rows, socketio)
+
+        results = [{'index': i, 'status': 'rejected', 'error': errors[i]} for i in range(len(items))
+                   if i in errors]
+        # 'created' alerts now, 'cooldown' joins a digest, 'late' (stale) joins a catch-up digest
+        results += [{'index': i, 'status': BATCH_STATUS[outcome], 'detection_id': detection.id}
+                    for i, detection, outcome in zip(indexes, detections, outcomes)]
+        results.sort(key=lambda r: r['index'])
+
+        return jsonify({
+            'status': 'success' if not errors else 'partial' if detections else 'error',
+            'message': f'Stored {len(detections)} of {len(items)} detections',
+            'stored': len(detections),
+            'rejected': len(errors),
+            'results': results
+        }), 201 if detections or not items else 422
+
+    except BatchError as e:
+        current_app.logger.error(f"Rejected alert batch: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), e.status_code
+
+    except Exception as e:
+        current_app.logger.exception('Error processing alert batch')
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @alerts_bp.route('/alert/simulate', methods=['POST', 'GET'])
 def simulate_alert():
-    """Create a simple simulated elephant detection, notify subscribers,
+    """Create a simple simulated elephant detection, queue subscriber notifications,
     emit socket event and return the created detection."""
     try:
         # Choose a base location near map center (Taita Taveta center used in frontend)
@@ -63,40 +110,23 @@ def simulate_alert():
 
         confidence = round(random.uniform(0.85, 0.98), 2)
 
-        # Prepare data for insertion, but be schema-safe: only insert columns that exist
-        # Query table columns
-        conn = db.engine.raw_connection()
-        cur = conn.cursor()
-        cur.execute("PRAGMA table_info(detections);")
-        cols = [row[1] for row in cur.fetchall()]
-
-        # Build values dict
-        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-        values = {
-            'species': 'elephant',
-            'confidence': confidence,
-            'latitude': lat,
-            'longitude': lng,
-            'timestamp': now,
-            'image_path': None,
-            'is_verified': 0,
-            'is_false_positive': 0,
-            'camera_id': 'sim_cam'
-        }
-
-        insert_keys = [k for k in ['species','confidence','camera_id','latitude','longitude','timestamp','image_path','is_verified','is_false_positive'] if k in cols]
-        insert_vals = [values[k] for k in insert_keys]
-
-        placeholders = ','.join(['?'] * len(insert_keys))
-        sql = f"INSERT INTO detections ({','.join(insert_keys)}) VALUES ({placeholders})"
-        cur.execute(sql, insert_vals)
-        conn.commit()
-        detection_id = cur.lastrowid
-        cur.close()
-        conn.close()
-
-        # Load the newly created detection via the ORM (safe even if some columns were omitted)
-        detection = Detection.query.get(detection_id)
+        # Insert through the ORM so the write goes through the same session
+        # (and detection_stats bookkeeping) as every other detection
+        detection = Detection(
+            species='elephant',
+            confidence=confidence,
+            camera_id='sim_cam',
+            latitude=lat,
+            longitude=lng,
+            timestamp=datetime.utcnow(),
+            image_path=None,
+            is_verified=False,
+            is_false_positive=False
+        )
+        db.session.add(detection)
+        db.session.flush()
+        outbox = outbox_service.enqueue([detection])
+        db.session.commit()
 
         # Emit and notify
         try:
@@ -104,9 +134,10 @@ def simulate_alert():
         except Exception:
             current_app.logger.exception('Failed to emit simulated new_detection')
 
-        notifications_sent = send_notifications(detection)
+        breaches = geofence_service.check_detections([detection], socketio)
 
-        return jsonify({'status':'success','detection': detection.to_dict(), 'notifications_sent': notifications_sent}), 201
+        return jsonify({'status':'success','detection': detection.to_dict(), 'notification': outbox[0].to_dict(),
+                        'geofence_breaches': [breach['geofence'] for breach in breaches]}), 201
 
     except Exception as e:
         current_app.logger.exception('Error simulating alert')
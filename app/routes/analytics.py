@@ -0,0 +1,72 @@
+"""
+Analytics API Routes
+
+Time-series detection counts for reports, served from the hourly/daily
+rollup tables rather than the raw detections.
+"""
+
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
+from app.services.rollup_service import GRANULARITIES, BUCKET_STEP, timeseries
+import logging
+
+logger = logging.getLogger(__name__)
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+# Default window when no start is given
+DEFAULT_RANGE = {
+    'hour': timedelta(days=7),
+    'day': timedelta(days=90),
+}
+MAX_BUCKETS = 5000
+
+
+@analytics_bp.route('/timeseries', methods=['GET'])
+def get_timeseries():
+    """
+    Detection counts per hour or day.
+
+    Query params:
+        - bucket: 'hour' (default) or 'day'
+        - species: Only this species (optional)
+        - camera_id: Only this camera (optional)
+        - start, end: ISO 8601 UTC times (default: the last 7 days hourly / 90 days daily)
+    """
+    try:
+        bucket = request.args.get('bucket', 'hour')
+        if bucket not in GRANULARITIES:
+            return jsonify({'status': 'error',
+                            'message': f"bucket must be one of {', '.join(GRANULARITIES)}"}), 400
+
+        try:
+            end = datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.utcnow()
+            start = datetime.fromisoformat(request.args['start']) if 'start' in request.args \
+                else end - DEFAULT_RANGE[bucket]
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'start and end must be ISO 8601 times'}), 400
+
+        if start > end:
+            return jsonify({'status': 'error', 'message': 'start must be before end'}), 400
+        if (end - start) / BUCKET_STEP[bucket] > MAX_BUCKETS:
+            return jsonify({'status': 'error',
+                            'message': f'Range too large for {bucket} buckets (max {MAX_BUCKETS})'}), 400
+
+        species = request.args.get('species')
+        camera_id = request.args.get('camera_id')
+        series = timeseries(bucket, start, end, species=species, camera_id=camera_id)
+
+        return jsonify({
+            'status': 'success',
+            'bucket': bucket,
+            'species': species,
+            'camera_id': camera_id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'series': series,
+            'total': sum(point['count'] for point in series)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error fetching detection timeseries: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
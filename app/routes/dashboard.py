@@ -1,15 +1,59 @@
-from flask import Blueprint, render_template, jsonify
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, render_template, jsonify, request
 from app.models import Detection, Camera
+from app.services.cache_service import cached
+from config.detection_config import MAP_DELTA_OVERLAP, MAP_DELTA_MAX_ROWS, HEAT_TILE_MAX_ZOOM
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
 @dashboard_bp.route('/')
 def dashboard():
-    return render_template('dashboard.html')
+    return render_template('dashboard.html', heat_tile_max_zoom=HEAT_TILE_MAX_ZOOM)
 
 @dashboard_bp.route('/map-data')
+@cached(unless=lambda: 'since' in request.args)  # deltas are per client
 def map_data():
+    """
+    Detections and cameras for the dashboard map.
+
+    Without ``since``, returns the latest 100 detections and the active
+    cameras. With ``since`` (the ``watermark`` of an earlier response),
+    returns only detections added or changed after it, plus the ids of
+    detections marked false positive since then under ``removed``. Both
+    modes carry the full list of active cameras.
+    """
     try:
+        watermark = datetime.utcnow()
+
+        since = request.args.get('since')
+        if since:
+            try:
+                since_time = datetime.fromisoformat(since)
+            except ValueError:
+                return jsonify({'status': 'error', 'message': 'since must be a watermark from /map-data'}), 400
+            if since_time.tzinfo is not None:
+                # updated_at is naive UTC
+                since_time = since_time.astimezone(timezone.utc).replace(tzinfo=None)
+
+            # Re-read a short window before the watermark: a row stamped before
+            # the last poll may only have committed after it. Clients patch by id.
+            changed = Detection.query\
+                .filter(Detection.updated_at > since_time - timedelta(seconds=MAP_DELTA_OVERLAP))\
+                .order_by(Detection.updated_at)\
+                .limit(MAP_DELTA_MAX_ROWS + 1)\
+                .all()
+
+            if len(changed) <= MAP_DELTA_MAX_ROWS:
+                return jsonify({
+                    'status': 'success',
+                    'mode': 'delta',
+                    'watermark': watermark.isoformat(),
+                    'detections': [d.to_dict() for d in changed if not d.is_false_positive],
+                    'removed': [d.id for d in changed if d.is_false_positive],
+                    'cameras': [camera.to_dict() for camera in Camera.query.filter_by(is_active=True).all()]
+                })
+            # The client is too far behind for a delta; send a full snapshot
+
         # Get recent detections
         detections = Detection.query.filter_by(is_false_positive=False)\
             .order_by(Detection.timestamp.desc())\
@@ -20,9 +64,12 @@ def map_data():
         cameras = Camera.query.filter_by(is_active=True).all()
         
         return jsonify({
+            'status': 'success',
+            'mode': 'full',
+            'watermark': watermark.isoformat(),
             'detections': [detection.to_dict() for detection in detections],
             'cameras': [camera.to_dict() for camera in cameras]
         })
         
     except Exception as e:
-        return jsonify({'status': 'error', 'message': str(e)}), 400
\ No newline at end of file
+        return jsonify({'status': 'error', 'message': str(e)}), 400
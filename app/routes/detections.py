@@ -5,6 +5,8 @@ from app import db
 from app.models import Detection
 from app.services.sms_service import SMSService
 from app.services.detection_services import get_detection_service
+from app.services.cache_service import cached, response_cache, SPECIES
+from app.services.pagination import InvalidCursor, keyset_page, page_args, page_payload
 from datetime import datetime
 import os
 from werkzeug.utils import secure_filename
@@ -102,18 +104,29 @@ def handle_detections():
         
         return jsonify(detection.to_dict()), 201
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-    pagination = Detection.query.order_by(Detection.timestamp.desc()).paginate(
-        page=page, per_page=per_page, error_out=False)
-    
-    return jsonify({
-        'items': [d.to_dict() for d in pagination.items],
-        'page': page,
-        'per_page': per_page,
-        'total': pagination.total,
-        'pages': pagination.pages
-    })
+    if 'page' in request.args:
+        # Legacy offset pagination; counts every row and slows down on deep pages
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 10, type=int)
+        pagination = Detection.query.order_by(Detection.timestamp.desc()).paginate(
+            page=page, per_page=per_page, error_out=False)
+
+        return jsonify({
+            'status': 'success',
+            'items': [d.to_dict() for d in pagination.items],
+            'page': page,
+            'per_page': per_page,
+            'total': pagination.total,
+            'pages': pagination.pages
+        })
+
+    limit, cursor, include_total = page_args(request.args, default_limit=10)
+    try:
+        page = keyset_page(Detection.query, limit, cursor, include_total)
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    return jsonify({'status': 'success', **page_payload(page)})
 
 @detections_bp.route('/detections/<int:detection_id>', methods=['GET', 'PUT'])
 def handle_detection(detection_id):
@@ -129,6 +142,7 @@ def handle_detection(detection_id):
 
 
 @detections_bp.route('/stats', methods=['GET'])
+@cached()
 def get_stats():
     """Get detection statistics"""
     detection_service = get_detection_service(use_mock=True)
@@ -144,6 +158,7 @@ def detection_mode():
         use_mock = data.get('use_mock', True)
         detection_service = get_detection_service(use_mock=use_mock)
         detection_service.switch_mode(use_mock)
+        response_cache.invalidate(SPECIES)
         
         mode = 'MOCK (Simulated)' if use_mock else 'REAL (YOLOv8)'
         return jsonify({
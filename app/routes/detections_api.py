@@ -13,7 +13,9 @@ from app.models import Detection, Camera, Subscriber, Alert
 from app.models.alert import Alert
 from app import db, socketio
 from app.services.detection_services import get_detection_service
-from app.services.notification_services import send_notifications
+from app.services import stats_service
+from app.services.cache_service import cached
+from app.services.pagination import InvalidCursor, keyset_page, page_args, page_payload
 import os
 import logging
 
@@ -63,17 +65,13 @@ def upload_detection():
             latitude=latitude,
             longitude=longitude,
             camera_id=camera_id,
-            socketio=socketio
+            socketio=socketio,
+            notify=True
         )
         
         if not success:
             return jsonify({'status': 'error', 'message': 'Detection failed'}), 500
         
-        # Trigger alerts for high-confidence detections
-        for detection in detections:
-            if detection.confidence >= 0.8:
-                send_notifications(detection)
-        
         return jsonify({
             'status': 'success',
             'detections': [d.to_dict() for d in detections],
@@ -87,27 +85,26 @@ def upload_detection():
 
 @detections_api_bp.route('/recent', methods=['GET'])
 def get_recent_detections():
-    """Get recent detections (last 100)"""
+    """Get recent detections (last 100), continued with ?cursor=<next_cursor>"""
     try:
-        limit = request.args.get('limit', 100, type=int)
-        detections = Detection.query\
-            .filter_by(is_false_positive=False)\
-            .order_by(Detection.timestamp.desc())\
-            .limit(limit)\
-            .all()
+        limit, cursor, include_total = page_args(request.args, default_limit=100)
+        page = keyset_page(Detection.query.filter_by(is_false_positive=False),
+                           limit, cursor, include_total)
         
         return jsonify({
             'status': 'success',
-            'detections': [d.to_dict() for d in detections],
-            'count': len(detections)
+            **page_payload(page)
         }), 200
     
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching recent detections: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
 @detections_api_bp.route('/stats', methods=['GET'])
+@cached()
 def get_detection_stats():
     """Get detection statistics"""
     try:
@@ -127,20 +124,18 @@ def get_detection_stats():
 def get_detections_by_species(species: str):
     """Get detections for a specific species"""
     try:
-        limit = request.args.get('limit', 50, type=int)
-        detections = Detection.query\
-            .filter_by(species=species, is_false_positive=False)\
-            .order_by(Detection.timestamp.desc())\
-            .limit(limit)\
-            .all()
+        limit, cursor, include_total = page_args(request.args, default_limit=50)
+        page = keyset_page(Detection.query.filter_by(species=species, is_false_positive=False),
+                           limit, cursor, include_total)
         
         return jsonify({
             'status': 'success',
             'species': species,
-            'detections': [d.to_dict() for d in detections],
-            'count': len(detections)
+            **page_payload(page)
         }), 200
     
+    except InvalidCursor as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching detections for {species}: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -284,21 +279,13 @@ def add_camera():
 
 # Dashboard summary endpoint
 @detections_api_bp.route('/dashboard-summary', methods=['GET'])
+@cached()
 def get_dashboard_summary():
     """Get dashboard summary with all key statistics"""
     try:
-        total_detections = Detection.query.count()
-        verified_detections = Detection.query.filter_by(is_verified=True).count()
-        high_confidence = Detection.query.filter(Detection.confidence >= 0.9).count()
-        
-        # Get top species
-        top_species = db.session.query(
-            Detection.species,
-            db.func.count(Detection.id).label('count')
-        ).filter_by(is_false_positive=False)\
-         .group_by(Detection.species)\
-         .order_by(db.func.count(Detection.id).desc())\
-         .limit(5).all()
+        # Counts come from the detection_stats counters, not table scans
+        counters = stats_service.get_counters()
+        top_species = stats_service.top_species(limit=5)
         
         # Get recent detections
         recent = Detection.query\
@@ -312,11 +299,11 @@ def get_dashboard_summary():
         return jsonify({
             'status': 'success',
             'summary': {
-                'total_detections': total_detections,
-                'verified_detections': verified_detections,
-                'high_confidence_count': high_confidence,
+                'total_detections': counters.get('total', 0),
+                'verified_detections': counters.get('verified', 0),
+                'high_confidence_count': counters.get('high_confidence', 0),
                 'active_cameras': active_cameras,
-                'top_species': [{'species': s, 'count': c} for s, c in top_species],
+                'top_species': top_species,
                 'recent_detections': [d.to_dict() for d in recent]
             }
         }), 200
@@ -0,0 +1,150 @@
+"""
+Geofence API Routes
+
+Village, farm and corridor polygons that detections are checked against
+(see geofence_service).
+"""
+
+from flask import Blueprint, request, jsonify
+from app import db
+from app.models import Geofence
+from app.services.geofence_service import geofence_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+geofences_bp = Blueprint('geofences', __name__, url_prefix='/api/geofences')
+
+
+def _apply(geofence, data):
+    """Copy request fields onto a geofence; returns an error message or None"""
+    if 'name' in data:
+        if not data['name']:
+            return 'name must not be empty'
+        geofence.name = data['name']
+    if 'zone_type' in data:
+        geofence.zone_type = data['zone_type']
+    if 'species' in data:
+        species = data['species']
+        if isinstance(species, str):
+            species = [species]
+        geofence.species = ','.join(s.strip() for s in species if s.strip()) or None
+    if 'coordinates' in data:
+        try:
+            vertices = [(float(lat), float(lng)) for lat, lng in data['coordinates']]
+        except (TypeError, ValueError):
+            return 'coordinates must be a list of [lat, lng] pairs'
+        if len(vertices) < 3:
+            return 'coordinates need at least 3 vertices'
+        if not all(-90 <= lat <= 90 and -180 <= lng <= 180 for lat, lng in vertices):
+            return 'coordinates out of range'
+        geofence.set_vertices(vertices)
+    if 'is_active' in data:
+        geofence.is_active = bool(data['is_active'])
+    return None
+
+
+@geofences_bp.route('', methods=['GET'])
+def get_geofences():
+    """List geofences (?include_inactive=true for all)"""
+    try:
+        query = Geofence.query
+        if request.args.get('include_inactive', 'false').lower() not in ('true', '1', 'yes'):
+            query = query.filter_by(is_active=True)
+        geofences = query.order_by(Geofence.id).all()
+        return jsonify({
+            'status': 'success',
+            'geofences': [g.to_dict() for g in geofences],
+            'count': len(geofences)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error fetching geofences: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@geofences_bp.route('', methods=['POST'])
+def create_geofence():
+    """
+    Create a geofence.
+
+    JSON body:
+        - name: Display name (required)
+        - coordinates: [[lat, lng], ...] polygon vertices (required, at least 3)
+        - zone_type: 'village', 'farm', 'corridor', ... (default 'village')
+        - species: Species that breach it (default: all)
+    """
+    try:
+        data = request.get_json() or {}
+        if not data.get('name') or 'coordinates' not in data:
+            return jsonify({'status': 'error', 'message': 'name and coordinates are required'}), 400
+
+        geofence = Geofence()
+        error = _apply(geofence, data)
+        if error:
+            return jsonify({'status': 'error', 'message': error}), 400
+
+        db.session.add(geofence)
+        db.session.commit()
+        return jsonify({'status': 'success', 'geofence': geofence.to_dict()}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error creating geofence: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@geofences_bp.route('/<int:geofence_id>', methods=['GET'])
+def get_geofence(geofence_id):
+    geofence = db.session.get(Geofence, geofence_id)
+    if geofence is None:
+        return jsonify({'status': 'error', 'message': 'Geofence not found'}), 404
+    return jsonify({'status': 'success', 'geofence': geofence.to_dict()}), 200
+
+
+@geofences_bp.route('/<int:geofence_id>', methods=['PUT', 'PATCH'])
+def update_geofence(geofence_id):
+    try:
+        geofence = db.session.get(Geofence, geofence_id)
+        if geofence is None:
+            return jsonify({'status': 'error', 'message': 'Geofence not found'}), 404
+
+        error = _apply(geofence, request.get_json() or {})
+        if error:
+            db.session.rollback()
+            return jsonify({'status': 'error', 'message': error}), 400
+
+        db.session.commit()
+        return jsonify({'status': 'success', 'geofence': geofence.to_dict()}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error updating geofence: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@geofences_bp.route('/<int:geofence_id>', methods=['DELETE'])
+def delete_geofence(geofence_id):
+    try:
+        geofence = db.session.get(Geofence, geofence_id)
+        if geofence is None:
+            return jsonify({'status': 'error', 'message': 'Geofence not found'}), 404
+
+        db.session.delete(geofence)
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Geofence deleted'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error deleting geofence: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@geofences_bp.route('/check', methods=['GET'])
+def check_point():
+    """Active geofences containing ?lat=&lng= (optionally only those covering ?species=)"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None:
+        return jsonify({'status': 'error', 'message': 'lat and lng are required'}), 400
+    fences = geofence_service.find(lat, lng, request.args.get('species'))
+    return jsonify({'status': 'success', 'geofences': [f.to_dict() for f in fences]}), 200
@@ -9,6 +9,12 @@ Provides endpoints for:
 
 from flask import Blueprint, request, jsonify
 from app.services.detection_services import detection_service
+from app.services.write_queue import write_queue
+from app.services.outbox_service import notification_dispatcher
+from app.services.cooldown_service import cooldown_engine
+from app.services import circuit_breaker
+from app.services.notification_services import subscriber_index_metrics
+from app.services.cache_service import cached, response_cache, SPECIES
 import logging
 
 logger = logging.getLogger(__name__)
@@ -80,6 +86,7 @@ def set_detection_mode():
         # Reinitialize classifier
         from ml.species_classifier import SpeciesClassifier
         detection_service.classifier = SpeciesClassifier(mode='mock' if use_mock else 'yolo')
+        response_cache.invalidate(SPECIES)
         
         return jsonify({
             'status': 'success',
@@ -140,6 +147,7 @@ def get_model_info():
 
 
 @management_bp.route('/species-list', methods=['GET'])
+@cached(SPECIES, ttl=300)
 def get_species_list():
     """Get list of all supported wildlife species"""
     try:
@@ -165,6 +173,52 @@ def get_species_list():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@management_bp.route('/write-queue', methods=['GET'])
+def write_queue_metrics():
+    """Get depth and commit latency of the detection write-behind queue"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'write_queue': write_queue.metrics()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error getting write queue metrics: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@management_bp.route('/notifications', methods=['GET'])
+def notification_metrics():
+    """Get outbox backlog, retries, delivery latency, open alert cooldowns, provider circuit breakers
+    and the cached subscriber snapshot"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'notifications': notification_dispatcher.metrics(),
+            'cooldowns': cooldown_engine.windows(),
+            'providers': circuit_breaker.metrics(),
+            'subscribers': subscriber_index_metrics()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error getting notification metrics: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@management_bp.route('/cache', methods=['GET'])
+def cache_metrics():
+    """Get hit ratio and invalidation counts of the response cache"""
+    try:
+        return jsonify({
+            'status': 'success',
+            'cache': response_cache.metrics()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error getting cache metrics: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @management_bp.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -0,0 +1,159 @@
+"""
+Map API Routes
+
+Aggregated detections for the map. Rather than one marker per detection,
+the map asks for clusters covering its current viewport and zoom level.
+"""
+
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from app.services.cache_service import cached
+from app.services.map_services import map_service
+from config.detection_config import PAGE_MAX_LIMIT
+import logging
+
+logger = logging.getLogger(__name__)
+
+map_bp = Blueprint('map', __name__, url_prefix='/api/map')
+
+MAX_ZOOM = 20
+
+
+def _bounding_box(args):
+    """Bounding box from min/max lat/lng params, or from lat, lng and radius_km"""
+    if 'lat' in args or 'lng' in args:
+        return map_service.get_bounding_box(
+            args.get('lat', type=float), args.get('lng', type=float),
+            args.get('radius_km', 10, type=float))
+    return {
+        'min_lat': args.get('min_lat', -90.0, type=float),
+        'max_lat': args.get('max_lat', 90.0, type=float),
+        'min_lon': args.get('min_lng', -180.0, type=float),
+        'max_lon': args.get('max_lng', 180.0, type=float),
+    }
+
+
+@map_bp.route('/clusters', methods=['GET'])
+@cached()
+def get_clusters():
+    """
+    Detections inside a bounding box, aggregated into grid cells.
+
+    Query params:
+        - min_lat, max_lat, min_lng, max_lng: Viewport (default: the whole world), or
+        - lat, lng, radius_km: Centre and radius (default 10 km)
+        - zoom: Map zoom level 0-20 (default 10); cells shrink as it grows
+        - species: Only this species (optional)
+        - since: Only detections from this ISO 8601 UTC time on (optional)
+    """
+    try:
+        try:
+            bbox = _bounding_box(request.args)
+            if None in bbox.values():
+                raise ValueError
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'Invalid bounding box'}), 400
+        if bbox['min_lat'] > bbox['max_lat'] or bbox['min_lon'] > bbox['max_lon']:
+            return jsonify({'status': 'error', 'message': 'Bounding box minimum exceeds maximum'}), 400
+
+        zoom = max(0, min(request.args.get('zoom', 10, type=int), MAX_ZOOM))
+        species = request.args.get('species')
+        try:
+            since = datetime.fromisoformat(request.args['since']) if 'since' in request.args else None
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'since must be an ISO 8601 time'}), 400
+
+        clusters = map_service.cluster_detections(bbox, zoom, species=species, since=since)
+
+        return jsonify({
+            'status': 'success',
+            'zoom': zoom,
+            'cell_size': map_service.cell_size(zoom),
+            'bbox': {'min_lat': bbox['min_lat'], 'max_lat': bbox['max_lat'],
+                     'min_lng': bbox['min_lon'], 'max_lng': bbox['max_lon']},
+            'clusters': clusters,
+            'total': sum(cluster['count'] for cluster in clusters)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error clustering detections: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@map_bp.route('/nearby', methods=['GET'])
+def get_nearby():
+    """
+    Active detections within a radius of a point, nearest first.
+
+    Query params:
+        - lat, lng: Centre (required)
+        - radius_km: Radius in kilometres (default 10)
+        - species: Only this species (optional)
+        - limit: Maximum detections to return (default 100)
+    """
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        radius_km = request.args.get('radius_km', 10, type=float)
+        if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+            return jsonify({'status': 'error', 'message': 'lat and lng are required'}), 400
+        if radius_km is None or not 0 < radius_km <= 1000:
+            return jsonify({'status': 'error', 'message': 'radius_km must be between 0 and 1000'}), 400
+        limit = max(1, min(request.args.get('limit', 100, type=int), PAGE_MAX_LIMIT))
+
+        matches = map_service.detections_within(lat, lng, radius_km,
+                                                species=request.args.get('species'), limit=limit)
+        detections = []
+        for detection, distance in matches:
+            item = detection.to_dict()
+            item['distance_km'] = round(distance, 3)
+            detections.append(item)
+
+        return jsonify({
+            'status': 'success',
+            'center': {'lat': lat, 'lng': lng},
+            'radius_km': radius_km,
+            'detections': detections,
+            'count': len(detections)
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error finding nearby detections: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@map_bp.route('/nearest', methods=['GET'])
+def get_nearest():
+    """
+    Cameras and points of interest nearest to a location.
+
+    Query params:
+        - lat, lng: Location (required)
+        - k: How many of each to return (default 3)
+        - radius_km: Only return those within this distance (optional)
+    """
+    try:
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+            return jsonify({'status': 'error', 'message': 'lat and lng are required'}), 400
+        k = max(1, min(request.args.get('k', 3, type=int), PAGE_MAX_LIMIT))
+        radius_km = request.args.get('radius_km', type=float)
+
+        def lookup(index):
+            if radius_km is not None:
+                matches = index.within(lat, lng, radius_km)[:k]
+            else:
+                matches = index.nearest(lat, lng, k=k)
+            return [dict(item, distance_km=round(distance, 3)) for item, distance in matches]
+
+        return jsonify({
+            'status': 'success',
+            'location': {'lat': lat, 'lng': lng},
+            'cameras': lookup(map_service.camera_index()),
+            'points_of_interest': lookup(map_service.poi_index())
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error finding nearest cameras: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -5,6 +5,27 @@ import re
 
 subscribers_bp = Blueprint('subscribers', __name__)
 
+def _location_fields(data):
+    """latitude/longitude/alert_radius_km from a request body, or raise ValueError"""
+    location = data.get('location') or {}
+    latitude = data.get('latitude', location.get('lat'))
+    longitude = data.get('longitude', location.get('lng'))
+    radius = data.get('alert_radius_km')
+    if (latitude is None) != (longitude is None):
+        raise ValueError('Both latitude and longitude are required for a home location')
+    fields = {}
+    if latitude is not None:
+        latitude, longitude = float(latitude), float(longitude)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('Location out of range')
+        fields.update(latitude=latitude, longitude=longitude)
+    if radius is not None:
+        radius = float(radius)
+        if radius <= 0:
+            raise ValueError('alert_radius_km must be positive')
+        fields['alert_radius_km'] = radius
+    return fields
+
 @subscribers_bp.route('/subscribers', methods=['GET'])
 def get_subscribers():
     try:
@@ -29,6 +50,11 @@ def create_subscriber():
                 'message': 'Name and at least one contact method (phone or email) are required'
             }), 400
         
+        try:
+            location = _location_fields(data)
+        except (TypeError, ValueError) as e:
+            return jsonify({'status': 'error', 'message': str(e)}), 400
+        
         # Check for existing subscriber
         existing = None
         if data.get('phone'):
@@ -38,6 +64,8 @@ def create_subscriber():
         
         if existing:
             existing.is_active = True
+            for field, value in location.items():
+                setattr(existing, field, value)
             db.session.commit()
             return jsonify({
                 'status': 'success',
@@ -49,7 +77,8 @@ def create_subscriber():
         subscriber = Subscriber(
             name=data['name'],
             phone=data.get('phone'),
-            email=data.get('email')
+            email=data.get('email'),
+            **location
         )
         
         db.session.add(subscriber)
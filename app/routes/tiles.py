@@ -0,0 +1,34 @@
+"""
+Tile Routes
+
+Precomputed detection density tiles for the map's heatmap layer, built by
+`flask build-heat-tiles` (see tile_service).
+"""
+
+import io
+import os
+from flask import Blueprint, jsonify, send_file
+from app.services import tile_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+tiles_bp = Blueprint('tiles', __name__, url_prefix='/tiles')
+
+
+@tiles_bp.route('/heat/<int:z>/<int:x>/<int:y>', methods=['GET'])
+@tiles_bp.route('/heat/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+def get_heat_tile(z, x, y):
+    """
+    One 256px heatmap tile (PNG). Tiles with no detections, or deeper than
+    HEAT_TILE_MAX_ZOOM, are transparent. Responses carry an ETag, so
+    unchanged tiles are revalidated with a 304.
+    """
+    if z > 30 or x >= 2 ** z or y >= 2 ** z:
+        return jsonify({'status': 'error', 'message': 'Tile out of range'}), 404
+
+    path = tile_service.tile_path(z, x, y)
+    if os.path.exists(path):
+        return send_file(path, mimetype='image/png', conditional=True)
+    return send_file(io.BytesIO(tile_service.blank_tile()), mimetype='image/png',
+                     etag='blank', conditional=True)
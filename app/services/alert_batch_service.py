@@ -0,0 +1,191 @@
+"""
+Alert Batch Service - decode and validate detection batches from edge relays
+
+Edge relays buffer detections while their satellite link is down and flush
+thousands at once when it comes back. A batch is an array of the objects
+``/api/alert`` takes (or ``{"detections": [...]}``) sent as JSON or
+MessagePack, optionally gzip-compressed (``Content-Encoding: gzip``).
+MessagePack needs the optional ``msgpack`` package.
+
+Fields are pulled out of the items once and checked as NumPy arrays, so a
+bad item is reported by index instead of failing the whole batch.
+"""
+import json
+import math
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from config.detection_config import ALERT_BATCH_MAX_ITEMS, ALERT_BATCH_MAX_BYTES
+
+try:
+    import msgpack
+except ImportError:  # MessagePack batches are refused without it
+    msgpack = None
+
+JSON_TYPES = ('application/json',)
+MSGPACK_TYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# Column lengths of the detections table
+MAX_SPECIES_LENGTH = 50
+MAX_CAMERA_ID_LENGTH = 50
+MAX_IMAGE_PATH_LENGTH = 200
+
+
+class BatchError(ValueError):
+    """The request body is not a usable batch (as a whole)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _gunzip(body: bytes, limit: int) -> bytes:
+    # Bounded, so a small compressed body cannot expand without limit
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = inflater.decompress(body, limit + 1)
+    except zlib.error as e:
+        raise BatchError(f'Invalid gzip body: {e}')
+    if len(data) > limit or inflater.unconsumed_tail:
+        raise BatchError(f'Batch larger than {limit} bytes uncompressed', 413)
+    return data
+
+
+def decode_batch(body: bytes, content_type: str, content_encoding: str = None,
+                 max_items: int = ALERT_BATCH_MAX_ITEMS, max_bytes: int = ALERT_BATCH_MAX_BYTES) -> List:
+    """
+    Decode a request body into its list of detection items.
+
+    Raises:
+        BatchError: Unsupported encoding or type, bad payload, or too large
+    """
+    encoding = (content_encoding or '').strip().lower()
+    if encoding == 'gzip':
+        body = _gunzip(body, max_bytes)
+    elif encoding not in ('', 'identity'):
+        raise BatchError(f'Unsupported Content-Encoding: {content_encoding}', 415)
+    elif len(body) > max_bytes:
+        raise BatchError(f'Batch larger than {max_bytes} bytes', 413)
+
+    mimetype = (content_type or 'application/json').split(';')[0].strip().lower()
+    try:
+        if mimetype in MSGPACK_TYPES:
+            if msgpack is None:
+                raise BatchError('MessagePack batches need the msgpack package; send JSON instead', 415)
+            payload = msgpack.unpackb(body, raw=False)
+        elif mimetype in JSON_TYPES:
+            payload = json.loads(body)
+        else:
+            raise BatchError(f'Unsupported Content-Type: {content_type}', 415)
+    except BatchError:
+        raise
+    except Exception as e:
+        raise BatchError(f'Invalid {mimetype} body: {e}')
+
+    items = payload.get('detections') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise BatchError('Expected an array of detections')
+    if len(items) > max_items:
+        raise BatchError(f'At most {max_items} detections per batch', 413)
+    return items
+
+
+def _number(value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return math.nan
+    return float(value)
+
+
+def _text(value, default: str = None):
+    if value is None:
+        return default
+    return value if isinstance(value, str) else None
+
+
+def _timestamp(value):
+    """Naive UTC datetime of an ISO string or epoch seconds; None if missing, False if invalid"""
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+        if isinstance(value, str):
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+    except (ValueError, OverflowError, OSError):
+        pass
+    return False
+
+
+def _location(item: Dict) -> Tuple[float, float]:
+    location = item.get('location')
+    if isinstance(location, dict):
+        return _number(location.get('lat')), _number(location.get('lng'))
+    return _number(item.get('latitude')), _number(item.get('longitude'))
+
+
+def validate_batch(items: List) -> Tuple[List[Dict], List[int], Dict[int, str]]:
+    """
+    Check every item of a batch at once.
+
+    Items take the fields of ``/api/alert`` (``species``, ``confidence``,
+    ``camera_id``, ``location`` or ``latitude``/``longitude``,
+    ``image_path``) plus an optional ``timestamp`` of when the relay saw the
+    detection (ISO 8601 or epoch seconds, UTC).
+
+    Returns:
+        Tuple of (insert rows of the valid items, their indexes in the
+        batch, error message by index of each rejected item)
+    """
+    n = len(items)
+    is_object = np.fromiter((isinstance(item, dict) for item in items), dtype=bool, count=n)
+    objects = [item if ok else {} for item, ok in zip(items, is_object)]
+
+    locations = np.array([_location(item) for item in objects], dtype=float).reshape(n, 2)
+    latitude, longitude = locations[:, 0], locations[:, 1]
+    confidence = np.fromiter((_number(item.get('confidence', 0.0)) for item in objects), dtype=float, count=n)
+    species = [_text(item.get('species'), 'elephant') for item in objects]
+    camera_ids = [_text(item.get('camera_id'), 'unknown') for item in objects]
+    image_paths = [_text(item.get('image_path')) for item in objects]
+    timestamps = [_timestamp(item.get('timestamp')) for item in objects]
+
+    # NaN (missing or non-numeric) fails every comparison
+    checks = [
+        (~is_object, 'Not an object'),
+        (~((latitude >= -90.0) & (latitude <= 90.0)), 'Invalid or missing latitude'),
+        (~((longitude >= -180.0) & (longitude <= 180.0)), 'Invalid or missing longitude'),
+        (~((confidence >= 0.0) & (confidence <= 1.0)), 'Confidence must be a number from 0 to 1'),
+        (np.fromiter((not s or len(s) > MAX_SPECIES_LENGTH for s in species), dtype=bool, count=n),
+         'Invalid species'),
+        (np.fromiter((c is None or len(c) > MAX_CAMERA_ID_LENGTH for c in camera_ids), dtype=bool, count=n),
+         'Invalid camera_id'),
+        (np.fromiter((p is None and item.get('image_path') is not None
+                      or p is not None and len(p) > MAX_IMAGE_PATH_LENGTH
+                      for p, item in zip(image_paths, objects)), dtype=bool, count=n),
+         'Invalid image_path'),
+        (np.fromiter((t is False for t in timestamps), dtype=bool, count=n), 'Invalid timestamp'),
+    ]
+
+    # Report the first failed check of each item
+    errors = {}
+    for failed, message in reversed(checks):
+        for index in np.flatnonzero(failed):
+            errors[int(index)] = message
+
+    now = datetime.utcnow()
+    valid = np.flatnonzero(~np.logical_or.reduce([failed for failed, _ in checks]))
+    rows = [{
+        'species': species[i],
+        'confidence': float(confidence[i]),
+        'camera_id': camera_ids[i],
+        'latitude': float(latitude[i]),
+        'longitude': float(longitude[i]),
+        'image_path': image_paths[i],
+        'timestamp': timestamps[i] or now
+    } for i in valid]
+    return rows, [int(i) for i in valid], errors
@@ -0,0 +1,137 @@
+"""
+Burst Service - group camera-trap frames into trigger events
+
+A camera trap fires a burst of several frames per trigger. Frames from the
+same camera that are no more than ``BURST_GAP_SECONDS`` apart belong to one
+burst; detector results across the burst are combined into one result per
+species so each trigger is stored (and alerted on) once.
+"""
+import os
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from config.detection_config import BURST_GAP_SECONDS, BURST_VOTING
+
+logger = logging.getLogger(__name__)
+
+VOTING_METHODS = ('max', 'mean')
+
+# EXIF tag ids for the capture time
+_EXIF_DATETIME_ORIGINAL = 36867
+_EXIF_DATETIME = 306
+
+
+class Burst:
+    """Frames from one camera trigger"""
+
+    def __init__(self, camera_id: Optional[str], frames: List[str], start: float, end: float):
+        self.camera_id = camera_id
+        self.frames = frames
+        self.start = start
+        self.end = end
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return f"<Burst camera={self.camera_id} frames={len(self.frames)}>"
+
+
+def capture_time(image_path: str) -> float:
+    """
+    Capture time of an image as a Unix timestamp.
+
+    Uses the EXIF DateTimeOriginal written by the camera trap when Pillow can
+    read it, otherwise the file modification time.
+    """
+    try:
+        from PIL import Image
+
+        with Image.open(image_path) as img:
+            exif = img.getexif()
+            raw = exif.get_ifd(0x8769).get(_EXIF_DATETIME_ORIGINAL) or exif.get(_EXIF_DATETIME)
+        if raw:
+            return datetime.strptime(raw, '%Y:%m:%d %H:%M:%S').timestamp()
+    except Exception:
+        pass
+    return os.path.getmtime(image_path)
+
+
+def group_bursts(image_paths: List[str], camera_for: Callable[[str], Optional[str]] = None,
+                 gap: float = BURST_GAP_SECONDS,
+                 time_for: Callable[[str], float] = capture_time) -> List[Burst]:
+    """
+    Split images into bursts keyed by camera and time gap.
+
+    Args:
+        image_paths: Images to group
+        camera_for: Function returning the camera id of an image (optional)
+        gap: Maximum seconds between consecutive frames of one burst
+        time_for: Function returning the capture time of an image
+
+    Returns:
+        Bursts ordered by camera and start time
+    """
+    by_camera: Dict[Optional[str], List] = {}
+    for path in image_paths:
+        camera_id = camera_for(path) if camera_for else None
+        by_camera.setdefault(camera_id, []).append((time_for(path), path))
+
+    bursts = []
+    for camera_id, frames in by_camera.items():
+        frames.sort()
+        current = [frames[0]]
+        for frame in frames[1:]:
+            if frame[0] - current[-1][0] > gap:
+                bursts.append(Burst(camera_id, [p for _, p in current], current[0][0], current[-1][0]))
+                current = []
+            current.append(frame)
+        bursts.append(Burst(camera_id, [p for _, p in current], current[0][0], current[-1][0]))
+    return bursts
+
+
+def aggregate_burst(frame_results: List[List], voting: str = BURST_VOTING) -> List[Dict]:
+    """
+    Combine detector results from every frame of a burst into one result per species.
+
+    Within a frame the best box of each species counts. Across frames the
+    confidences are combined by ``voting``: 'max' keeps the strongest frame,
+    'mean' averages the frames the species was seen in.
+
+    Args:
+        frame_results: One list of DetectionResult objects per frame
+        voting: 'max' or 'mean'
+
+    Returns:
+        List of dicts with species, confidence, frame_count, latitude,
+        longitude and image_path (the best frame)
+    """
+    if voting not in VOTING_METHODS:
+        raise ValueError(f"Unknown voting method: {voting}")
+
+    best_per_frame: Dict[str, List] = {}
+    for results in frame_results:
+        frame_best = {}
+        for result in results:
+            if result.species not in frame_best or result.confidence > frame_best[result.species].confidence:
+                frame_best[result.species] = result
+        for species, result in frame_best.items():
+            best_per_frame.setdefault(species, []).append(result)
+
+    events = []
+    for species, results in best_per_frame.items():
+        best = max(results, key=lambda r: r.confidence)
+        if voting == 'max':
+            confidence = best.confidence
+        else:
+            confidence = sum(r.confidence for r in results) / len(results)
+        events.append({
+            'species': species,
+            'confidence': confidence,
+            'frame_count': len(results),
+            'latitude': best.latitude,
+            'longitude': best.longitude,
+            'image_path': best.image_path,
+        })
+    return events
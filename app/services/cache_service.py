@@ -0,0 +1,251 @@
+"""
+Cache Service - short-lived response cache for polled endpoints
+
+Every open dashboard polls /map-data, the dashboard summary, the stats and
+the species list. Their JSON responses are cached per URL for
+``RESPONSE_CACHE_TTL`` seconds and dropped as soon as a transaction that
+touched detections or cameras commits, so polls between writes are served
+without touching the database.
+
+The cache is process-local by default. With ``RESPONSE_CACHE_URL`` set to a
+Redis URL (and the ``redis`` package installed) entries and invalidations
+are shared by every worker process.
+"""
+import functools
+import threading
+import time
+import logging
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, Dict, Optional
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from config.detection_config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_URL
+)
+
+logger = logging.getLogger(__name__)
+
+# Cache groups, invalidated together
+DETECTIONS = 'detections'
+SPECIES = 'species'
+
+
+class LocalBackend:
+    """LRU dict of entries with expiry times, one generation counter per group"""
+
+    name = 'local'
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # (group, key) -> (expires, generation, body)
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def generation(self, group: str) -> int:
+        with self._lock:
+            return self._generations.get(group, 0)
+
+    def get(self, group: str, key: str, generation: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get((group, key))
+            if entry is None:
+                return None
+            expires, entry_generation, body = entry
+            if expires < time.time() or entry_generation != generation:
+                del self._entries[(group, key)]
+                return None
+            self._entries.move_to_end((group, key))
+            return body
+
+    def set(self, group: str, key: str, body: bytes, ttl: float, generation: int):
+        with self._lock:
+            if generation != self._generations.get(group, 0):
+                return  # invalidated while the response was being built
+            self._entries[(group, key)] = (time.time() + ttl, generation, body)
+            self._entries.move_to_end((group, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, group: str):
+        with self._lock:
+            self._generations[group] = self._generations.get(group, 0) + 1
+            for cache_key in [k for k in self._entries if k[0] == group]:
+                del self._entries[cache_key]
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Entries shared through Redis; invalidation bumps a per-group generation in the key"""
+
+    name = 'redis'
+
+    def __init__(self, url: str, prefix: str = 'wildguard:cache'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def generation(self, group: str) -> int:
+        return int(self.client.get(f'{self.prefix}:gen:{group}') or 0)
+
+    def get(self, group: str, key: str, generation: int) -> Optional[bytes]:
+        return self.client.get(f'{self.prefix}:{group}:{generation}:{key}')
+
+    def set(self, group: str, key: str, body: bytes, ttl: float, generation: int):
+        self.client.set(f'{self.prefix}:{group}:{generation}:{key}', body, px=int(ttl * 1000))
+
+    def invalidate(self, group: str):
+        self.client.incr(f'{self.prefix}:gen:{group}')
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResponseCache:
+    def __init__(self):
+        self.app = None
+        self.enabled = RESPONSE_CACHE_ENABLED
+        self.default_ttl = RESPONSE_CACHE_TTL
+        self.backend = LocalBackend()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._invalidations = 0
+
+    def init_app(self, app):
+        self.app = app
+        app.extensions['response_cache'] = self
+        # A fresh store per app, so test apps never see each other's entries
+        self.backend = self._make_backend()
+        with self._lock:
+            self._stats = {}
+            self._invalidations = 0
+
+    def _make_backend(self):
+        if RESPONSE_CACHE_URL:
+            try:
+                backend = RedisBackend(RESPONSE_CACHE_URL)
+                backend.client.ping()
+                return backend
+            except Exception as e:
+                logger.warning(f"Response cache backend {RESPONSE_CACHE_URL} unavailable ({e}); "
+                               f"using a process-local cache")
+        return LocalBackend()
+
+    def serve(self, group: str, ttl: float, view: Callable[[], object]):
+        """Return the cached response for the current request, or build and cache it"""
+        if not self.enabled:
+            return view()
+
+        key = request.full_path
+        endpoint = request.endpoint or request.path
+        try:
+            generation = self.backend.generation(group)
+            body = self.backend.get(group, key, generation)
+        except Exception as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return view()
+
+        if body is not None:
+            self._record(endpoint, 'hits')
+            response = Response(body, status=200, mimetype='application/json')
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        self._record(endpoint, 'misses')
+        response = make_response(view())
+        if response.status_code == 200 and response.mimetype == 'application/json':
+            try:
+                self.backend.set(group, key, response.get_data(), ttl or self.default_ttl, generation)
+            except Exception as e:
+                logger.warning(f"Response cache write failed: {e}")
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def invalidate(self, *groups: str):
+        for group in groups:
+            try:
+                self.backend.invalidate(group)
+            except Exception as e:
+                logger.warning(f"Response cache invalidation of {group} failed: {e}")
+        with self._lock:
+            self._invalidations += len(groups)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._stats.items()}
+            invalidations = self._invalidations
+        for counts in endpoints.values():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = round(counts['hits'] / lookups, 4) if lookups else 0.0
+        hits = sum(c['hits'] for c in endpoints.values())
+        misses = sum(c['misses'] for c in endpoints.values())
+        return {
+            'enabled': self.enabled,
+            'backend': self.backend.name,
+            'default_ttl': self.default_ttl,
+            'entries': self.backend.size(),
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'invalidations': invalidations,
+            'endpoints': endpoints,
+        }
+
+    def _record(self, endpoint: str, outcome: str):
+        with self._lock:
+            counts = self._stats.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            counts[outcome] += 1
+
+
+# Global response cache, bound to the app in create_app
+response_cache = ResponseCache()
+
+
+def cached(group: str = DETECTIONS, ttl: float = None, unless: Callable[[], bool] = None):
+    """
+    Cache a view's JSON response in ``group`` (see ResponseCache.serve).
+
+    ``unless`` is called per request; when it returns True the view runs uncached.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if unless is not None and unless():
+                return view(*args, **kwargs)
+            return response_cache.serve(group, ttl, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def mark_changed(session, *groups: str):
+    """Invalidate ``groups`` once the session's current transaction commits"""
+    session.info.setdefault('response_cache_groups', set()).update(groups or (DETECTIONS,))
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_changed_rows(session, flush_context):
+    # Imported here: app.models imports app, which imports this module's users
+    from app.models import Detection, Camera, DetectionStat
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Detection, Camera, DetectionStat)):
+            mark_changed(session, DETECTIONS)
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    groups = session.info.pop('response_cache_groups', None)
+    if groups:
+        response_cache.invalidate(*groups)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop('response_cache_groups', None)
@@ -0,0 +1,134 @@
+"""
+Circuit Breaker - stop calling a notification provider that is failing
+
+Each provider (Twilio, Africa's Talking, SMTP) gets a breaker that keeps
+the outcome of its last ``BREAKER_WINDOW`` calls. Once at least
+``BREAKER_MIN_CALLS`` have been made and ``BREAKER_FAILURE_RATE`` of them
+failed, the breaker opens: sends fail immediately (and are retried later by
+the outbox) instead of tying up sender threads on timeouts. After
+``BREAKER_OPEN_SECONDS`` one probe call is let through (half-open); it
+closes the breaker on success and re-opens it on failure.
+"""
+import threading
+import time
+import logging
+from collections import deque
+from typing import Dict
+
+from config.detection_config import (
+    BREAKER_FAILURE_RATE, BREAKER_MIN_CALLS, BREAKER_WINDOW, BREAKER_OPEN_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = BREAKER_FAILURE_RATE, min_calls: int = BREAKER_MIN_CALLS,
+                 window: int = BREAKER_WINDOW, open_seconds: float = BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self._stats = {
+            'calls': 0,
+            'failures': 0,
+            'rejected': 0,
+            'opened': 0,
+            'latency_ms_total': 0.0,
+            'latency_ms_max': 0.0,
+        }
+
+    def allow(self) -> bool:
+        """Whether a call may be made now; every allowed call must be followed by record()"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._stats['rejected'] += 1
+            return False
+
+    def record(self, success: bool, elapsed_ms: float):
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['latency_ms_total'] += elapsed_ms
+            self._stats['latency_ms_max'] = max(self._stats['latency_ms_max'], elapsed_ms)
+            if not success:
+                self._stats['failures'] += 1
+
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"Circuit for {self.name} closed")
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if self.state == CLOSED and len(self._outcomes) >= self.min_calls \
+                    and failures / len(self._outcomes) >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._stats['opened'] += 1
+        logger.warning(f"Circuit for {self.name} opened; calls fail fast for {self.open_seconds}s")
+
+    def reset(self):
+        with self._lock:
+            self.state = CLOSED
+            self._outcomes.clear()
+            self._probing = False
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            recent = list(self._outcomes)
+            state = self.state
+        total_ms = stats.pop('latency_ms_total')
+        return {
+            'state': state,
+            'recent_failure_rate': round(recent.count(False) / len(recent), 4) if recent else 0.0,
+            'latency_ms': {
+                'avg': round(total_ms / stats['calls'], 3) if stats['calls'] else 0.0,
+                'max': round(stats.pop('latency_ms_max'), 3),
+            },
+            **stats,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker of a provider"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def metrics() -> Dict[str, Dict]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.metrics() for b in breakers}
@@ -0,0 +1,272 @@
+"""
+Cooldown Service - one alert per (camera, species) per cooldown window
+
+A herd in front of one camera produces a detection every few seconds;
+texting every subscriber for each of them buries the first alert. The
+first detection of a (camera, species) alerts immediately and opens an
+``ALERT_COOLDOWN`` window. Detections inside the window are folded into a
+single digest notification ("4 more elephant detections at cam_001 in the
+last 10 min"), written to the outbox to go out when the window closes.
+
+Windows are held in memory and written through to ``alert_cooldowns`` in
+the detection's transaction, so a restart neither re-alerts nor loses a
+pending digest. The table decides whenever the memory of this process
+cannot: a window is opened with a conditional upsert that only replaces an
+expired row, and an open row is read under a row lock, so web workers
+sharing the database send one alert per window between them.
+
+Windows follow the detections' own timestamps, which edge relays report
+for detections buffered while offline. Detections older than
+``ALERT_STALE_AFTER`` are not alerted at all: each (camera, species) of a
+transaction gets one catch-up digest for them, sent right away, and they
+leave the live windows alone so a backlog cannot mute a live alert.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.models import AlertCooldown, Detection, OutboxMessage
+from app.services.priority_service import priority_of
+from config.detection_config import ALERT_COOLDOWN, ALERT_STALE_AFTER
+
+logger = logging.getLogger(__name__)
+
+# Outcomes of CooldownEngine.route
+ALERT = 'alert'
+COOLDOWN = 'cooldown'
+LATE = 'late'
+
+LATE_KEY_PREFIX = 'late:'  # idempotency keys of catch-up digests
+
+
+class Window:
+    """Open cooldown window of one (camera, species)"""
+
+    __slots__ = ('start', 'end', 'digest_id')
+
+    def __init__(self, start: datetime, end: datetime, digest_id: Optional[int] = None):
+        self.start = start
+        self.end = end
+        self.digest_id = digest_id
+
+
+class CooldownEngine:
+    def __init__(self, cooldown: float = ALERT_COOLDOWN, stale_after: float = ALERT_STALE_AFTER):
+        """
+        Args:
+            cooldown: Seconds after an alert during which detections of the
+                same camera and species go into a digest (0 disables)
+            stale_after: Age in seconds past which a detection goes into a
+                catch-up digest instead of alerting
+        """
+        self.cooldown = timedelta(seconds=cooldown)
+        self.stale_after = timedelta(seconds=stale_after)
+        self._windows: Optional[Dict[Tuple[str, str], Window]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[Tuple[str, str], Window]:
+        if self._windows is None:
+            now = datetime.utcnow()
+            self._windows = {(row.camera_id, row.species): Window(row.window_start, row.window_end, row.digest_id)
+                             for row in AlertCooldown.query.filter(AlertCooldown.window_end > now).all()}
+            logger.info(f"Loaded {len(self._windows)} open alert cooldowns")
+        return self._windows
+
+    def invalidate(self):
+        with self._lock:
+            self._windows = None
+
+    def route(self, detection: Detection, session) -> Tuple[str, OutboxMessage]:
+        """
+        Add the notification for a flushed detection to the session: an
+        immediate alert, the detection folded into its window's digest, or
+        (if it is stale) into the transaction's catch-up digest.
+
+        Returns:
+            (ALERT, COOLDOWN or LATE, the outbox row)
+        """
+        now = datetime.utcnow()
+        # When the detection was made; relays may report it long after
+        at = min(detection.timestamp or now, now)
+        if now - at > self.stale_after:
+            return LATE, self._late(detection, session)
+        if self.cooldown <= timedelta(0):
+            return ALERT, self._alert(detection, session)
+
+        key = (detection.camera_id or '', detection.species)
+        with self._lock:
+            windows = self._load()
+            window = windows.get(key)
+            if window is None or at >= window.end or window.digest_id is None:
+                # Another process may have opened the window or its digest since
+                window = self._open_or_join(key, at, session)
+                session.info['cooldowns_changed'] = True
+                if window is None:
+                    windows[key] = Window(at, at + self.cooldown)
+                    return ALERT, self._alert(detection, session)
+                windows[key] = window
+
+            digest = self._fold(detection, window, session)
+            if digest is not None:
+                return COOLDOWN, digest
+
+            # The digest is already on its way out; alert and start a new window
+            message = self._alert(detection, session)
+            windows[key] = Window(at, at + self.cooldown)
+            session.execute(AlertCooldown.__table__.update().where(self._match(key)).values(
+                window_start=at, window_end=at + self.cooldown, digest_id=None))
+            session.info['cooldowns_changed'] = True
+            return ALERT, message
+
+    @staticmethod
+    def _match(key: Tuple[str, str]):
+        table = AlertCooldown.__table__
+        return (table.c.camera_id == key[0]) & (table.c.species == key[1])
+
+    def _open_or_join(self, key: Tuple[str, str], at: datetime, session) -> Optional[Window]:
+        """
+        Open a window for ``key`` at ``at`` in the table, unless one is open then.
+
+        Returns:
+            None if this call opened the window, else the open window (its row
+            stays locked until the transaction ends)
+        """
+        table = AlertCooldown.__table__
+        values = {'camera_id': key[0], 'species': key[1], 'window_start': at,
+                  'window_end': at + self.cooldown, 'digest_id': None}
+
+        dialect = session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            stmt = upsert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.camera_id, table.c.species],
+                set_={c: stmt.excluded[c] for c in ('window_start', 'window_end', 'digest_id')},
+                where=table.c.window_end <= at
+            )
+            if session.execute(stmt).rowcount == 1:
+                return None
+
+        row = session.execute(
+            select(AlertCooldown).where(AlertCooldown.camera_id == key[0], AlertCooldown.species == key[1])
+            .with_for_update().execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if row is None:
+            session.execute(table.insert().values(**values))
+            return None
+        if row.window_end <= at:
+            session.execute(table.update().where(self._match(key)).values(
+                window_start=at, window_end=at + self.cooldown, digest_id=None))
+            return None
+        return Window(row.window_start, row.window_end, row.digest_id)
+
+    @staticmethod
+    def _alert(detection: Detection, session) -> OutboxMessage:
+        message = OutboxMessage(detection_id=detection.id, idempotency_key=f'detection:{detection.id}',
+                                priority=priority_of(detection))
+        session.add(message)
+        return message
+
+    @staticmethod
+    def _late(detection: Detection, session) -> OutboxMessage:
+        """Count a stale detection in its camera and species' catch-up digest of this transaction"""
+        key = (detection.camera_id or '', detection.species)
+        digests = session.info.setdefault('late_digests', {})
+        entry = digests.get(key)
+        if entry is None:
+            digest = OutboxMessage(
+                detection_id=detection.id,
+                idempotency_key=f"{LATE_KEY_PREFIX}{key[0]}:{key[1]}:{detection.id}",
+                kind='digest',
+                priority=priority_of(detection),
+                digest_count=1,
+                digest_since=detection.timestamp,
+                next_attempt_at=datetime.utcnow()
+            )
+            session.add(digest)
+            digests[key] = (digest, detection.timestamp)
+            return digest
+
+        digest, latest = entry
+        # Only this transaction sees the row, so the count is kept in Python
+        digest.digest_count += 1
+        digest.digest_since = min(digest.digest_since, detection.timestamp)
+        digest.priority = max(digest.priority, priority_of(detection))
+        if detection.timestamp >= latest:
+            digest.detection_id = detection.id
+            digests[key] = (digest, detection.timestamp)
+        return digest
+
+    def _fold(self, detection: Detection, window: Window, session) -> Optional[OutboxMessage]:
+        """Count the detection in the window's digest, opening the digest if needed"""
+        if window.digest_id is None:
+            camera_id, species = detection.camera_id or '', detection.species
+            digest = OutboxMessage(
+                detection_id=detection.id,
+                idempotency_key=f"digest:{camera_id}:{species}:{window.start:%Y%m%dT%H%M%S%f}",
+                kind='digest',
+                priority=priority_of(detection),
+                digest_count=1,
+                digest_since=window.start,
+                next_attempt_at=window.end
+            )
+            session.add(digest)
+            session.flush()
+            window.digest_id = digest.id
+            # The row was locked by _open_or_join, so no other process is adding a digest
+            session.execute(AlertCooldown.__table__.update().where(self._match((camera_id, species)))
+                            .values(digest_id=digest.id))
+            session.info['cooldowns_changed'] = True
+            return digest
+
+        digest = session.get(OutboxMessage, window.digest_id)
+        if digest is None or digest.status != 'pending':
+            # Already on its way out; the detection gets an alert of its own
+            return None
+        digest.detection_id = detection.id
+        digest.priority = max(digest.priority or 0, priority_of(detection))
+        # Incremented in SQL: other sessions may be folding into the same digest.
+        # Flushed right away, or a second fold before the flush would replace this one
+        digest.digest_count = OutboxMessage.digest_count + 1
+        session.flush()
+        return digest
+
+    def windows(self) -> Dict[str, Dict]:
+        """Open windows by 'camera:species'"""
+        now = datetime.utcnow()
+        with self._lock:
+            return {f'{camera_id}:{species}': {'window_start': w.start.isoformat(), 'window_end': w.end.isoformat(),
+                                               'digest_id': w.digest_id}
+                    for (camera_id, species), w in self._load().items() if w.end > now}
+
+
+# Global cooldown state
+cooldown_engine = CooldownEngine()
+
+
+def outcome_of(message: OutboxMessage) -> str:
+    """ALERT, COOLDOWN or LATE, as returned by CooldownEngine.route for this outbox row"""
+    if message.kind != 'digest':
+        return ALERT
+    return LATE if message.idempotency_key.startswith(LATE_KEY_PREFIX) else COOLDOWN
+
+
+@event.listens_for(Session, 'after_commit')
+def _keep_cooldowns(session):
+    session.info.pop('cooldowns_changed', None)
+    session.info.pop('late_digests', None)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _reload_cooldowns(session, previous_transaction):
+    session.info.pop('late_digests', None)
+    # Windows opened in the rolled-back transaction never happened; reread the table
+    if session.info.pop('cooldowns_changed', False):
+        cooldown_engine.invalidate()
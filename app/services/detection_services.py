@@ -4,13 +4,21 @@ Supports both mock (simulated) and real (YOLOv8) detection modes
 """
 
 import os
-from typing import List, Dict, Tuple
+from datetime import datetime
+from typing import Callable, List, Dict, Tuple
+from sqlalchemy import insert
 from app.models import Detection
 from app.models.alert import Alert
 from app import db
+from app.services import cache_service, stats_service, rollup_service, outbox_service
+from app.services.cooldown_service import outcome_of
+from app.services.geofence_service import geofence_service
+from app.services.burst_service import Burst, aggregate_burst
+from app.services.write_queue import write_queue
 from ml.detector import get_detector
+from ml.tracker import ObjectTracker
 from ml.species_classifier import SpeciesClassifier
-from config.detection_config import DETECTION_MODE, ALERT_THRESHOLD
+from config.detection_config import DETECTION_MODE, ALERT_THRESHOLD, BURST_VOTING
 import logging
 
 logger = logging.getLogger(__name__)
@@ -44,7 +52,9 @@ class DetectionService:
     
     def process_image(self, image_path: str, latitude: float = None, 
                      longitude: float = None, conf_threshold: float = 0.5,
-                     socketio = None, camera_id: str = None, alert_callback=None) -> Tuple[List[Detection], bool]:
+                     socketio = None, camera_id: str = None, alert_callback=None,
+                     tracker: ObjectTracker = None, write_behind: bool = False,
+                     notify: bool = False) -> Tuple[List[Detection], bool]:
         """
         Process an image and save detections to database
         
@@ -56,16 +66,20 @@ class DetectionService:
             socketio: SocketIO instance for real-time notifications
             camera_id: Camera identifier (optional)
             alert_callback: Function to call when detection found (for alerts)
+            notify: Queue subscriber notifications for new detections at or
+                above ALERT_THRESHOLD in the same transaction (outbox_service)
+            tracker: Per-camera ObjectTracker for stream frames (optional). When
+                given, only new tracks and periodic track updates are stored,
+                and only new tracks trigger alerts
+            write_behind: Hand the rows to the write-behind queue instead of
+                committing here; the returned list is then empty
         
         Returns:
             Tuple of (list of Detection objects, success flag)
         """
+        events = None
         try:
-            # Use camera location if camera_id provided
-            if camera_id and camera_id in self.cameras:
-                cam_info = self.cameras[camera_id]
-                latitude = latitude or cam_info['lat']
-                longitude = longitude or cam_info['lng']
+            latitude, longitude = self._resolve_location(camera_id, latitude, longitude)
             
             # Run detection
             detection_results = self.detector.detect(
@@ -76,64 +90,323 @@ class DetectionService:
             )
             
             # Save detections to database and trigger alerts
-            saved_detections = []
-            for result in detection_results:
-                # Classify species with confidence
-                species_info = self.classifier.classify_from_detection({
-                    'class_name': result.species,
-                    'confidence': result.confidence
-                })
-                
-                detection = Detection(
-                    species=species_info['species'],
-                    confidence=species_info['confidence'],
-                    latitude=result.latitude,
-                    longitude=result.longitude,
-                    image_path=result.image_path,
-                    camera_id=camera_id
-                )
-                db.session.add(detection)
-                saved_detections.append(detection)
+            on_commit = None
+            if tracker is not None:
+                events = tracker.update(detection_results)
+                rows, new_flags = self._track_rows(events, camera_id)
+                # Tracks count as reported only once their rows are committed
+                on_commit = lambda committed: (tracker.confirm if committed else tracker.release)(events)
+            else:
+                rows = self._result_rows(detection_results, camera_id)
+                new_flags = None
+            saved_detections = self._persist(rows, new_flags, socketio, alert_callback, write_behind, notify,
+                                             on_commit)
             
-            db.session.commit()
+            logger.info(f"Successfully processed {image_path}: {len(saved_detections)} detections")
+            return saved_detections, True
+        
+        except Exception as e:
+            logger.error(f"Error processing image {image_path}: {e}")
+            db.session.rollback()
+            if events:
+                tracker.release(events)
+            return [], False
+    
+    def process_batch(self, image_paths: List[str], latitude: float = None,
+                      longitude: float = None, conf_threshold: float = 0.5,
+                      socketio = None, camera_id: str = None, alert_callback=None,
+                      write_behind: bool = False, notify: bool = False) -> Tuple[List[Detection], bool]:
+        """
+        Process several images from the same camera in one inference call
+        and persist all resulting detections in a single transaction
+        
+        Args:
+            image_paths: Paths to the image files
+            latitude: GPS latitude (optional, will use camera location if camera_id provided)
+            longitude: GPS longitude (optional, will use camera location if camera_id provided)
+            conf_threshold: Confidence threshold (default 0.5)
+            socketio: SocketIO instance for real-time notifications
+            camera_id: Camera identifier (optional)
+            alert_callback: Function to call when detection found (for alerts)
+            notify: Queue subscriber notifications for new detections at or
+                above ALERT_THRESHOLD in the same transaction (outbox_service)
+            write_behind: Hand the rows to the write-behind queue instead of
+                committing here; the returned list is then empty
+        
+        Returns:
+            Tuple of (list of Detection objects, success flag)
+        """
+        if not image_paths:
+            return [], True
+        
+        try:
+            latitude, longitude = self._resolve_location(camera_id, latitude, longitude)
             
-            # Trigger alerts for high-confidence detections
-            if alert_callback:
-                for detection in saved_detections:
-                    if detection.confidence >= ALERT_THRESHOLD:  # Use config threshold
-                        alert_callback(detection)
+            batch_results = self.detector.detect_batch(
+                image_paths=image_paths,
+                latitude=latitude,
+                longitude=longitude,
+                conf_threshold=conf_threshold
+            )
             
-            # Emit real-time notifications
-            if socketio and saved_detections:
-                for detection in saved_detections:
-                    socketio.emit('new_detection', detection.to_dict(), namespace='/')
-                logger.info(f"Emitted {len(saved_detections)} detection notifications")
+            rows = self._result_rows([r for results in batch_results for r in results], camera_id)
+            saved_detections = self._persist(rows, None, socketio, alert_callback, write_behind, notify)
             
-            logger.info(f"Successfully processed {image_path}: {len(saved_detections)} detections")
+            logger.info(f"Successfully processed batch of {len(image_paths)} images: "
+                        f"{len(saved_detections)} detections")
             return saved_detections, True
         
         except Exception as e:
-            logger.error(f"Error processing image {image_path}: {e}")
+            logger.error(f"Error processing batch of {len(image_paths)} images: {e}")
             db.session.rollback()
             return [], False
     
+    def process_alerts(self, rows: List[Dict], socketio=None) -> Tuple[List[Detection], List[str]]:
+        """
+        Store detections reported by edge devices (already classified) in one
+        transaction, queueing a notification for each as /api/alert does
+        
+        Cooldowns are applied in the order the detections were made, by their
+        timestamps; stale ones go into catch-up digests (cooldown_service)
+        
+        Args:
+            rows: Insert rows (see alert_batch_service.validate_batch)
+            socketio: SocketIO instance for real-time notifications
+        
+        Returns:
+            Tuple of (Detection objects in row order, the notification
+            outcome of each: cooldown_service ALERT, COOLDOWN or LATE)
+        """
+        try:
+            saved_detections = self._bulk_insert(rows)
+            order = sorted(range(len(saved_detections)), key=lambda i: saved_detections[i].timestamp)
+            messages = outbox_service.enqueue([saved_detections[i] for i in order])
+            # Read before the commit expires the outbox rows
+            outcomes = [None] * len(saved_detections)
+            for i, message in zip(order, messages):
+                outcomes[i] = outcome_of(message)
+            self._commit(saved_detections)
+        except Exception:
+            db.session.rollback()
+            raise
+        self._after_commit(saved_detections, socketio, alert_detections=[])
+        return saved_detections, outcomes
+    
+    def process_bursts(self, bursts: List[Burst], conf_threshold: float = 0.5,
+                       voting: str = BURST_VOTING, socketio = None,
+                       alert_callback=None, write_behind: bool = False,
+                       notify: bool = False) -> Tuple[List[Detection], bool]:
+        """
+        Process camera-trap bursts and store one detection per species per burst
+        
+        All frames of all bursts go through a single inference call and the
+        resulting events are persisted in a single transaction.
+        
+        Args:
+            bursts: Bursts from burst_service.group_bursts
+            conf_threshold: Confidence threshold (default 0.5)
+            voting: How frame confidences are combined ('max' or 'mean')
+            socketio: SocketIO instance for real-time notifications
+            alert_callback: Function to call when detection found (for alerts)
+            notify: Queue subscriber notifications for new detections at or
+                above ALERT_THRESHOLD in the same transaction (outbox_service)
+            write_behind: Hand the rows to the write-behind queue instead of
+                committing here; the returned list is then empty
+        
+        Returns:
+            Tuple of (list of Detection objects, success flag)
+        """
+        if not bursts:
+            return [], True
+        
+        frame_count = sum(len(b) for b in bursts)
+        try:
+            events = []
+            # Bursts from different cameras have different default locations,
+            # so run one inference batch per camera
+            by_camera = {}
+            for burst in bursts:
+                by_camera.setdefault(burst.camera_id, []).append(burst)
+            
+            for camera_id, camera_bursts in by_camera.items():
+                latitude, longitude = self._resolve_location(camera_id, None, None)
+                frames = [p for b in camera_bursts for p in b.frames]
+                batch_results = self.detector.detect_batch(
+                    image_paths=frames,
+                    latitude=latitude,
+                    longitude=longitude,
+                    conf_threshold=conf_threshold
+                )
+                
+                offset = 0
+                for burst in camera_bursts:
+                    frame_results = batch_results[offset:offset + len(burst)]
+                    offset += len(burst)
+                    for event in aggregate_burst(frame_results, voting=voting):
+                        events.append((burst, event))
+            
+            species_infos = self.classifier.classify_batch([
+                {'class_name': event['species'], 'confidence': event['confidence']}
+                for _, event in events
+            ])
+            rows = [{
+                'species': info['species'],
+                'confidence': info['confidence'],
+                'latitude': event['latitude'],
+                'longitude': event['longitude'],
+                'image_path': event['image_path'],
+                'camera_id': burst.camera_id,
+                'frame_count': event['frame_count'],
+                'timestamp': datetime.utcfromtimestamp(burst.start)
+            } for (burst, event), info in zip(events, species_infos)]
+            saved_detections = self._persist(rows, None, socketio, alert_callback, write_behind, notify)
+            
+            logger.info(f"Successfully processed {len(bursts)} bursts ({frame_count} frames): "
+                        f"{len(saved_detections)} events")
+            return saved_detections, True
+        
+        except Exception as e:
+            logger.error(f"Error processing {len(bursts)} bursts ({frame_count} frames): {e}")
+            db.session.rollback()
+            return [], False
+    
+    def _resolve_location(self, camera_id: str, latitude: float, longitude: float) -> Tuple[float, float]:
+        """Fill in missing coordinates from the known camera location"""
+        if camera_id and camera_id in self.cameras:
+            cam_info = self.cameras[camera_id]
+            latitude = latitude or cam_info['lat']
+            longitude = longitude or cam_info['lng']
+        return latitude, longitude
+    
+    def _result_rows(self, detection_results, camera_id: str = None) -> List[Dict]:
+        """Classify detector results in one call and build insert rows"""
+        species_infos = self.classifier.classify_batch([
+            {'class_name': r.species, 'confidence': r.confidence}
+            for r in detection_results
+        ])
+        return [{
+            'species': info['species'],
+            'confidence': info['confidence'],
+            'latitude': result.latitude,
+            'longitude': result.longitude,
+            'image_path': result.image_path,
+            'camera_id': camera_id
+        } for result, info in zip(detection_results, species_infos)]
+    
+    def _track_rows(self, events, camera_id: str = None) -> Tuple[List[Dict], List[bool]]:
+        """
+        Build one insert row per reported track
+        
+        Returns:
+            Tuple of (rows, flags marking rows for newly confirmed tracks)
+        """
+        # Classify once per track so periodic updates keep the same species
+        unclassified = [track for track, _ in events if track.species_info is None]
+        species_infos = self.classifier.classify_batch([
+            {'class_name': t.species, 'confidence': t.confidence} for t in unclassified
+        ])
+        for track, info in zip(unclassified, species_infos):
+            track.species_info = info
+        
+        rows = [{
+            'species': track.species_info['species'],
+            'confidence': round(track.confidence, 2),
+            'latitude': track.result.latitude,
+            'longitude': track.result.longitude,
+            'image_path': track.result.image_path,
+            'camera_id': camera_id,
+            'track_id': track.track_id
+        } for track, _ in events]
+        return rows, [event == 'new' for _, event in events]
+    
+    def _persist(self, rows: List[Dict], new_flags: List[bool] = None, socketio=None,
+                 alert_callback=None, write_behind: bool = False, notify: bool = False,
+                 on_commit: Callable = None) -> List[Detection]:
+        """
+        Store detection rows, then run alerts and real-time notifications
+        
+        Args:
+            rows: Insert rows from _result_rows/_track_rows
+            new_flags: Which rows may trigger alerts (default: all)
+            socketio: SocketIO instance for real-time notifications
+            alert_callback: Function to call when detection found (for alerts)
+            notify: Queue subscriber notifications for new detections at or
+                above ALERT_THRESHOLD in the same transaction (outbox_service)
+            write_behind: Queue the rows for the writer thread instead of
+                committing now; falls back to a synchronous write when the
+                queue stays full
+            on_commit: Called with True once the rows are committed; the
+                writer thread calls it with False if it drops them
+        
+        Returns:
+            The committed Detection objects (empty when queued)
+        """
+        if new_flags is None:
+            new_flags = [True] * len(rows)
+        
+        if write_behind and write_queue.app is not None:
+            if write_queue.submit(rows, new_flags, socketio, alert_callback, notify, on_commit):
+                return []
+            logger.warning(f"Write queue full; writing {len(rows)} detections synchronously")
+        
+        saved_detections = self._bulk_insert(rows)
+        alert_detections = [d for d, is_new in zip(saved_detections, new_flags) if is_new]
+        if notify:
+            self._enqueue_notifications(alert_detections)
+        self._commit(saved_detections)
+        if on_commit:
+            on_commit(True)
+        self._after_commit(saved_detections, socketio, alert_callback, alert_detections)
+        return saved_detections
+    
+    def _bulk_insert(self, rows: List[Dict]) -> List[Detection]:
+        """Insert all rows with a single multi-row INSERT ... RETURNING"""
+        if not rows:
+            return []
+        # sort_by_parameter_order would make SQLite fall back to one INSERT per
+        # row; ids of a multi-row VALUES insert are assigned in row order, so
+        # sorting by id restores the input order instead
+        saved = db.session.scalars(insert(Detection).returning(Detection), rows).all()
+        # Bulk inserts skip the ORM flush, so count them here in the same transaction
+        stats_service.record_inserted(saved)
+        rollup_service.record_inserted(saved)
+        cache_service.mark_changed(db.session, cache_service.DETECTIONS)
+        return sorted(saved, key=lambda d: d.id)
+    
+    def _enqueue_notifications(self, detections: List[Detection]):
+        """Add outbox notifications for alert-worthy detections to the open transaction"""
+        outbox_service.enqueue(d for d in detections if d.confidence >= ALERT_THRESHOLD)
+    
+    def _commit(self, saved_detections: List[Detection]):
+        """Commit and reload the committed rows with one SELECT instead of one per object"""
+        ids = [d.id for d in saved_detections]
+        db.session.commit()
+        if ids:
+            Detection.query.filter(Detection.id.in_(ids)).all()
+    
+    def _after_commit(self, saved_detections: List[Detection], socketio=None, alert_callback=None,
+                      alert_detections: List[Detection] = None):
+        """Trigger alerts and real-time notifications for committed detections"""
+        if alert_detections is None:
+            alert_detections = saved_detections
+        
+        # Trigger alerts for high-confidence detections
+        if alert_callback:
+            for detection in alert_detections:
+                if detection.confidence >= ALERT_THRESHOLD:  # Use config threshold
+                    alert_callback(detection)
+        
+        # Emit real-time notifications as one batch event
+        if socketio and saved_detections:
+            socketio.emit('new_detections', [d.to_dict() for d in saved_detections], namespace='/')
+            logger.info(f"Emitted {len(saved_detections)} detection notifications")
+        
+        # Flag detections inside village/farm/corridor geofences
+        geofence_service.check_detections(saved_detections, socketio)
+    
     def get_stats(self) -> Dict:
-        """Get detection statistics"""
-        total = Detection.query.count()
-        verified = Detection.query.filter_by(is_verified=True).count()
-        false_positives = Detection.query.filter_by(is_false_positive=True).count()
-        
-        species_counts = db.session.query(
-            Detection.species, 
-            db.func.count(Detection.id).label('count')
-        ).group_by(Detection.species).all()
-        
-        return {
-            'total_detections': total,
-            'verified': verified,
-            'false_positives': false_positives,
-            'species': {s: c for s, c in species_counts}
-        }
+        """Get detection statistics (read from the detection_stats counters)"""
+        return stats_service.get_stats()
     
     def switch_mode(self, use_mock: bool):
         """Switch between mock and real detection"""
@@ -0,0 +1,228 @@
+"""
+Geofence Service - which village, farm or corridor polygons a detection is in
+
+Active geofences are held in memory in an STR-packed R-tree of their
+bounding boxes. A lookup walks the tree down to the few polygons whose box
+contains the point and ray-casts only those, so a detection is checked
+against hundreds of polygons in microseconds. The tree is rebuilt after
+any commit in this process that changes a geofence; other processes notice
+the change through the ``geofences`` row of registry_versions.
+
+A detection inside a fence that covers its species is a breach and is
+pushed to dashboards as a ``geofence_breach`` Socket.IO event.
+"""
+import logging
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Geofence, RegistryVersion
+from app.services.stats_service import upsert_increment
+from config.detection_config import GEOFENCE_VERSION_CHECK
+
+logger = logging.getLogger(__name__)
+
+GEOFENCES = 'geofences'  # registry_versions row bumped whenever geofences change
+
+# (min_lat, min_lng, max_lat, max_lng)
+BBox = Tuple[float, float, float, float]
+
+
+def point_in_polygon(lat: float, lng: float, vertices: Sequence[Tuple[float, float]]) -> bool:
+    """Even-odd ray casting test of a point against [lat, lng] polygon vertices"""
+    inside = False
+    lat_j, lng_j = vertices[-1]
+    for lat_i, lng_i in vertices:
+        if (lat_i > lat) != (lat_j > lat) and \
+                lng < (lng_j - lng_i) * (lat - lat_i) / (lat_j - lat_i) + lng_i:
+            inside = not inside
+        lat_j, lng_j = lat_i, lng_i
+    return inside
+
+
+class STRTree:
+    """
+    Static R-tree over bounding boxes, bulk-loaded with Sort-Tile-Recursive.
+
+    Nodes are (bbox, children, item) tuples; leaves have no children.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[BBox, object]], node_capacity: int = 8):
+        self.node_capacity = node_capacity
+        nodes = [(bbox, None, item) for bbox, item in entries]
+        self.size = len(nodes)
+        while len(nodes) > node_capacity:
+            nodes = self._pack(nodes)
+        self._root = (self._union(nodes), nodes, None) if nodes else None
+
+    def _pack(self, nodes: List[Tuple]) -> List[Tuple]:
+        """Group nodes into parents of node_capacity, tiling by longitude then latitude"""
+        capacity = self.node_capacity
+        parent_count = math.ceil(len(nodes) / capacity)
+        slice_size = math.ceil(math.sqrt(parent_count)) * capacity
+
+        by_lng = sorted(nodes, key=lambda node: node[0][1] + node[0][3])
+        parents = []
+        for start in range(0, len(by_lng), slice_size):
+            vertical_slice = sorted(by_lng[start:start + slice_size], key=lambda node: node[0][0] + node[0][2])
+            for group_start in range(0, len(vertical_slice), capacity):
+                children = vertical_slice[group_start:group_start + capacity]
+                parents.append((self._union(children), children, None))
+        return parents
+
+    @staticmethod
+    def _union(nodes: List[Tuple]) -> BBox:
+        return (min(n[0][0] for n in nodes), min(n[0][1] for n in nodes),
+                max(n[0][2] for n in nodes), max(n[0][3] for n in nodes))
+
+    def query_point(self, lat: float, lng: float) -> List[object]:
+        """Items whose bounding box contains the point"""
+        return self.query_box((lat, lng, lat, lng))
+
+    def query_box(self, bbox: BBox) -> List[object]:
+        """Items whose bounding box intersects bbox"""
+        if self._root is None:
+            return []
+        q_min_lat, q_min_lng, q_max_lat, q_max_lng = bbox
+        found, stack = [], [self._root]
+        while stack:
+            (min_lat, min_lng, max_lat, max_lng), children, item = stack.pop()
+            if min_lat > q_max_lat or max_lat < q_min_lat or min_lng > q_max_lng or max_lng < q_min_lng:
+                continue
+            if children is None:
+                found.append(item)
+            else:
+                stack.extend(children)
+        return found
+
+
+class Fence:
+    """In-memory copy of an active Geofence"""
+
+    __slots__ = ('id', 'name', 'zone_type', 'species', 'vertices', 'bbox')
+
+    def __init__(self, geofence: Geofence):
+        self.id = geofence.id
+        self.name = geofence.name
+        self.zone_type = geofence.zone_type
+        self.species = frozenset(geofence.species_list)
+        self.vertices = tuple(tuple(vertex) for vertex in geofence.vertices)
+        self.bbox = (geofence.min_lat, geofence.min_lng, geofence.max_lat, geofence.max_lng)
+
+    def covers(self, species: Optional[str]) -> bool:
+        return not self.species or species in self.species
+
+    def to_dict(self) -> Dict:
+        return {'id': self.id, 'name': self.name, 'zone_type': self.zone_type}
+
+
+def geofence_version() -> int:
+    """Version stamp of the geofences table, shared by every process using the database"""
+    return db.session.query(RegistryVersion.version).filter_by(name=GEOFENCES).scalar() or 0
+
+
+class GeofenceService:
+    def __init__(self):
+        self._tree: Optional[STRTree] = None
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def tree(self) -> STRTree:
+        """
+        STR-tree of the active geofences, loaded on first use.
+
+        Changes committed in this process drop the tree right away; changes
+        made by other processes are noticed by checking the version stamp at
+        most every ``GEOFENCE_VERSION_CHECK`` seconds.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._tree is not None and now - self._checked < GEOFENCE_VERSION_CHECK:
+                return self._tree
+            version = geofence_version()
+            if self._tree is None or self._version != version:
+                fences = [Fence(g) for g in Geofence.query.filter_by(is_active=True).all()]
+                self._tree = STRTree((fence.bbox, fence) for fence in fences)
+                self._version = version
+                logger.info(f"Loaded {len(fences)} geofences (version {version})")
+            self._checked = now
+            return self._tree
+
+    def invalidate(self):
+        with self._lock:
+            self._tree = None
+
+    def find(self, lat: float, lng: float, species: str = None) -> List[Fence]:
+        """Active geofences containing the point (and covering ``species``, if given)"""
+        return [fence for fence in self.tree().query_point(lat, lng)
+                if (species is None or fence.covers(species))
+                and point_in_polygon(lat, lng, fence.vertices)]
+
+    def near(self, lat: float, lng: float, margin_km: float, species: str = None) -> List[Fence]:
+        """Active geofences whose bounding box is within margin_km of the point"""
+        margin_lat = margin_km / 111.32
+        margin_lng = margin_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+        return [fence for fence in self.tree().query_box((lat - margin_lat, lng - margin_lng,
+                                                          lat + margin_lat, lng + margin_lng))
+                if species is None or fence.covers(species)]
+
+    def check_detections(self, detections: Iterable, socketio=None) -> List[Dict]:
+        """
+        Classify detections against the geofences and emit a geofence_breach
+        event per (detection, fence) breach.
+
+        Returns:
+            List of breaches, each with detection (dict) and geofence
+        """
+        breaches = []
+        try:
+            for detection in detections:
+                if detection.is_false_positive:
+                    continue
+                for fence in self.find(detection.latitude, detection.longitude, detection.species):
+                    breaches.append({'detection': detection.to_dict(), 'geofence': fence.to_dict()})
+        except Exception as e:
+            logger.error(f"Geofence check failed: {e}")
+            return breaches
+
+        for breach in breaches:
+            logger.warning(f"Geofence breach: {breach['detection']['species']} in "
+                           f"{breach['geofence']['name']} ({breach['geofence']['zone_type']})")
+            if socketio:
+                try:
+                    socketio.emit('geofence_breach', breach, namespace='/')
+                except Exception as e:
+                    logger.error(f"Failed to emit geofence_breach: {e}")
+        return breaches
+
+
+# Global geofence index
+geofence_service = GeofenceService()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_geofence_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Geofence):
+            # Bumped in the same transaction, so other processes see the stamp and the rows together
+            upsert_increment(RegistryVersion.__table__, ['name'], [{'name': GEOFENCES, 'version': 1}],
+                             session.connection())
+            session.info['geofences_stale'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _reload_geofences(session):
+    if session.info.pop('geofences_stale', False):
+        geofence_service.invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _keep_geofences(session, previous_transaction):
+    session.info.pop('geofences_stale', None)
@@ -0,0 +1,348 @@
+"""
+Ingest Service - watch a camera-trap drop folder and run batched detection
+
+Sync jobs copy camera-trap JPEGs into a folder (optionally one sub-folder per
+camera). The watcher picks new files up via inotify (through ``watchdog``)
+or, when that is not available, by polling the folder. Files are grouped
+into camera-trap bursts and the bursts into batches, so the detector can run
+one inference call per batch and ``DetectionService.process_bursts`` can
+persist each batch, one event per burst, in one transaction.
+
+A failed batch is retried after ``INGEST_RETRY_DELAY`` (doubling), one
+burst per batch so a bad image only holds back its own burst. Files that
+still fail after ``INGEST_MAX_ATTEMPTS`` are skipped; they stay on disk.
+"""
+import os
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Set
+
+from app.services.burst_service import Burst, group_bursts
+from app.services.detection_services import get_detection_service
+from config.detection_config import (
+    INGEST_BATCH_SIZE, INGEST_BATCH_TIMEOUT, INGEST_POLL_INTERVAL, INGEST_SETTLE_TIME,
+    INGEST_MAX_ATTEMPTS, INGEST_RETRY_DELAY,
+    BURST_GAP_SECONDS, BURST_VOTING, WRITE_BEHIND_ENABLED
+)
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg'}
+
+
+class FolderWatcher:
+    def __init__(self, app, watch_dir: str, camera_id: str = None,
+                 batch_size: int = INGEST_BATCH_SIZE,
+                 batch_timeout: float = INGEST_BATCH_TIMEOUT,
+                 poll_interval: float = INGEST_POLL_INTERVAL,
+                 settle_time: float = INGEST_SETTLE_TIME,
+                 burst_gap: float = BURST_GAP_SECONDS, voting: str = BURST_VOTING,
+                 use_mock: bool = True, include_existing: bool = False,
+                 force_polling: bool = False, write_behind: bool = WRITE_BEHIND_ENABLED,
+                 max_attempts: int = INGEST_MAX_ATTEMPTS, retry_delay: float = INGEST_RETRY_DELAY):
+        """
+        Initialize a folder watcher.
+
+        Args:
+            app: Flask app, used to push an app context for database writes
+            watch_dir: Folder the sync jobs drop images into
+            camera_id: Camera for every image; if None, the first sub-folder
+                below watch_dir is used as the camera id
+            batch_size: Maximum number of images per inference batch
+            batch_timeout: Seconds to wait for a batch to fill before flushing it
+            poll_interval: Seconds between folder scans when polling
+            settle_time: Seconds a file must be unmodified before it is read
+            burst_gap: Maximum seconds between frames of one camera-trap burst
+            voting: How confidences are combined across a burst ('max' or 'mean')
+            use_mock: Use the mock detector
+            include_existing: Also ingest images already present at start
+            force_polling: Skip inotify and always poll
+            write_behind: Hand detections to the write-behind queue instead
+                of committing on the watcher thread
+            max_attempts: Failed ingests of a file before it is skipped
+            retry_delay: Seconds before a failed file is retried (doubles
+                per attempt)
+        """
+        self.app = app
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.camera_id = camera_id
+        self.batch_size = max(1, batch_size)
+        self.batch_timeout = batch_timeout
+        self.poll_interval = poll_interval
+        self.settle_time = settle_time
+        self.burst_gap = burst_gap
+        self.voting = voting
+        self.use_mock = use_mock
+        self.include_existing = include_existing
+        self.force_polling = force_polling
+        self.write_behind = write_behind
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+
+        self._pending: Dict[str, float] = {}  # path -> time first seen
+        self._seen: Set[str] = set()  # ingested or skipped; pruned as files disappear
+        self._failures: Dict[str, int] = {}  # path -> failed attempts so far
+        self._retry_at: Dict[str, float] = {}  # path -> earliest time of its next attempt
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._observer = None
+
+        self.stats = {
+            'files_ingested': 0,
+            'batches': 0,
+            'bursts': 0,
+            'failed_batches': 0,
+            'failed_files': 0,
+            'detections': 0,
+        }
+
+    @property
+    def mode(self) -> str:
+        return 'inotify' if self._observer is not None else 'polling'
+
+    def start(self):
+        os.makedirs(self.watch_dir, exist_ok=True)
+        if not self.include_existing:
+            # Remember what is already there so only new drops are ingested
+            self._seen.update(self._list_images())
+        if not self.force_polling:
+            self._observer = self._start_observer()
+        logger.info(f"Watching {self.watch_dir} for camera-trap images ({self.mode})")
+        self._thread.start()
+
+    def stop(self):
+        logger.info(f"Stopping folder watcher for {self.watch_dir}")
+        self._stop_event.set()
+        if self._observer is not None:
+            try:
+                self._observer.stop()
+                self._observer.join(timeout=5)
+            except Exception:
+                pass
+        self._thread.join(timeout=30)
+
+    def _start_observer(self):
+        """Start an inotify-backed watchdog observer, or return None to poll"""
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except Exception:
+            logger.info("watchdog not available; falling back to polling")
+            return None
+
+        watcher = self
+
+        class _Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher._enqueue(event.src_path)
+
+            def on_closed(self, event):
+                if not event.is_directory:
+                    watcher._enqueue(event.src_path)
+
+            def on_moved(self, event):
+                # Sync tools usually write a temp file and rename it into place
+                if not event.is_directory:
+                    watcher._forget(event.src_path)
+                    watcher._enqueue(event.dest_path)
+
+            def on_deleted(self, event):
+                if not event.is_directory:
+                    watcher._forget(event.src_path)
+
+        try:
+            observer = Observer()
+            observer.schedule(_Handler(), self.watch_dir, recursive=True)
+            observer.start()
+            return observer
+        except Exception as e:
+            logger.warning(f"Could not start inotify observer ({e}); falling back to polling")
+            return None
+
+    def _list_images(self) -> List[str]:
+        images = []
+        for root, _dirs, files in os.walk(self.watch_dir):
+            for name in files:
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                    images.append(os.path.join(root, name))
+        return images
+
+    def _enqueue(self, path: str):
+        if os.path.splitext(path)[1].lower() not in IMAGE_EXTENSIONS:
+            return
+        with self._lock:
+            if path not in self._seen and path not in self._pending:
+                self._pending[path] = time.time()
+
+    def _forget(self, path: str):
+        """Drop all state of a file that left the folder"""
+        with self._lock:
+            self._seen.discard(path)
+            self._pending.pop(path, None)
+            self._failures.pop(path, None)
+            self._retry_at.pop(path, None)
+
+    def scan(self):
+        """Queue every image in the folder that has not been ingested yet"""
+        images = self._list_images()
+        with self._lock:
+            # Files that were removed will not come back under the same name
+            self._seen.intersection_update(images)
+        for path in images:
+            self._enqueue(path)
+
+    def _ready_files(self, force: bool = False) -> List[str]:
+        """
+        Pending files that have stopped changing, oldest first.
+
+        Unless ``force`` is set, files from a camera whose newest frame is
+        younger than the burst gap are held back, since that burst may still
+        be firing.
+        """
+        now = time.time()
+        ready = []
+        newest: Dict[Optional[str], float] = {}
+        with self._lock:
+            pending = sorted(self._pending.items(), key=lambda item: item[1])
+            retry_at = dict(self._retry_at)
+        for path, _first_seen in pending:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                # File vanished before we got to it
+                self._forget(path)
+                continue
+            if retry_at.get(path, 0.0) > now:
+                continue
+            camera_id = self._camera_for(path)
+            newest[camera_id] = max(newest.get(camera_id, 0.0), mtime)
+            if now - mtime >= self.settle_time:
+                ready.append(path)
+        if force:
+            return ready
+        return [p for p in ready if now - newest[self._camera_for(p)] >= self.burst_gap]
+
+    def poll_once(self, force: bool = False) -> int:
+        """
+        Flush ready files if a batch is full or has waited long enough.
+
+        Batches are made of whole bursts, so a burst is never split across
+        two transactions.
+
+        Args:
+            force: Flush whatever is ready regardless of batch size/timeout
+
+        Returns:
+            Number of files ingested
+        """
+        ingested = 0
+        while True:
+            ready = self._ready_files(force=force)
+            if not ready:
+                break
+            with self._lock:
+                oldest = min(self._pending[p] for p in ready if p in self._pending)
+            full = len(ready) >= self.batch_size
+            if not (force or full or time.time() - oldest >= self.batch_timeout):
+                break
+
+            bursts = sorted(group_bursts(ready, camera_for=self._camera_for, gap=self.burst_gap),
+                            key=lambda b: b.start)
+            batch: List[Burst] = []
+            frames = 0
+            for burst in bursts:
+                # A burst that failed before is retried on its own
+                retry = any(p in self._failures for p in burst.frames)
+                if batch and (retry or frames + len(burst) > self.batch_size):
+                    break
+                batch.append(burst)
+                frames += len(burst)
+                if retry:
+                    break
+            if self._flush(batch):
+                ingested += frames
+        return ingested
+
+    def _camera_for(self, path: str) -> Optional[str]:
+        if self.camera_id:
+            return self.camera_id
+        parts = os.path.relpath(path, self.watch_dir).split(os.sep)
+        return parts[0] if len(parts) > 1 else None
+
+    def _flush(self, bursts: List[Burst]) -> bool:
+        """Ingest a batch; returns whether it was stored"""
+        paths = [p for burst in bursts for p in burst.frames]
+
+        # Import lazily to avoid circular imports during app startup
+        try:
+            from app import socketio as app_socketio
+        except Exception:
+            app_socketio = None
+
+        detection_service = get_detection_service(use_mock=self.use_mock)
+
+        with self.app.app_context():
+            detections, success = detection_service.process_bursts(
+                bursts,
+                conf_threshold=0.5,
+                voting=self.voting,
+                socketio=app_socketio,
+                notify=True,
+                write_behind=self.write_behind
+            )
+        self.stats['batches'] += 1
+        if success:
+            self.stats['files_ingested'] += len(paths)
+            self.stats['bursts'] += len(bursts)
+            self.stats['detections'] += len(detections)
+            with self._lock:
+                for path in paths:
+                    self._pending.pop(path, None)
+                    self._failures.pop(path, None)
+                    self._retry_at.pop(path, None)
+                    self._seen.add(path)
+            return True
+
+        # Possibly a passing database or model error: retry, but not forever
+        # on an unreadable image (it stays on disk)
+        self.stats['failed_batches'] += 1
+        now = time.time()
+        skipped = []
+        with self._lock:
+            for path in paths:
+                attempts = self._failures.get(path, 0) + 1
+                if attempts >= self.max_attempts:
+                    self._pending.pop(path, None)
+                    self._failures.pop(path, None)
+                    self._retry_at.pop(path, None)
+                    self._seen.add(path)
+                    skipped.append(path)
+                else:
+                    self._failures[path] = attempts
+                    self._retry_at[path] = now + self.retry_delay * 2 ** (attempts - 1)
+        self.stats['failed_files'] += len(skipped)
+        logger.error(f"Failed to ingest batch of {len(paths)} images: {paths}")
+        if skipped:
+            logger.error(f"Skipping {len(skipped)} images after {self.max_attempts} failed attempts: {skipped}")
+        return False
+
+    def _run(self):
+        last_scan = 0.0
+        try:
+            while not self._stop_event.is_set():
+                if self._observer is None and time.time() - last_scan >= self.poll_interval:
+                    self.scan()
+                    last_scan = time.time()
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    logger.exception(f"Folder watcher error in {self.watch_dir}: {e}")
+                self._stop_event.wait(min(self.poll_interval, 0.5))
+
+            # Drain whatever already arrived before shutting down
+            self.poll_once(force=True)
+        except Exception as e:
+            logger.exception(f"Folder watcher for {self.watch_dir} crashed: {e}")
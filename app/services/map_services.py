@@ -1,6 +1,119 @@
+import json
+import logging
 import math
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Detection, Camera
+from app.models.detection import geo_cell, GEO_CELL_COLUMNS
+from config.detection_config import CLUSTER_CELLS_PER_TILE, POI_FILE
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Boxes spanning more grid rows than this are read as one latitude band
+MAX_CELL_ROWS = 64
+
+# Used when POI_FILE is not set
+DEFAULT_POINTS_OF_INTEREST = [
+    {'name': 'KRCS Taveta Office', 'type': 'office', 'lat': -3.396443, 'lng': 37.676411},
+    {'name': 'KWS Office Taveta', 'type': 'office', 'lat': -3.397577, 'lng': 37.677056},
+]
+
+
+def _floor(expr):
+    """FLOOR() for non-negative values on every backend (SQLite has no FLOOR by default)"""
+    if db.engine.dialect.name == 'sqlite':
+        return db.cast(expr, db.Integer)
+    return db.func.floor(expr)
+
+
+def haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in kilometres, element-wise over broadcastable arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_vectors(latitudes, longitudes) -> np.ndarray:
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lng = np.radians(np.asarray(longitudes, dtype=float))
+    return np.stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+class PointIndex:
+    """
+    k-nearest and radius lookups over a fixed set of points.
+
+    Points are stored as unit vectors, where straight-line (chord) distance
+    grows with great-circle distance, so a KD-tree answers both query kinds
+    exactly. Uses scipy's cKDTree, falling back to NumPy brute force where
+    scipy is missing.
+    """
+
+    def __init__(self, items: List[Dict], latitudes, longitudes):
+        self.items = list(items)
+        self._xyz = _unit_vectors(latitudes, longitudes).reshape(-1, 3)
+        self._tree = cKDTree(self._xyz) if cKDTree is not None and self.items else None
+
+    def __len__(self):
+        return len(self.items)
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1) -> List[Tuple[Dict, float]]:
+        """The k items closest to a point, nearest first, as (item, distance_km)"""
+        k = min(k, len(self.items))
+        if k <= 0:
+            return []
+        query = _unit_vectors(latitude, longitude)
+        if self._tree is not None:
+            chords, indexes = self._tree.query(query, k=k)
+            chords, indexes = np.atleast_1d(chords), np.atleast_1d(indexes)
+        else:
+            all_chords = np.linalg.norm(self._xyz - query, axis=1)
+            indexes = np.argpartition(all_chords, k - 1)[:k]
+            indexes = indexes[np.argsort(all_chords[indexes], kind='stable')]
+            chords = all_chords[indexes]
+        return [(self.items[i], d) for i, d in zip(indexes.tolist(), self._to_km(chords).tolist())]
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[Dict, float]]:
+        """Items within radius_km of a point, nearest first, as (item, distance_km)"""
+        if not self.items:
+            return []
+        query = _unit_vectors(latitude, longitude)
+        max_chord = 2 * math.sin(min(radius_km / (2 * EARTH_RADIUS_KM), math.pi / 2))
+        if self._tree is not None:
+            indexes = np.asarray(self._tree.query_ball_point(query, max_chord), dtype=int)
+            chords = np.linalg.norm(self._xyz[indexes] - query, axis=1)
+        else:
+            all_chords = np.linalg.norm(self._xyz - query, axis=1)
+            indexes = np.flatnonzero(all_chords <= max_chord)
+            chords = all_chords[indexes]
+        order = np.argsort(chords, kind='stable')
+        return [(self.items[i], d)
+                for i, d in zip(indexes[order].tolist(), self._to_km(chords[order]).tolist())]
+
+    @staticmethod
+    def _to_km(chords: np.ndarray) -> np.ndarray:
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chords / 2, 0.0, 1.0))
+
 
 class MapService:
+    def __init__(self):
+        self._indexes: Dict[str, PointIndex] = {}
+        self._lock = threading.Lock()
+
     @staticmethod
     def calculate_distance(lat1, lon1, lat2, lon2):
         """Calculate distance between two coordinates in kilometers"""
@@ -19,6 +132,52 @@ class MapService:
         
         return R * c
 
+    @staticmethod
+    def distances_from(latitude: float, longitude: float, latitudes, longitudes) -> np.ndarray:
+        """Distances in kilometres from one point to each of many"""
+        return haversine(latitude, longitude, latitudes, longitudes)
+
+    @staticmethod
+    def distance_matrix(latitudes1, longitudes1, latitudes2, longitudes2) -> np.ndarray:
+        """Distances in kilometres between every pair of points, shape (len(points1), len(points2))"""
+        return haversine(np.asarray(latitudes1, dtype=float)[:, None],
+                         np.asarray(longitudes1, dtype=float)[:, None],
+                         np.asarray(latitudes2, dtype=float)[None, :],
+                         np.asarray(longitudes2, dtype=float)[None, :])
+
+    def camera_index(self) -> PointIndex:
+        """PointIndex of the cameras (items are Camera.to_dict()), rebuilt after cameras change"""
+        with self._lock:
+            index = self._indexes.get('cameras')
+            if index is None:
+                cameras = [camera.to_dict() for camera in Camera.query.all()]
+                index = PointIndex(cameras, [c['latitude'] for c in cameras],
+                                   [c['longitude'] for c in cameras])
+                self._indexes['cameras'] = index
+            return index
+
+    def poi_index(self) -> PointIndex:
+        """PointIndex of the points of interest (POI_FILE, or DEFAULT_POINTS_OF_INTEREST)"""
+        with self._lock:
+            index = self._indexes.get('poi')
+            if index is None:
+                points = DEFAULT_POINTS_OF_INTEREST
+                if POI_FILE:
+                    try:
+                        with open(POI_FILE) as f:
+                            points = json.load(f)
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Could not load points of interest from {POI_FILE}: {e}")
+                index = PointIndex(points, [p['lat'] for p in points], [p['lng'] for p in points])
+                self._indexes['poi'] = index
+            return index
+
+    def invalidate_indexes(self, *names: str):
+        """Drop cached point indexes ('cameras', 'poi'; all if none given)"""
+        with self._lock:
+            for name in names or list(self._indexes):
+                self._indexes.pop(name, None)
+
     @staticmethod
     def get_bounding_box(latitude, longitude, radius_km=10):
         """Get bounding box coordinates for a given point and radius"""
@@ -31,10 +190,16 @@ class MapService:
         min_lat = latitude - math.degrees(radius_rad)
         max_lat = latitude + math.degrees(radius_rad)
         
-        # Calculate longitude bounds (adjust for latitude)
-        delta_lon = math.asin(math.sin(radius_rad) / math.cos(math.radians(latitude)))
-        min_lon = longitude - math.degrees(delta_lon)
-        max_lon = longitude + math.degrees(delta_lon)
+        # Calculate longitude bounds (adjust for latitude); a circle that
+        # reaches a pole covers every longitude
+        cos_lat = math.cos(math.radians(latitude))
+        if min_lat <= -90 or max_lat >= 90 or math.sin(radius_rad) >= cos_lat:
+            min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            delta_lon = math.asin(math.sin(radius_rad) / cos_lat)
+            min_lon = longitude - math.degrees(delta_lon)
+            max_lon = longitude + math.degrees(delta_lon)
         
         return {
             'min_lat': min_lat,
@@ -43,4 +208,152 @@ class MapService:
             'max_lon': max_lon
         }
 
-map_service = MapService()
\ No newline at end of file
+    @staticmethod
+    def cell_ranges(bbox: Dict) -> List[Tuple[int, int]]:
+        """
+        geo_cell id ranges covering a bounding box, one per grid row.
+
+        Boxes spanning more than MAX_CELL_ROWS rows get a single range from
+        their first cell to their last (a latitude band).
+        """
+        first = geo_cell(max(bbox['min_lat'], -90.0), max(bbox['min_lon'], -180.0))
+        last = geo_cell(min(bbox['max_lat'], 90.0), min(bbox['max_lon'], 180.0))
+        first_row, first_column = divmod(first, GEO_CELL_COLUMNS)
+        last_row, last_column = divmod(last, GEO_CELL_COLUMNS)
+        if last_row - first_row >= MAX_CELL_ROWS or \
+                (first_column == 0 and last_column == GEO_CELL_COLUMNS - 1):
+            return [(first, last)]
+        return [(row * GEO_CELL_COLUMNS + first_column, row * GEO_CELL_COLUMNS + last_column)
+                for row in range(first_row, last_row + 1)]
+
+    @staticmethod
+    def bbox_filter(bbox: Dict) -> List:
+        """
+        Criteria for detections inside a bounding box: geo_cell ranges for
+        the index to prune with, then the exact latitude/longitude bounds
+        (checked inside the same index).
+        """
+        ranges = MapService.cell_ranges(bbox)
+        return [
+            db.or_(*(Detection.geo_cell.between(low, high) for low, high in ranges)),
+            Detection.latitude.between(bbox['min_lat'], bbox['max_lat']),
+            Detection.longitude.between(bbox['min_lon'], bbox['max_lon'])
+        ]
+
+    @staticmethod
+    def detections_within(latitude: float, longitude: float, radius_km: float = 10,
+                          species: str = None, limit: int = 100) -> List[Tuple[Detection, float]]:
+        """
+        Active detections within radius_km of a point, nearest first.
+
+        Candidates come from the bounding box (see bbox_filter); each is
+        then checked with the exact great-circle distance.
+
+        Returns:
+            List of (detection, distance_km)
+        """
+        bbox = MapService.get_bounding_box(latitude, longitude, radius_km)
+        query = Detection.query.filter(*MapService.bbox_filter(bbox),
+                                       Detection.is_false_positive == db.false())
+        if species:
+            query = query.filter(Detection.species == species)
+
+        candidates = query.all()
+        if not candidates:
+            return []
+        distances = haversine(latitude, longitude, [d.latitude for d in candidates],
+                              [d.longitude for d in candidates])
+        matches = [(candidates[i], float(distances[i])) for i in np.flatnonzero(distances <= radius_km)]
+        matches.sort(key=lambda match: (match[1], -match[0].id))
+        return matches[:limit]
+
+    @staticmethod
+    def cell_size(zoom: int, cells_per_tile: int = CLUSTER_CELLS_PER_TILE) -> float:
+        """Grid cell size in degrees at a web map zoom level"""
+        return 360.0 / (2 ** zoom * cells_per_tile)
+
+    @staticmethod
+    def cluster_detections(bbox: Dict, zoom: int, species: str = None,
+                           since: datetime = None) -> List[Dict]:
+        """
+        Aggregate the detections inside a bounding box into grid cells.
+
+        Cells are ``cell_size(zoom)`` degrees square, so they shrink as the map
+        zooms in. Counting happens in SQL, grouped by cell and species, over
+        the rows bbox_filter selects; false positives are left out.
+
+        Args:
+            bbox: Dict with min_lat, max_lat, min_lon, max_lon (see get_bounding_box)
+            zoom: Map zoom level
+            species: Only cluster this species (optional)
+            since: Only detections at or after this time (optional)
+
+        Returns:
+            Clusters, largest first, with lat/lng (mean position), count,
+            dominant_species, per-species counts and the latest detection time
+        """
+        size = MapService.cell_size(zoom)
+        cell_y = _floor((Detection.latitude + 90.0) / size).label('cell_y')
+        cell_x = _floor((Detection.longitude + 180.0) / size).label('cell_x')
+
+        query = db.session.query(
+            cell_y, cell_x, Detection.species,
+            db.func.count(Detection.id),
+            db.func.sum(Detection.latitude),
+            db.func.sum(Detection.longitude),
+            db.func.max(Detection.timestamp)
+        ).filter(
+            *MapService.bbox_filter(bbox),
+            Detection.is_false_positive == db.false()
+        )
+        if species:
+            query = query.filter(Detection.species == species)
+        if since:
+            query = query.filter(Detection.timestamp >= since)
+
+        cells: Dict = {}
+        for y, x, cell_species, count, lat_sum, lng_sum, latest in \
+                query.group_by(cell_y, cell_x, Detection.species).all():
+            cell = cells.setdefault((y, x), {'count': 0, 'lat_sum': 0.0, 'lng_sum': 0.0,
+                                             'latest': None, 'species': {}})
+            cell['count'] += count
+            cell['lat_sum'] += lat_sum
+            cell['lng_sum'] += lng_sum
+            cell['species'][cell_species] = count
+            if latest is not None and (cell['latest'] is None or latest > cell['latest']):
+                cell['latest'] = latest
+
+        clusters = []
+        for cell in cells.values():
+            dominant = min(cell['species'].items(), key=lambda item: (-item[1], item[0]))[0]
+            clusters.append({
+                'lat': cell['lat_sum'] / cell['count'],
+                'lng': cell['lng_sum'] / cell['count'],
+                'count': cell['count'],
+                'dominant_species': dominant,
+                'species': cell['species'],
+                'latest': cell['latest'].isoformat() if cell['latest'] else None
+            })
+        clusters.sort(key=lambda c: -c['count'])
+        return clusters
+
+map_service = MapService()
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_camera_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Camera):
+            session.info['camera_index_stale'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_camera_index(session):
+    if session.info.pop('camera_index_stale', False):
+        map_service.invalidate_indexes('cameras')
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _keep_camera_index(session, previous_transaction):
+    session.info.pop('camera_index_stale', None)
@@ -1,37 +1,299 @@
 import os
+import queue
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Tuple
+from requests.adapters import HTTPAdapter
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from app.models import Subscriber
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flask import current_app, has_app_context
+from app.models import RegistryVersion, Subscriber
+from app.services.map_services import PointIndex
+from app.services import circuit_breaker
+from app.services.sms_service import SMSService
+from app.services.stats_service import upsert_increment
 from app import db
+from config.detection_config import (
+    SUBSCRIBER_DEFAULT_RADIUS_KM, SUBSCRIBER_VERSION_CHECK, SMS_TIMEOUT, SMS_BATCH_SIZE, EMAIL_TIMEOUT,
+    NOTIFY_CONCURRENCY
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberIndex:
+    """
+    Immutable snapshot of the active subscribers, by home location.
+
+    Located subscribers sit in a PointIndex and are alerted within their own
+    radius; subscribers without a location are alerted everywhere. Contacts
+    are read-only mappings shared by every notification until the
+    subscribers change.
+    """
+
+    def __init__(self, subscribers: List[Subscriber], version: int = 0):
+        self.version = version
+        self.loaded_at = datetime.utcnow()
+        located, everywhere = [], []
+        for subscriber in subscribers:
+            contact = MappingProxyType({
+                'id': subscriber.id,
+                'name': subscriber.name,
+                'phone': subscriber.phone,
+                'email': subscriber.email,
+                'alert_radius_km': subscriber.alert_radius_km or SUBSCRIBER_DEFAULT_RADIUS_KM
+            })
+            if subscriber.latitude is None or subscriber.longitude is None:
+                everywhere.append(contact)
+            else:
+                located.append((contact, subscriber.latitude, subscriber.longitude))
+        self.everywhere = tuple(everywhere)
+        self.nearby = PointIndex([c for c, _, _ in located], [lat for _, lat, _ in located],
+                                 [lng for _, _, lng in located])
+        self.located = len(located)
+        self.max_radius_km = max((c['alert_radius_km'] for c, _, _ in located), default=0.0)
+
+    def recipients(self, latitude: float, longitude: float) -> List[Mapping]:
+        """Subscribers to alert about a detection at this location"""
+        nearby = [contact for contact, distance in self.nearby.within(latitude, longitude, self.max_radius_km)
+                  if distance <= contact['alert_radius_km']]
+        return list(self.everywhere) + nearby
+
+
+SUBSCRIBERS = 'subscribers'  # registry_versions row bumped whenever subscribers change
+
+_subscriber_index = None
+_subscriber_index_checked = 0.0
+_subscriber_index_stats = {'rebuilds': 0, 'version_checks': 0}
+_subscriber_index_lock = threading.Lock()
+
+
+def subscriber_version() -> int:
+    """Version stamp of the subscribers table, shared by every process using the database"""
+    return db.session.query(RegistryVersion.version).filter_by(name=SUBSCRIBERS).scalar() or 0
+
+
+def subscriber_index() -> SubscriberIndex:
+    """
+    SubscriberIndex of the active subscribers.
+
+    Changes committed in this process drop the snapshot right away; changes
+    made by other processes are noticed by checking the version stamp at
+    most every ``SUBSCRIBER_VERSION_CHECK`` seconds.
+    """
+    global _subscriber_index, _subscriber_index_checked
+    with _subscriber_index_lock:
+        now = time.monotonic()
+        if _subscriber_index is not None and now - _subscriber_index_checked < SUBSCRIBER_VERSION_CHECK:
+            return _subscriber_index
+        version = subscriber_version()
+        _subscriber_index_stats['version_checks'] += 1
+        if _subscriber_index is None or _subscriber_index.version != version:
+            _subscriber_index = SubscriberIndex(Subscriber.query.filter_by(is_active=True).all(), version)
+            _subscriber_index_stats['rebuilds'] += 1
+        _subscriber_index_checked = now
+        return _subscriber_index
+
+
+def invalidate_subscriber_index():
+    global _subscriber_index
+    with _subscriber_index_lock:
+        _subscriber_index = None
+
+
+def subscriber_index_metrics() -> Dict:
+    with _subscriber_index_lock:
+        index = _subscriber_index
+        stats = dict(_subscriber_index_stats)
+    return {
+        'version': index.version if index else None,
+        'loaded_at': index.loaded_at.isoformat() if index else None,
+        'subscribers': len(index.everywhere) + index.located if index else None,
+        'located': index.located if index else None,
+        **stats
+    }
+
+
+@event.listens_for(Session, 'after_flush')
+def _note_subscriber_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Subscriber):
+            # Bumped in the same transaction, so other processes see the stamp and the rows together
+            upsert_increment(RegistryVersion.__table__, ['name'], [{'name': SUBSCRIBERS, 'version': 1}],
+                             session.connection())
+            session.info['subscriber_index_stale'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _drop_subscriber_index(session):
+    if session.info.pop('subscriber_index_stale', False):
+        invalidate_subscriber_index()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _keep_subscriber_index(session, previous_transaction):
+    session.info.pop('subscriber_index_stale', None)
+
+
+def _http_adapter():
+    # One keep-alive connection per concurrent send instead of a handshake per message
+    return HTTPAdapter(pool_connections=1, pool_maxsize=NOTIFY_CONCURRENCY)
+
+
+_twilio_client = None
+_clients_lock = threading.Lock()
+
+
+def twilio_client():
+    """Twilio client shared by every send (one connection pool), or None if Twilio is not configured"""
+    global _twilio_client
+    account_sid = os.getenv('TWILIO_ACCOUNT_SID')
+    auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+    if not (account_sid and auth_token):
+        return None
+    with _clients_lock:
+        if _twilio_client is None or _twilio_client.username != account_sid:
+            http_client = TwilioHttpClient(timeout=SMS_TIMEOUT)
+            http_client.session.mount('https://', _http_adapter())
+            _twilio_client = Client(account_sid, auth_token, http_client=http_client)
+        return _twilio_client
+
 
 def send_sms(message, to_number):
     """Send SMS using Twilio"""
     try:
-        account_sid = os.getenv('TWILIO_ACCOUNT_SID')
-        auth_token = os.getenv('TWILIO_AUTH_TOKEN')
+        client = twilio_client()
         from_number = os.getenv('TWILIO_PHONE_NUMBER')
         
-        if all([account_sid, auth_token, from_number]):
-            client = Client(account_sid, auth_token)
+        if client and from_number:
             message = client.messages.create(
                 body=message,
                 from_=from_number,
                 to=to_number
             )
-            print(f"SMS sent to {to_number}: {message.sid}")
+            logger.info(f"SMS sent to {to_number}: {message.sid}")
             return True
         else:
-            print(f"Mock SMS: {message} to {to_number}")
+            logger.info(f"Mock SMS: {message} to {to_number}")
             return True
             
     except Exception as e:
-        print(f"SMS failed: {e}")
+        logger.error(f"SMS failed: {e}")
         return False
 
-def send_notifications(detection):
-    """Send all notifications for a detection"""
+class SMTPPool:
+    """
+    Logged-in SMTP connections reused across emails.
+
+    smtplib connections are not thread-safe, so each send takes an idle
+    connection (or opens one) and returns it afterwards; a connection the
+    server has dropped is replaced once.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str, timeout: float = EMAIL_TIMEOUT):
+        self.key = (host, port, username, password)
+        self.timeout = timeout
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+    def _connect(self) -> smtplib.SMTP:
+        host, port, username, password = self.key
+        connection = smtplib.SMTP(host, port, timeout=self.timeout)
+        connection.starttls()
+        connection.login(username, password)
+        return connection
+
+    def send(self, message: MIMEMultipart):
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            connection.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Idle connections time out server-side; the message was not accepted
+            connection = self._connect()
+            self._send_or_discard(connection, message)
+        except Exception:
+            self._discard(connection)
+            raise
+        self._idle.put(connection)
+
+    def _send_or_discard(self, connection: smtplib.SMTP, message: MIMEMultipart):
+        try:
+            connection.send_message(message)
+        except Exception:
+            self._discard(connection)
+            raise
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _discard(connection: smtplib.SMTP):
+        try:
+            connection.quit()
+        except Exception:
+            pass
+
+
+_smtp_pool = None
+
+
+def smtp_pool():
+    """SMTPPool for the configured server, or None if email is not configured"""
+    global _smtp_pool
+    host = os.getenv('SMTP_SERVER')
+    username = os.getenv('EMAIL_USERNAME')
+    password = os.getenv('EMAIL_PASSWORD')
+    if not all([host, username, password]):
+        return None
+    key = (host, int(os.getenv('SMTP_PORT', 587)), username, password)
+    with _clients_lock:
+        if _smtp_pool is None or _smtp_pool.key != key:
+            if _smtp_pool is not None:
+                _smtp_pool.close()
+            _smtp_pool = SMTPPool(*key)
+        return _smtp_pool
+
+
+def send_email(subject, body, to_email):
+    """Send email over a pooled SMTP connection"""
+    try:
+        pool = smtp_pool()
+        
+        if pool:
+            message = MIMEMultipart()
+            message['From'] = pool.key[2]
+            message['To'] = to_email
+            message['Subject'] = subject
+            message.attach(MIMEText(body, 'plain'))
+            pool.send(message)
+            logger.info(f"Email sent to {to_email}")
+            return True
+        else:
+            logger.info(f"Mock email: {subject} to {to_email}")
+            return True
+            
+    except Exception as e:
+        logger.error(f"Email failed: {e}")
+        return False
+
+def compose_messages(detection):
+    """SMS text, email subject and email body for a detection"""
     message = f"ELEPHANT DETECTED!\nCamera: {detection.camera_id}\nConfidence: {detection.confidence:.1%}\nLocation: {detection.latitude:.4f}, {detection.longitude:.4f}\nTime: {detection.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
     
     email_subject = f"Elephant Detection Alert - Camera {detection.camera_id}"
@@ -49,21 +311,154 @@ Please check the dashboard for more details: http://localhost:5000
 Stay safe,
 ElephantAI Alert System
 """
+    return {'sms': message, 'email_subject': email_subject, 'email_body': email_body}
+
+def compose_digest(detection, count, since, late=False):
+    """
+    Messages for detections folded into a cooldown digest; ``detection`` is the latest of them.
+    ``late`` digests carry stale detections reported late by an edge relay, none of them alerted.
+    """
+    if late:
+        detections = f"{count} {detection.species} detection{'s' if count != 1 else ''}"
+        window = (f" from {since.strftime('%Y-%m-%d %H:%M')} to {detection.timestamp.strftime('%H:%M')} UTC"
+                  if since else "")
+        heading, summary = "LATE REPORT", f"{detections} reported late by the edge relay{window}"
+    else:
+        minutes = max(1, round((detection.timestamp - since).total_seconds() / 60)) if since else None
+        window = f" in the last {minutes} min" if minutes else ""
+        detections = f"{count} more {detection.species} detection{'s' if count != 1 else ''}"
+        heading, summary = "DIGEST", f"{detections} since the last alert{window}"
+    message = f"{heading}: {detections} at camera {detection.camera_id}{window}\nLatest: {detection.latitude:.4f}, {detection.longitude:.4f} at {detection.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
     
-    # Get active subscribers from database
-    subscribers = Subscriber.query.filter_by(is_active=True).all()
+    email_subject = f"Detection {'Late Report' if late else 'Digest'} - {detections} at Camera {detection.camera_id}"
+    email_body = f"""
+Elephant Detection Alert System
+
+{heading}: {summary}.
+- Camera: {detection.camera_id}
+- Latest confidence: {detection.confidence:.1%}
+- Latest location: {detection.latitude:.4f}, {detection.longitude:.4f}
+- Latest time: {detection.timestamp.strftime('%Y-%m-%d %H:%M:%S UTC')}
+
+Please check the dashboard for more details: http://localhost:5000
+
+Stay safe,
+ElephantAI Alert System
+"""
+    return {'sms': message, 'email_subject': email_subject, 'email_body': email_body}
+
+def sms_providers() -> List[str]:
+    """SMS providers in order of preference: Africa's Talking (bulk) when configured, then Twilio"""
+    providers = []
+    if has_app_context() and SMSService.configured():
+        providers.append('africastalking')
+    # Unconfigured Twilio only mocks sends, so it is no fallback for a real provider
+    if twilio_client() is not None or not providers:
+        providers.append('twilio')
+    return providers
+
+def _outcome(channel, success, provider=None, status=None, message_id=None) -> Dict:
+    return {'channel': channel, 'success': success, 'provider': provider, 'status': status, 'message_id': message_id}
+
+def _available(providers) -> str:
+    """First provider whose circuit lets a call through, or None"""
+    for provider in providers:
+        if circuit_breaker.breaker(provider).allow():
+            return provider
+    return None
+
+def _send_one(subscriber, messages, sms_fallbacks) -> Dict:
+    """Send to one subscriber by SMS, else email, through the provider's circuit breaker"""
+    if subscriber['phone']:
+        channel, provider = 'sms', _available(sms_fallbacks)
+    elif subscriber['email']:
+        channel, provider = 'email', _available(['smtp'])
+    else:
+        return _outcome(None, False, status='NoContact')
+    if provider is None:
+        return _outcome(channel, False, status='CircuitOpen')
+    
+    started = time.perf_counter()
+    if channel == 'sms':
+        success = send_sms(messages['sms'], subscriber['phone'])
+    else:
+        success = send_email(messages['email_subject'], messages['email_body'], subscriber['email'])
+    circuit_breaker.breaker(provider).record(success, (time.perf_counter() - started) * 1000)
+    return _outcome(channel, success, provider)
+
+def _send_bulk_sms(app, subscribers, message) -> List[Tuple[Dict, Dict]]:
+    """Send one Africa's Talking batch; the caller has already passed its circuit breaker"""
+    started = time.perf_counter()
+    with app.app_context():
+        numbers = list(dict.fromkeys(s['phone'] for s in subscribers))  # one text per number
+        results = SMSService.send_bulk(numbers, message, batch_size=len(numbers))
+    # Rejected numbers are the recipients' problem; a failed request is the provider's
+    request_ok = not any(result['request_failed'] for result in results.values())
+    circuit_breaker.breaker('africastalking').record(request_ok, (time.perf_counter() - started) * 1000)
+    return [(s, _outcome('sms', results[s['phone']]['success'], 'africastalking',
+                         results[s['phone']]['status'], results[s['phone']]['message_id']))
+            for s in subscribers]
+
+_send_executor = None
+
+
+def fan_out(recipients: List[Dict], messages: Dict) -> Iterator[Tuple[Dict, Dict]]:
+    """
+    Send to all recipients concurrently, at most NOTIFY_CONCURRENCY requests
+    at a time across the process.
+
+    With Africa's Talking configured, SMS recipients are sent SMS_BATCH_SIZE
+    numbers per request; while its circuit is open they fall back to Twilio
+    (if configured), one request each. Sends to a provider whose circuit is
+    open fail immediately with status 'CircuitOpen'.
+
+    Yields:
+        (recipient, outcome) as each send finishes; outcome has channel,
+        success, provider, and the provider's status and message_id when known
+    """
+    global _send_executor
+    with _clients_lock:
+        if _send_executor is None:
+            _send_executor = ThreadPoolExecutor(max_workers=NOTIFY_CONCURRENCY, thread_name_prefix='notify-send')
+
+    providers = sms_providers()
+    sms_fallbacks = [p for p in providers if p != 'africastalking']
+    futures = {}
+    singles = [r for r in recipients if not r['phone']]
+    bulk = [r for r in recipients if r['phone']]
+    if providers[0] != 'africastalking':
+        singles, bulk = recipients, []
+    app = current_app._get_current_object() if bulk else None
+    # Every recipient of one fan-out gets the same SMS body, so they batch together
+    for start in range(0, len(bulk), SMS_BATCH_SIZE):
+        batch = bulk[start:start + SMS_BATCH_SIZE]
+        if circuit_breaker.breaker('africastalking').allow():
+            futures[_send_executor.submit(_send_bulk_sms, app, batch, messages['sms'])] = batch
+        else:
+            singles.extend(batch)
+    for recipient in singles:
+        futures[_send_executor.submit(_send_one, recipient, messages, sms_fallbacks)] = recipient
+
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            batch = futures[future] if isinstance(futures[future], list) else [futures[future]]
+            logger.error(f"Notification to {len(batch)} subscribers failed: {e}")
+            result = [(r, _outcome(None, False, status=str(e))) for r in batch]
+        if isinstance(result, dict):
+            yield futures[future], result
+        else:
+            yield from result
+
+def send_notifications(detection):
+    """Send all notifications for a detection synchronously (the outbox worker sends them in production)"""
+    messages = compose_messages(detection)
     
-    notifications_sent = 0
+    # Only subscribers near the detection (and those without a home location)
+    subscribers = subscriber_index().recipients(detection.latitude, detection.longitude)
     
-    for subscriber in subscribers:
-        success = False
-        if subscriber.phone:
-            success = send_sms(message, subscriber.phone)
-        elif subscriber.email:
-            success = send_email(email_subject, email_body, subscriber.email)
-        
-        if success:
-            notifications_sent += 1
+    notifications_sent = sum(1 for _, outcome in fan_out(subscribers, messages) if outcome['success'])
     
-    print(f"Notifications sent: {notifications_sent}/{len(subscribers)}")
-    return notifications_sent
\ No newline at end of file
+    logger.info(f"Notifications sent: {notifications_sent}/{len(subscribers)}")
+    return notifications_sent
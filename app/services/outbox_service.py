@@ -0,0 +1,406 @@
+"""
+Outbox Service - durable, asynchronous notification delivery
+
+Instead of messaging subscribers while the HTTP request waits, callers add
+an ``OutboxMessage`` for each alert-worthy detection to the same
+transaction as the detection (``enqueue``). Once that commits, the
+dispatcher thread claims due messages and hands them to a pool of
+``OUTBOX_WORKERS`` sender threads.
+
+Every recipient's outcome is written to ``alerts`` under an idempotency key
+(``detection:<id>:subscriber:<id>``), committed as soon as the provider
+answers. A retry only sends to recipients without a 'sent' row, so a crash
+or a partial failure never messages anyone twice. Failed notifications are
+retried with exponential backoff up to ``OUTBOX_MAX_ATTEMPTS`` times, and a
+claim left by a dead worker expires after ``OUTBOX_LEASE`` seconds.
+"""
+import atexit
+import threading
+from collections import deque
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Alert, Detection, OutboxMessage
+from app.services.cooldown_service import LATE, cooldown_engine, outcome_of
+from app.services.priority_service import band
+from config.detection_config import (
+    OUTBOX_WORKERS, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE, OUTBOX_LEASE, OUTBOX_POLL_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+SENT = 'sent'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+LATENCY_SAMPLES = 1000  # per priority band
+
+
+def enqueue(detections: Iterable[Detection], session=None) -> List[OutboxMessage]:
+    """
+    Add notifications for flushed detections to the current transaction.
+
+    They are sent once the transaction commits; nothing is sent if it rolls
+    back. Detections inside their camera and species' cooldown are folded
+    into a digest instead, and stale ones into a catch-up digest (see
+    cooldown_service).
+
+    Returns:
+        The outbox row of each detection: its alert, or the digest it joined
+    """
+    session = session or db.session
+    messages = [cooldown_engine.route(d, session)[1] for d in detections]
+    if messages:
+        session.info['outbox_enqueued'] = True
+    return messages
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session):
+    if session.info.pop('outbox_enqueued', False):
+        notification_dispatcher.wake()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop('outbox_enqueued', None)
+
+
+def _due_filter(now: datetime):
+    return db.or_(
+        db.and_(OutboxMessage.status == PENDING, OutboxMessage.next_attempt_at <= now),
+        db.and_(OutboxMessage.status == PROCESSING, OutboxMessage.locked_until < now)
+    )
+
+
+class NotificationDispatcher:
+    def __init__(self, workers: int = OUTBOX_WORKERS, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 retry_base: float = OUTBOX_RETRY_BASE, lease: float = OUTBOX_LEASE,
+                 poll_interval: float = OUTBOX_POLL_INTERVAL):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            workers: Notifications sent concurrently
+            max_attempts: Attempts before a notification is marked failed
+            retry_base: Seconds before the first retry; doubles per attempt
+            lease: Seconds a claimed notification stays claimed
+            poll_interval: Seconds between scans for due retries
+        """
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.lease = lease
+        self.poll_interval = poll_interval
+
+        self.app = None
+        self.background = True
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+
+        self._reset_stats()
+
+    def init_app(self, app):
+        first_init = self.app is None
+        self.app = app
+        self.background = app.config.get('OUTBOX_BACKGROUND', True)
+        app.extensions['notification_dispatcher'] = self
+        # Metrics describe this app's outbox only
+        with self._lock:
+            self._reset_stats()
+        if first_init:
+            atexit.register(self.shutdown)
+
+    def _reset_stats(self):
+        self._stats = {
+            'claimed': 0,
+            'sent': 0,
+            'retried': 0,
+            'failed': 0,
+            'recipients_sent': 0,
+            'recipients_failed': 0,
+            'delivery_count': 0,
+            'delivery_ms_total': 0.0,
+            'delivery_ms_max': 0.0,
+        }
+        # Recent detection-to-sent latencies per threat band (priority_service.band)
+        self._latencies: Dict[str, deque] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            if self.app is None:
+                raise RuntimeError("NotificationDispatcher.init_app() has not been called")
+            self._stop_event.clear()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='notifier')
+            self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+            self._thread.start()
+            logger.info(f"Notification dispatcher started with {self.workers} workers")
+
+    def wake(self):
+        """Look for due notifications now (called after an outbox write commits)"""
+        if self.app is None or not self.background:
+            return
+        if not self.running:
+            self.start()
+        self._wake_event.set()
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until no notification is due or being sent"""
+        deadline = time.time() + timeout
+        if not self.running and not self.background:
+            return self.process_due(deadline)
+        self.wake()
+        while time.time() < deadline:
+            with self._lock:
+                in_flight = self._in_flight
+            if not in_flight:
+                with self.app.app_context():
+                    due = OutboxMessage.query.filter(_due_filter(datetime.utcnow())).count()
+                if not due:
+                    return True
+                self._wake_event.set()
+            time.sleep(0.01)
+        return False
+
+    def process_due(self, deadline: float) -> bool:
+        """Send due notifications in the calling thread (without background workers)"""
+        with self.app.app_context():
+            while time.time() < deadline:
+                claimed = self._claim(self.workers)
+                if not claimed:
+                    return True
+                for message_id in claimed:
+                    try:
+                        self.deliver(message_id)
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.exception(f"Delivering notification {message_id} failed: {e}")
+        return False
+
+    def shutdown(self, timeout: float = 30.0):
+        """Stop claiming, let in-flight notifications finish"""
+        if not self.running:
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join(timeout=timeout)
+        self._executor.shutdown(wait=True)
+        logger.info("Notification dispatcher stopped")
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+        total_ms = stats.pop('delivery_ms_total')
+        timed = stats.pop('delivery_count')
+        backlog = {}
+        if self.app is not None:
+            with self.app.app_context():
+                backlog = dict(db.session.query(OutboxMessage.status, db.func.count(OutboxMessage.id))
+                               .group_by(OutboxMessage.status).all())
+        with self._lock:
+            latencies = {name: sorted(samples) for name, samples in self._latencies.items()}
+        return {
+            'running': self.running,
+            'workers': self.workers,
+            'in_flight': in_flight,
+            'outbox': backlog,
+            'delivery_latency_ms': {
+                'avg': round(total_ms / timed, 3) if timed else 0.0,
+                'max': round(stats.pop('delivery_ms_max'), 3),
+            },
+            'latency_by_priority': {name: {
+                'samples': len(samples),
+                'p50': round(samples[len(samples) // 2], 3),
+                'p95': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                'max': round(samples[-1], 3),
+            } for name, samples in latencies.items() if samples},
+            **stats,
+        }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake_event.wait(timeout=self.poll_interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                with self.app.app_context():
+                    claimed = self._claim(self.workers)
+            except Exception as e:
+                logger.exception(f"Claiming notifications failed: {e}")
+                continue
+            for message_id in claimed:
+                with self._lock:
+                    self._in_flight += 1
+                self._executor.submit(self._deliver_in_context, message_id)
+            if claimed:
+                # More may be due than one claim takes
+                self._wake_event.set()
+
+    def _claim(self, limit: int) -> List[int]:
+        """
+        Mark up to ``limit`` due notifications, highest priority first, as
+        being sent by this process.
+
+        Only as many are claimed as there are idle workers, so under a
+        backlog a high-priority notification written later is still the
+        next one sent.
+        """
+        with self._lock:
+            limit -= self._in_flight
+        if limit <= 0:
+            return []
+        now = datetime.utcnow()
+        candidates = [row.id for row in db.session.query(OutboxMessage.id)
+                      .filter(_due_filter(now))
+                      .order_by(OutboxMessage.priority.desc(), OutboxMessage.next_attempt_at).limit(limit)]
+        claimed = []
+        for message_id in candidates:
+            # Conditional update, so two dispatchers never claim the same row
+            result = db.session.execute(
+                db.update(OutboxMessage)
+                .where(OutboxMessage.id == message_id, _due_filter(now))
+                .values(status=PROCESSING, locked_until=now + timedelta(seconds=self.lease))
+            )
+            if result.rowcount == 1:
+                claimed.append(message_id)
+        db.session.commit()
+        with self._lock:
+            self._stats['claimed'] += len(claimed)
+        return claimed
+
+    def _deliver_in_context(self, message_id: int):
+        try:
+            with self.app.app_context():
+                try:
+                    self.deliver(message_id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception(f"Delivering notification {message_id} failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            # A worker is free; claim the next notification
+            self._wake_event.set()
+
+    def deliver(self, message_id: int) -> str:
+        """
+        Send one claimed notification to every recipient not yet reached.
+
+        Returns:
+            The notification's new status
+        """
+        # Imported here: notification_services imports the Twilio client
+        from app.services.notification_services import compose_digest, compose_messages, fan_out, subscriber_index
+
+        message = db.session.get(OutboxMessage, message_id)
+        detection = db.session.get(Detection, message.detection_id)
+        if detection is None or (message.kind != 'digest' and detection.is_false_positive):
+            return self._finish(message, CANCELLED, None)
+
+        if message.kind == 'digest':
+            messages = compose_digest(detection, message.digest_count, message.digest_since,
+                                      late=outcome_of(message) == LATE)
+        else:
+            messages = compose_messages(detection)
+        outcomes = {alert.idempotency_key: alert
+                    for alert in Alert.query.filter_by(detection_id=detection.id).all()
+                    if alert.idempotency_key}
+
+        pending = []
+        for recipient in subscriber_index().recipients(detection.latitude, detection.longitude):
+            alert = outcomes.get(f"{message.idempotency_key}:subscriber:{recipient['id']}")
+            if alert is None or alert.status != SENT:
+                pending.append(recipient)
+
+        failures = []
+        # Sends run concurrently; outcomes are recorded here as each one finishes
+        for recipient, outcome in fan_out(pending, messages):
+            key = f"{message.idempotency_key}:subscriber:{recipient['id']}"
+            channel, success = outcome['channel'], outcome['success']
+            error = None if success else (outcome['status'] or 'Provider reported failure')
+            alert = outcomes.get(key)
+            if alert is None:
+                alert = Alert(detection_id=detection.id, alert_type=message.kind,
+                              subscriber_id=recipient['id'], idempotency_key=key, attempts=0)
+                db.session.add(alert)
+            alert.channel = channel
+            alert.message = messages['sms'] if channel == 'sms' else messages['email_subject']
+            alert.recipients = recipient['phone'] if channel == 'sms' else recipient['email']
+            alert.sms_sent = success and channel == 'sms'
+            alert.email_sent = success and channel == 'email'
+            alert.status = SENT if success else FAILED
+            alert.error = error
+            alert.provider = outcome['provider']
+            alert.provider_status = outcome['status']
+            alert.provider_message_id = outcome['message_id']
+            alert.attempts = (alert.attempts or 0) + 1
+            alert.sent_at = datetime.utcnow() if success else None
+            # Record each outcome right away so a retry skips this recipient
+            db.session.commit()
+
+            with self._lock:
+                self._stats['recipients_sent' if success else 'recipients_failed'] += 1
+            if not success:
+                failures.append(f"subscriber {recipient['id']}: {error}")
+
+        if not failures:
+            return self._finish(message, SENT, None)
+        error = '; '.join(failures)[:2000]
+        if message.attempts + 1 >= self.max_attempts:
+            return self._finish(message, FAILED, error)
+        return self._finish(message, PENDING, error)
+
+    def _finish(self, message: OutboxMessage, status: str, error: Optional[str]) -> str:
+        now = datetime.utcnow()
+        message.attempts += 1
+        message.status = status
+        message.last_error = error
+        message.locked_until = None
+        if status == PENDING:
+            message.next_attempt_at = now + timedelta(seconds=self.retry_base * 2 ** (message.attempts - 1))
+        if status == SENT:
+            message.sent_at = now
+        db.session.commit()
+
+        with self._lock:
+            if status == SENT:
+                self._stats['sent'] += 1
+                # Digests are held back on purpose until their window closes
+                if message.kind != 'digest':
+                    elapsed_ms = (now - message.created_at).total_seconds() * 1000
+                    self._stats['delivery_count'] += 1
+                    self._stats['delivery_ms_total'] += elapsed_ms
+                    self._stats['delivery_ms_max'] = max(self._stats['delivery_ms_max'], elapsed_ms)
+                    self._latencies.setdefault(band(message.priority), deque(maxlen=LATENCY_SAMPLES)).append(elapsed_ms)
+            elif status == PENDING:
+                self._stats['retried'] += 1
+            elif status == FAILED:
+                self._stats['failed'] += 1
+        if status == FAILED:
+            logger.error(f"Notification {message.idempotency_key} failed after {message.attempts} attempts: {error}")
+        return status
+
+
+# Global dispatcher, bound to the app in create_app
+notification_dispatcher = NotificationDispatcher()
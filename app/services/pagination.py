@@ -0,0 +1,159 @@
+"""
+Pagination - keyset (cursor) pagination for detection lists
+
+Lists are read newest first on (timestamp, id). Each page carries an opaque
+``next_cursor`` naming its last row; passing it back continues right after
+that row, so every page is an index range scan however deep the client
+goes. Totals are opt-in: up to ``PAGE_COUNT_CAP`` rows are counted exactly,
+beyond that an estimate is returned.
+"""
+import base64
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from app import db
+from app.models import Detection
+from config.detection_config import PAGE_MAX_LIMIT, PAGE_COUNT_CAP
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue"""
+
+
+def encode_cursor(detection: Detection) -> str:
+    payload = json.dumps([detection.timestamp.isoformat(), detection.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, detection_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), int(detection_id)
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+
+def page_args(args, default_limit: int = 50) -> Tuple[int, Optional[str], bool]:
+    """
+    Read limit, cursor and include_total from request args.
+
+    ``per_page`` is accepted as an alias of ``limit``.
+    """
+    limit = args.get('limit', args.get('per_page', default_limit, type=int), type=int)
+    cursor = args.get('cursor') or None
+    include_total = args.get('include_total', 'false').lower() in ('true', '1', 'yes')
+    return limit, cursor, include_total
+
+
+def keyset_page(query, limit: int, cursor: str = None, include_total: bool = False) -> Dict:
+    """
+    Fetch one page of detections, newest first.
+
+    Args:
+        query: Detection query with filters but no ordering
+        limit: Page size (clamped to 1..PAGE_MAX_LIMIT)
+        cursor: ``next_cursor`` from the previous page, or None for the first page
+        include_total: Also return the (possibly estimated) number of matching rows
+
+    Returns:
+        Dict with items, has_more, next_cursor and, if requested, total and
+        total_is_estimate
+
+    Raises:
+        InvalidCursor: If the cursor cannot be decoded
+    """
+    limit = max(1, min(limit, PAGE_MAX_LIMIT))
+
+    # One extra row tells us whether another page exists
+    rows = keyset_query(query, cursor).limit(limit + 1).all()
+    items = rows[:limit]
+    has_more = len(rows) > limit
+
+    page = {
+        'items': items,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(items[-1]) if has_more else None,
+    }
+    if include_total:
+        page['total'], exact = estimate_total(query)
+        page['total_is_estimate'] = not exact
+    return page
+
+
+def keyset_query(query, cursor: str = None):
+    """Order a detection query newest first and start it after ``cursor``"""
+    if cursor:
+        timestamp, last_id = decode_cursor(cursor)
+        lower, upper = _timestamp_bounds(timestamp)
+        # Same as (timestamp, id) < (:timestamp, :id), written so the
+        # timestamp bound can drive an index range scan on every backend
+        query = query.filter(
+            Detection.timestamp <= upper,
+            db.or_(Detection.timestamp < lower, Detection.id < last_id)
+        )
+    return query.order_by(Detection.timestamp.desc(), Detection.id.desc())
+
+
+def _timestamp_bounds(timestamp: datetime) -> Tuple:
+    """
+    Values that compare equal to ``timestamp`` as stored, lowest and highest.
+
+    SQLite keeps DATETIME as text: the ORM writes '12:00:00.000000' while
+    CURRENT_TIMESTAMP and raw SQL write '12:00:00', and the two sort apart.
+    For a whole second both spellings are treated as the cursor's timestamp.
+    """
+    if db.engine.dialect.name == 'sqlite' and not timestamp.microsecond:
+        whole = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        return db.literal(whole, db.String), db.literal(f'{whole}.000000', db.String)
+    return timestamp, timestamp
+
+
+def page_payload(page: Dict) -> Dict:
+    """JSON body fields for a page returned by keyset_page"""
+    payload = {
+        'detections': [d.to_dict() for d in page['items']],
+        'count': len(page['items']),
+        'has_more': page['has_more'],
+        'next_cursor': page['next_cursor'],
+    }
+    if 'total' in page:
+        payload['total'] = page['total']
+        payload['total_is_estimate'] = page['total_is_estimate']
+    return payload
+
+
+def estimate_total(query, cap: int = PAGE_COUNT_CAP) -> Tuple[int, bool]:
+    """
+    Count the rows matching a query without scanning all of them.
+
+    At most ``cap + 1`` rows are counted. Past the cap the query planner's
+    row estimate is used where the backend exposes one (PostgreSQL);
+    otherwise ``cap`` is returned as a lower bound.
+
+    Returns:
+        (total, exact)
+    """
+    capped = query.order_by(None).limit(cap + 1).subquery()
+    counted = db.session.query(db.func.count()).select_from(capped).scalar()
+    if counted <= cap:
+        return counted, True
+    estimate = _planner_estimate(query)
+    return max(estimate or 0, cap), False
+
+
+def _planner_estimate(query) -> Optional[int]:
+    if db.engine.dialect.name != 'postgresql':
+        return None
+    try:
+        statement = query.order_by(None).statement.compile(
+            db.engine, compile_kwargs={'literal_binds': True})
+        plan = db.session.execute(db.text(f'EXPLAIN (FORMAT JSON) {statement}')).scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.warning(f"Could not estimate row count: {e}")
+        return None
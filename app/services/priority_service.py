@@ -0,0 +1,46 @@
+"""
+Priority Service - which notifications go out first under a backlog
+
+Each outbox row gets an integer priority when it is written; the
+dispatcher claims due rows highest priority first, so a lion at a village
+is sent before a queue of zebras. The hundreds digit is the species'
+threat level (SpeciesClassifier.WILDLIFE_SPECIES), the rest ranks
+detections inside or near a geofence covering the species, then confidence.
+"""
+import logging
+
+from app.services.geofence_service import geofence_service
+from ml.species_classifier import SpeciesClassifier
+from config.detection_config import OUTBOX_NEAR_GEOFENCE_KM
+
+logger = logging.getLogger(__name__)
+
+THREAT_RANKS = {'high': 3, 'medium': 2, 'unknown': 1, 'low': 0}
+THREAT_BANDS = {rank: level for level, rank in THREAT_RANKS.items()}
+
+INSIDE_GEOFENCE = 50
+NEAR_GEOFENCE = 25
+CONFIDENCE_POINTS = 20
+
+
+def threat_level(species: str) -> str:
+    return SpeciesClassifier.WILDLIFE_SPECIES.get(species, {}).get('threat_level', 'unknown')
+
+
+def priority_of(detection) -> int:
+    """Priority of a detection's notification (higher is sent sooner)"""
+    priority = THREAT_RANKS[threat_level(detection.species)] * 100
+    try:
+        if geofence_service.find(detection.latitude, detection.longitude, detection.species):
+            priority += INSIDE_GEOFENCE
+        elif geofence_service.near(detection.latitude, detection.longitude, OUTBOX_NEAR_GEOFENCE_KM,
+                                   detection.species):
+            priority += NEAR_GEOFENCE
+    except Exception as e:
+        logger.error(f"Geofence lookup for notification priority failed: {e}")
+    return priority + round(min(max(detection.confidence or 0.0, 0.0), 1.0) * CONFIDENCE_POINTS)
+
+
+def band(priority: int) -> str:
+    """Threat level a priority was computed from"""
+    return THREAT_BANDS.get((priority or 0) // 100, 'unknown')
@@ -0,0 +1,193 @@
+"""
+Rollup Service - hourly and daily detection counts
+
+Reports read counts per hour/day, species and camera from the
+``detection_rollups_hourly`` and ``detection_rollups_daily`` tables instead
+of aggregating raw detections. Rollups are keyed by the detection's own
+timestamp and updated in the same transaction as the write (the same hooks
+as stats_service), so a late camera-trap upload lands in the bucket it was
+captured in and marking a false positive takes it back out.
+``rebuild_rollups`` recomputes a window from the raw rows as a repair job.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Detection, DetectionRollupHourly, DetectionRollupDaily
+from app.services.stats_service import upsert_increment
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    'hour': DetectionRollupHourly,
+    'day': DetectionRollupDaily,
+}
+BUCKET_STEP = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+# Detection columns the rollups depend on
+_ROLLED_UP_FIELDS = ('species', 'camera_id', 'timestamp', 'confidence', 'is_false_positive')
+
+
+def bucket_start(timestamp: datetime, granularity: str) -> datetime:
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add(deltas: Dict, values, sign: int):
+    species, camera_id, timestamp, confidence, is_false_positive = values
+    if is_false_positive or timestamp is None:
+        return
+    for granularity in GRANULARITIES:
+        key = (granularity, bucket_start(timestamp, granularity), species, camera_id or '')
+        delta = deltas.setdefault(key, [0, 0.0])
+        delta[0] += sign
+        delta[1] += sign * (confidence or 0.0)
+
+
+def _current_values(detection: Detection):
+    return tuple(getattr(detection, field) for field in _ROLLED_UP_FIELDS)
+
+
+def _previous_values(detection: Detection):
+    """Rolled-up values as of the last flush, from the attribute history"""
+    state = inspect(detection)
+    values = []
+    for field in _ROLLED_UP_FIELDS:
+        history = state.attrs[field].history
+        values.append(history.deleted[0] if history.deleted else getattr(detection, field))
+    return tuple(values)
+
+
+def apply_deltas(deltas: Dict, connection=None):
+    """
+    Add (count, confidence_sum) deltas to the rollup rows inside the current transaction.
+
+    Args:
+        deltas: (granularity, bucket, species, camera_id) -> [count, confidence_sum]
+        connection: Connection to write on (defaults to the session's)
+    """
+    for granularity, model in GRANULARITIES.items():
+        rows = [
+            {'bucket': bucket, 'species': species, 'camera_id': camera_id,
+             'count': count, 'confidence_sum': confidence_sum}
+            for (g, bucket, species, camera_id), (count, confidence_sum) in sorted(deltas.items())
+            if g == granularity and (count or confidence_sum)
+        ]
+        upsert_increment(model.__table__, ['bucket', 'species', 'camera_id'], rows, connection)
+
+
+def record_inserted(detections: Iterable[Detection]):
+    """Roll up detections written outside the ORM unit of work (bulk INSERT ... RETURNING)"""
+    deltas = {}
+    for detection in detections:
+        _add(deltas, _current_values(detection), 1)
+    apply_deltas(deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _roll_up_flushed_detections(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Detection):
+            _add(deltas, _current_values(obj), 1)
+    for obj in session.dirty:
+        if isinstance(obj, Detection) and session.is_modified(obj, include_collections=False):
+            _add(deltas, _previous_values(obj), -1)
+            _add(deltas, _current_values(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, Detection):
+            _add(deltas, _previous_values(obj), -1)
+    if deltas:
+        apply_deltas(deltas, session.connection())
+
+
+def timeseries(granularity: str, start: datetime, end: datetime, species: str = None,
+               camera_id: str = None) -> List[Dict]:
+    """
+    Detection counts per bucket between start and end, gaps filled with zeros.
+
+    Args:
+        granularity: 'hour' or 'day'
+        start: First bucket (rounded down to the bucket start)
+        end: Last instant to include
+        species: Only count this species (optional)
+        camera_id: Only count this camera (optional; '' for unknown camera)
+
+    Returns:
+        List of dicts with bucket (ISO start time), count and avg_confidence
+    """
+    model = GRANULARITIES[granularity]
+    first = bucket_start(start, granularity)
+
+    query = db.session.query(
+        model.bucket,
+        db.func.sum(model.count),
+        db.func.sum(model.confidence_sum)
+    ).filter(model.bucket >= first, model.bucket <= end)
+    if species:
+        query = query.filter(model.species == species)
+    if camera_id is not None:
+        query = query.filter(model.camera_id == camera_id)
+    totals = {bucket: (count, confidence_sum)
+              for bucket, count, confidence_sum in query.group_by(model.bucket).all()}
+
+    series = []
+    bucket = first
+    while bucket <= end:
+        count, confidence_sum = totals.get(bucket, (0, 0.0))
+        series.append({
+            'bucket': bucket.isoformat(),
+            'count': count,
+            'avg_confidence': round(confidence_sum / count, 4) if count else None
+        })
+        bucket += BUCKET_STEP[granularity]
+    return series
+
+
+def rebuild_rollups(since: Optional[datetime] = None) -> int:
+    """
+    Recompute the rollups from the detections table in one transaction.
+
+    Args:
+        since: Only rebuild buckets from this day on (default: everything)
+
+    Returns:
+        Number of detections rolled up
+    """
+    start = bucket_start(since, 'day') if since else None
+    for model in GRANULARITIES.values():
+        query = db.session.query(model)
+        if start:
+            query = query.filter(model.bucket >= start)
+        query.delete(synchronize_session=False)
+
+    rows = db.session.query(
+        Detection.species, Detection.camera_id, Detection.timestamp, Detection.confidence
+    ).filter(db.or_(Detection.is_false_positive.is_(None), Detection.is_false_positive == db.false()))
+    if start:
+        rows = rows.filter(Detection.timestamp >= start)
+
+    deltas = {}
+    scanned = 0
+    for species, camera_id, timestamp, confidence in rows.yield_per(5000):
+        _add(deltas, (species, camera_id, timestamp, confidence, False), 1)
+        scanned += 1
+    apply_deltas(deltas)
+    db.session.commit()
+    logger.info(f"Rebuilt detection rollups from {scanned} detections")
+    return scanned
+
+
+def ensure_rollups():
+    """Seed the rollups if they are empty but detections exist (e.g. right after the migration)"""
+    if db.session.query(DetectionRollupDaily.bucket).first() is None \
+            and db.session.query(Detection.id).first() is not None:
+        rebuild_rollups()
@@ -1,8 +1,97 @@
 import os
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from flask import current_app
+from typing import Dict, List
+from config.detection_config import SMS_TIMEOUT, SMS_BATCH_SIZE, NOTIFY_CONCURRENCY
+
+MESSAGING_URL = 'https://api.africastalking.com/version1/messaging'
+# Recipient statusCodes meaning the message was accepted: Processed, Sent, Queued
+ACCEPTED_STATUS_CODES = {100, 101, 102}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session():
+    """requests.Session shared by every Africa's Talking request, keeping connections alive"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=NOTIFY_CONCURRENCY))
+        return _session
+
+def number_key(number: str) -> str:
+    """Last 9 digits of a phone number, so '0712 345678' matches '+254712345678'"""
+    return ''.join(ch for ch in str(number) if ch.isdigit())[-9:]
 
 class SMSService:
+    @staticmethod
+    def configured() -> bool:
+        return all([current_app.config.get('AFRICASTALKING_API_KEY'),
+                    current_app.config.get('AFRICASTALKING_USERNAME')])
+
+    @staticmethod
+    def send_bulk(numbers: List[str], message: str, batch_size: int = SMS_BATCH_SIZE) -> Dict[str, Dict]:
+        """
+        Send one message to many numbers, batch_size numbers per request
+        (Africa's Talking accepts a comma-separated 'to' list)
+
+        Returns:
+            Dict of number -> {success, status, message_id, request_failed},
+            parsed from the per-recipient entries of each response;
+            request_failed marks numbers whose request got no response
+        """
+        results = {}
+        for start in range(0, len(numbers), batch_size):
+            results.update(SMSService._send_batch(numbers[start:start + batch_size], message))
+        return results
+
+    @staticmethod
+    def _send_batch(numbers: List[str], message: str) -> Dict[str, Dict]:
+        try:
+            response = http_session().post(
+                MESSAGING_URL,
+                headers={
+                    'ApiKey': current_app.config['AFRICASTALKING_API_KEY'],
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                    'Accept': 'application/json'
+                },
+                data={
+                    'username': current_app.config['AFRICASTALKING_USERNAME'],
+                    'to': ','.join(numbers),
+                    'message': message,
+                    'from': 'WildGuard'
+                },
+                timeout=SMS_TIMEOUT
+            )
+            response.raise_for_status()
+            reported = response.json()['SMSMessageData']['Recipients']
+        except Exception as e:
+            current_app.logger.error(f"Failed to send bulk SMS to {len(numbers)} numbers: {str(e)}")
+            return {number: {'success': False, 'status': str(e), 'message_id': None, 'request_failed': True}
+                    for number in numbers}
+
+        # The API reports numbers in international format; match them back by their last digits
+        by_key = {number_key(entry.get('number')): entry for entry in reported}
+        results = {}
+        for number in numbers:
+            entry = by_key.get(number_key(number))
+            if entry is None:
+                results[number] = {'success': False, 'status': 'NotReported', 'message_id': None,
+                                   'request_failed': False}
+                continue
+            message_id = entry.get('messageId')
+            results[number] = {
+                'success': int(entry.get('statusCode', 0)) in ACCEPTED_STATUS_CODES,
+                'status': entry.get('status'),
+                'message_id': message_id if message_id and message_id != 'None' else None,
+                'request_failed': False
+            }
+        return results
+
     @staticmethod
     def send_sms(to_number, message):
         """
@@ -27,10 +116,11 @@ class SMSService:
                 'from': 'WildGuard'
             }
             
-            response = requests.post(
-                'https://api.africastalking.com/version1/messaging',
+            response = http_session().post(
+                MESSAGING_URL,
                 headers=headers,
-                data=data
+                data=data,
+                timeout=SMS_TIMEOUT
             )
             
             response.raise_for_status()
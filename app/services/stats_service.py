@@ -0,0 +1,186 @@
+"""
+Stats Service - running detection counters
+
+``detection_stats`` holds the counts behind /api/stats and the dashboard
+summary (total, verified, false positives, high confidence, per species),
+so reading them touches a handful of rows however large ``detections`` is.
+Counters change in the same transaction as the rows they count: an
+``after_flush`` hook covers ORM inserts, updates and deletes, and the bulk
+insert path calls ``record_inserted``. Bulk deletes (``query.delete()``)
+bypass both, so callers rebuild the counters afterwards.
+"""
+import logging
+from collections import Counter
+from typing import Dict, Iterable, List
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Detection, DetectionStat
+
+logger = logging.getLogger(__name__)
+
+HIGH_CONFIDENCE = 0.9
+
+# Detection columns the counters depend on
+_COUNTED_FIELDS = ('species', 'confidence', 'is_verified', 'is_false_positive')
+
+
+def counter_keys(species: str, confidence: float, is_verified: bool, is_false_positive: bool) -> List[str]:
+    """Counters a detection with these values contributes 1 to"""
+    keys = ['total', f'species:{species}']
+    if is_verified:
+        keys.append('verified')
+    if is_false_positive:
+        keys.append('false_positives')
+    else:
+        keys.append(f'active_species:{species}')
+    if confidence is not None and confidence >= HIGH_CONFIDENCE:
+        keys.append('high_confidence')
+    return keys
+
+
+def _current_keys(detection: Detection) -> List[str]:
+    return counter_keys(*(getattr(detection, field) for field in _COUNTED_FIELDS))
+
+
+def _previous_keys(detection: Detection) -> List[str]:
+    """Counter keys as of the last flush, from the attribute history"""
+    state = inspect(detection)
+    values = []
+    for field in _COUNTED_FIELDS:
+        history = state.attrs[field].history
+        values.append(history.deleted[0] if history.deleted else getattr(detection, field))
+    return counter_keys(*values)
+
+
+def apply_deltas(deltas: Dict[str, int], connection=None):
+    """
+    Add deltas to the counters inside the current transaction.
+
+    Args:
+        deltas: Counter key -> amount to add (may be negative)
+        connection: Connection to write on (defaults to the session's)
+    """
+    params = [{'key': key, 'value': value} for key, value in sorted(deltas.items()) if value]
+    upsert_increment(DetectionStat.__table__, ['key'], params, connection)
+
+
+def upsert_increment(table, key_columns: List[str], rows: List[Dict], connection=None):
+    """
+    Add each row's non-key values to the matching row of ``table``, inserting it if missing.
+
+    Uses INSERT ... ON CONFLICT DO UPDATE on SQLite and PostgreSQL, and
+    UPDATE-then-INSERT elsewhere.
+    """
+    if not rows:
+        return
+    connection = connection or db.session.connection()
+    value_columns = [c for c in rows[0] if c not in key_columns]
+
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[c] for c in key_columns],
+            set_={c: table.c[c] + stmt.excluded[c] for c in value_columns}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        match = db.and_(*(table.c[c] == row[c] for c in key_columns))
+        result = connection.execute(
+            table.update().where(match).values({c: table.c[c] + row[c] for c in value_columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def record_inserted(detections: Iterable[Detection]):
+    """Count detections written outside the ORM unit of work (bulk INSERT ... RETURNING)"""
+    deltas = Counter()
+    for detection in detections:
+        deltas.update(_current_keys(detection))
+    apply_deltas(deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flushed_detections(session, flush_context):
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Detection):
+            deltas.update(_current_keys(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Detection) and session.is_modified(obj, include_collections=False):
+            deltas.subtract(_previous_keys(obj))
+            deltas.update(_current_keys(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Detection):
+            deltas.subtract(_previous_keys(obj))
+    if deltas:
+        apply_deltas(deltas, session.connection())
+
+
+def get_counters() -> Dict[str, int]:
+    return dict(db.session.query(DetectionStat.key, DetectionStat.value).all())
+
+
+def get_stats() -> Dict:
+    """Detection statistics in the shape returned by DetectionService.get_stats"""
+    counters = get_counters()
+    return {
+        'total_detections': counters.get('total', 0),
+        'verified': counters.get('verified', 0),
+        'false_positives': counters.get('false_positives', 0),
+        'species': _by_prefix(counters, 'species:')
+    }
+
+
+def top_species(limit: int = 5) -> List[Dict]:
+    """Most detected species, false positives excluded"""
+    counts = _by_prefix(get_counters(), 'active_species:')
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [{'species': s, 'count': c} for s, c in ranked]
+
+
+def _by_prefix(counters: Dict[str, int], prefix: str) -> Dict[str, int]:
+    return {key[len(prefix):]: value for key, value in counters.items()
+            if key.startswith(prefix) and value}
+
+
+def rebuild_stats() -> Dict[str, int]:
+    """
+    Recompute every counter from the detections table in one transaction.
+
+    Returns:
+        The rebuilt counters
+    """
+    high = (Detection.confidence >= HIGH_CONFIDENCE).label('high')
+    groups = db.session.query(
+        Detection.species, Detection.is_verified, Detection.is_false_positive, high,
+        db.func.count(Detection.id)
+    ).group_by(Detection.species, Detection.is_verified, Detection.is_false_positive, high).all()
+
+    counters = Counter({'total': 0, 'verified': 0, 'false_positives': 0, 'high_confidence': 0})
+    for species, is_verified, is_false_positive, is_high, count in groups:
+        confidence = HIGH_CONFIDENCE if is_high else 0.0
+        for key in counter_keys(species, confidence, is_verified, is_false_positive):
+            counters[key] += count
+
+    db.session.query(DetectionStat).delete()
+    db.session.add_all(DetectionStat(key=key, value=value) for key, value in counters.items())
+    db.session.commit()
+    logger.info(f"Rebuilt detection stats from {counters['total']} detections")
+    return dict(counters)
+
+
+def ensure_stats():
+    """Seed the counters if they have never been built (e.g. a database made by create_all)"""
+    if db.session.get(DetectionStat, 'total') is None:
+        rebuild_stats()
@@ -7,6 +7,11 @@ import os
 import logging
 from typing import Dict, Optional
 from app.services.detection_services import get_detection_service
+from ml.tracker import ObjectTracker
+from config.detection_config import (
+    TRACKING_ENABLED, TRACK_IOU_THRESHOLD, TRACK_MIN_HITS, TRACK_MAX_AGE,
+    TRACK_UPDATE_INTERVAL, TRACK_SMOOTHING, WRITE_BEHIND_ENABLED
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +25,15 @@ class StreamWorker:
         self._stop_event = threading.Event()
         self._thread = threading.Thread(target=self._run, daemon=True)
         self.capture = None
+        # Collapse an animal that stays in view into one track instead of a row per frame
+        self.tracker = ObjectTracker(
+            camera_id=stream_id,
+            iou_threshold=TRACK_IOU_THRESHOLD,
+            min_hits=TRACK_MIN_HITS,
+            max_age=TRACK_MAX_AGE,
+            update_interval=TRACK_UPDATE_INTERVAL,
+            smoothing=TRACK_SMOOTHING
+        ) if TRACKING_ENABLED else None
 
     def start(self):
         logger.info(f"Starting stream worker {self.stream_id} for {self.url}")
@@ -87,7 +101,9 @@ class StreamWorker:
                         longitude=None,
                         conf_threshold=0.5,
                         socketio=app_socketio,
-                        camera_id=self.stream_id
+                        camera_id=self.stream_id,
+                        tracker=self.tracker,
+                        write_behind=WRITE_BEHIND_ENABLED
                     )
                 except Exception as e:
                     logger.exception(f"Error processing frame from stream {self.stream_id}: {e}")
@@ -0,0 +1,250 @@
+"""
+Tile Service - precomputed detection density (heatmap) tiles
+
+Months of detections cannot be shipped to a browser as points, so their
+density is rendered into standard 256px web-map tiles (z/x/y, Web
+Mercator) under ``HEAT_TILE_DIR``. Each tile is stored twice: a compact
+grid of counts (``{y}.bin``, HEAT_TILE_GRID x HEAT_TILE_GRID uint32) and
+the PNG that is served.
+
+Builds are incremental. A watermark file records when the last build
+started; the next build re-counts only the deepest-zoom tiles holding
+detections whose ``updated_at`` is newer (new rows, or rows marked as
+false positives since), then rebuilds their parent tiles by summing the
+children's count grids, so only the deepest zoom ever reads detections.
+Bulk deletes bypass ``updated_at``; ``reset_tiles`` drops everything and
+the next build starts from scratch.
+"""
+import functools
+import io
+import json
+import logging
+import math
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Set, Tuple
+
+import numpy as np
+from flask import current_app
+
+from app import db
+from app.models import Detection
+from app.services.map_services import map_service
+from config.detection_config import (
+    HEAT_TILE_DIR, HEAT_TILE_MIN_ZOOM, HEAT_TILE_MAX_ZOOM, HEAT_TILE_GRID, HEAT_TILE_SATURATION
+)
+
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256
+MAX_LATITUDE = 85.0511287798  # Web Mercator covers +/- this latitude
+
+_WATERMARK_FILE = 'watermark.json'
+# Rows committed just after a build started can carry an earlier updated_at
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+def tile_dir() -> str:
+    return (current_app.config.get('HEAT_TILE_DIR') or HEAT_TILE_DIR
+            or os.path.join(current_app.instance_path, 'tiles', 'heat'))
+
+
+def tile_path(z: int, x: int, y: int, ext: str = 'png') -> str:
+    return os.path.join(tile_dir(), str(z), str(x), f'{y}.{ext}')
+
+
+def tile_bounds(z: int, x: int, y: int) -> Dict[str, float]:
+    """Latitude/longitude bounds of a tile, in the shape of MapService.get_bounding_box"""
+    n = 2 ** z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return {
+        'min_lat': latitude(y + 1),
+        'max_lat': latitude(y),
+        'min_lon': x / n * 360.0 - 180.0,
+        'max_lon': (x + 1) / n * 360.0 - 180.0,
+    }
+
+
+def _project(latitudes, longitudes, z: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fractional tile coordinates of points at zoom z"""
+    n = 2 ** z
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=float), -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(longitudes, dtype=float) + 180.0) / 360.0 * n
+    y = (1.0 - np.arcsinh(np.tan(lat)) / math.pi) / 2.0 * n
+    # Keep the antimeridian and the poles inside the last tile
+    limit = np.nextafter(n, 0)
+    return np.clip(x, 0, limit), np.clip(y, 0, limit)
+
+
+def tiles_for(latitudes, longitudes, z: int = HEAT_TILE_MAX_ZOOM) -> Set[Tuple[int, int, int]]:
+    """Tiles at zoom z containing the given points"""
+    if not len(latitudes):
+        return set()
+    x, y = _project(latitudes, longitudes, z)
+    cells = np.unique(np.stack([x.astype(np.int64), y.astype(np.int64)], axis=1), axis=0)
+    return {(z, int(tx), int(ty)) for tx, ty in cells}
+
+
+def count_tile(z: int, x: int, y: int) -> np.ndarray:
+    """Count the active detections in each grid cell of a tile (reads the detections table)"""
+    bounds = tile_bounds(z, x, y)
+    rows = db.session.query(Detection.latitude, Detection.longitude).filter(
+        *map_service.bbox_filter(bounds),
+        Detection.is_false_positive == db.false()
+    ).all()
+
+    counts = np.zeros((HEAT_TILE_GRID, HEAT_TILE_GRID), dtype=np.uint32)
+    if rows:
+        points = np.asarray(rows, dtype=float)
+        px, py = _project(points[:, 0], points[:, 1], z)
+        # Points on a shared edge belong to one tile only
+        inside = (px.astype(np.int64) == x) & (py.astype(np.int64) == y)
+        col = ((px[inside] - x) * HEAT_TILE_GRID).astype(np.int64)
+        row = ((py[inside] - y) * HEAT_TILE_GRID).astype(np.int64)
+        np.add.at(counts, (row, col), 1)
+    return counts
+
+
+def merge_children(z: int, x: int, y: int) -> np.ndarray:
+    """Counts of a tile built from the count grids of its four children at z + 1"""
+    half = HEAT_TILE_GRID // 2
+    counts = np.zeros((HEAT_TILE_GRID, HEAT_TILE_GRID), dtype=np.uint32)
+    for dy in (0, 1):
+        for dx in (0, 1):
+            child = load_counts(z + 1, 2 * x + dx, 2 * y + dy)
+            if child is None:
+                continue
+            # Each 2x2 block of the child becomes one cell of the parent
+            reduced = child.reshape(half, 2, half, 2).sum(axis=(1, 3))
+            counts[dy * half:(dy + 1) * half, dx * half:(dx + 1) * half] = reduced
+    return counts
+
+
+def load_counts(z: int, x: int, y: int) -> Optional[np.ndarray]:
+    path = tile_path(z, x, y, 'bin')
+    if not os.path.exists(path):
+        return None
+    return np.fromfile(path, dtype='<u4').reshape(HEAT_TILE_GRID, HEAT_TILE_GRID)
+
+
+def render_png(counts: np.ndarray) -> bytes:
+    """Colour a count grid yellow to red on a log scale, transparent where empty"""
+    from PIL import Image
+
+    intensity = np.clip(np.log1p(counts) / math.log1p(HEAT_TILE_SATURATION), 0.0, 1.0)
+    rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 1] = (255 * (1.0 - intensity)).astype(np.uint8)
+    rgba[..., 3] = np.where(counts > 0, 80 + 175 * intensity, 0).astype(np.uint8)
+
+    image = Image.fromarray(rgba, 'RGBA').resize((TILE_SIZE, TILE_SIZE), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+@functools.lru_cache(maxsize=1)
+def blank_tile() -> bytes:
+    """Transparent tile served where nothing has been detected"""
+    return render_png(np.zeros((HEAT_TILE_GRID, HEAT_TILE_GRID), dtype=np.uint32))
+
+
+def _write_atomic(path: str, data: bytes):
+    # Readers see the old tile or the new one, never half of one
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def save_tile(z: int, x: int, y: int, counts: np.ndarray) -> bool:
+    """Write a tile's counts and PNG, or remove the tile if it is empty. Returns True if written."""
+    if not counts.any():
+        for ext in ('bin', 'png'):
+            path = tile_path(z, x, y, ext)
+            if os.path.exists(path):
+                os.remove(path)
+        return False
+    _write_atomic(tile_path(z, x, y, 'bin'), counts.astype('<u4').tobytes())
+    _write_atomic(tile_path(z, x, y), render_png(counts))
+    return True
+
+
+def _read_watermark() -> Optional[datetime]:
+    try:
+        with open(os.path.join(tile_dir(), _WATERMARK_FILE)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Tiles built with another grid or zoom range cannot be merged with new ones
+    if state.get('grid') != HEAT_TILE_GRID or state.get('max_zoom') != HEAT_TILE_MAX_ZOOM:
+        return None
+    return datetime.fromisoformat(state['watermark'])
+
+
+def _write_watermark(watermark: datetime):
+    state = {'watermark': watermark.isoformat(), 'grid': HEAT_TILE_GRID, 'max_zoom': HEAT_TILE_MAX_ZOOM}
+    _write_atomic(os.path.join(tile_dir(), _WATERMARK_FILE), json.dumps(state).encode())
+
+
+def reset_tiles():
+    """Delete every tile and the watermark (the next build renders from scratch)"""
+    shutil.rmtree(tile_dir(), ignore_errors=True)
+
+
+def _changed_tiles(since: Optional[datetime]) -> Tuple[Set[Tuple[int, int, int]], int]:
+    """Deepest-zoom tiles holding detections changed since ``since`` (all detections if None)"""
+    query = db.session.query(Detection.latitude, Detection.longitude).filter(
+        Detection.latitude.isnot(None), Detection.longitude.isnot(None))
+    if since is not None:
+        query = query.filter(Detection.updated_at > since - _WATERMARK_OVERLAP)
+
+    tiles, scanned, batch = set(), 0, []
+    for row in query.yield_per(5000):
+        batch.append(row)
+        if len(batch) == 5000:
+            points = np.asarray(batch, dtype=float)
+            tiles |= tiles_for(points[:, 0], points[:, 1])
+            scanned += len(batch)
+            batch = []
+    if batch:
+        points = np.asarray(batch, dtype=float)
+        tiles |= tiles_for(points[:, 0], points[:, 1])
+        scanned += len(batch)
+    return tiles, scanned
+
+
+def build_tiles(full: bool = False) -> Dict[str, int]:
+    """
+    Render the heatmap tiles touched since the last build.
+
+    Args:
+        full: Discard the existing tiles and render everything
+
+    Returns:
+        Dict with detections (changed rows read), rendered and removed tile counts
+    """
+    started = datetime.utcnow()
+    since = None if full else _read_watermark()
+    if since is None:
+        reset_tiles()
+
+    dirty, scanned = _changed_tiles(since)
+    rendered = removed = 0
+    for z in range(HEAT_TILE_MAX_ZOOM, HEAT_TILE_MIN_ZOOM - 1, -1):
+        for _, x, y in sorted(dirty):
+            counts = count_tile(z, x, y) if z == HEAT_TILE_MAX_ZOOM else merge_children(z, x, y)
+            if save_tile(z, x, y, counts):
+                rendered += 1
+            else:
+                removed += 1
+        dirty = {(z - 1, x // 2, y // 2) for _, x, y in dirty}
+
+    _write_watermark(started)
+    logger.info(f"Heatmap tiles: {rendered} rendered, {removed} empty, from {scanned} changed detections")
+    return {'detections': scanned, 'rendered': rendered, 'removed': removed}
@@ -0,0 +1,274 @@
+"""
+Write Queue - write-behind persistence for detections
+
+Background producers (stream workers, the folder watcher) hand their
+detection rows to a bounded in-process queue instead of committing
+themselves. A single writer thread drains the queue and group-commits
+everything that arrived within ``flush_interval`` (up to ``batch_size``
+rows) in one transaction, so on SQLite there is one writer holding the
+write lock instead of one per producer thread.
+"""
+import atexit
+import queue
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+from config.detection_config import (
+    WRITE_QUEUE_MAXSIZE, WRITE_QUEUE_BATCH_SIZE, WRITE_QUEUE_FLUSH_INTERVAL, WRITE_QUEUE_PUT_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _WriteItem:
+    """Rows from one process_* call plus what to do once they are committed"""
+
+    def __init__(self, rows: List[Dict], new_flags: List[bool], socketio=None,
+                 alert_callback: Callable = None, notify: bool = False, on_commit: Callable = None):
+        self.rows = rows
+        self.new_flags = new_flags
+        self.socketio = socketio
+        self.alert_callback = alert_callback
+        self.notify = notify
+        self.on_commit = on_commit  # called with whether the rows were committed
+
+    def alert_detections(self, detections):
+        return [d for d, is_new in zip(detections, self.new_flags) if is_new]
+
+
+class DetectionWriteQueue:
+    def __init__(self, maxsize: int = WRITE_QUEUE_MAXSIZE, batch_size: int = WRITE_QUEUE_BATCH_SIZE,
+                 flush_interval: float = WRITE_QUEUE_FLUSH_INTERVAL,
+                 put_timeout: float = WRITE_QUEUE_PUT_TIMEOUT):
+        """
+        Initialize the queue.
+
+        Args:
+            maxsize: Queued writes before producers are blocked
+            batch_size: Maximum rows per group commit
+            flush_interval: Seconds to gather writes before committing
+            put_timeout: Seconds a producer blocks on a full queue before
+                the write is rejected
+        """
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self.app = None
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self._stats = {
+            'enqueued_rows': 0,
+            'committed_rows': 0,
+            'failed_rows': 0,
+            'rejected_writes': 0,
+            'commits': 0,
+            'commit_ms_total': 0.0,
+            'commit_ms_last': 0.0,
+            'commit_ms_max': 0.0,
+        }
+
+    def init_app(self, app):
+        first_init = self.app is None
+        self.app = app
+        app.extensions['detection_write_queue'] = self
+        if first_init:
+            # Commit whatever is still queued when the process exits
+            atexit.register(self.shutdown)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            if self.app is None:
+                raise RuntimeError("DetectionWriteQueue.init_app() has not been called")
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='detection-writer', daemon=True)
+            self._thread.start()
+            logger.info("Detection write-behind queue started")
+
+    def submit(self, rows: List[Dict], new_flags: List[bool] = None, socketio=None,
+               alert_callback: Callable = None, notify: bool = False, on_commit: Callable = None) -> bool:
+        """
+        Queue detection rows for the writer thread.
+
+        Blocks for up to ``put_timeout`` seconds while the queue is full.
+
+        Returns:
+            False if the queue stayed full (the caller should write synchronously)
+        """
+        if not rows:
+            return True
+        if not self.running:
+            self.start()
+        if new_flags is None:
+            new_flags = [True] * len(rows)
+        try:
+            self._queue.put(_WriteItem(rows, new_flags, socketio, alert_callback, notify, on_commit),
+                            timeout=self.put_timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats['rejected_writes'] += 1
+            logger.warning(f"Detection write queue full ({self.maxsize}); rejecting {len(rows)} rows")
+            return False
+        with self._lock:
+            self._stats['enqueued_rows'] += len(rows)
+        return True
+
+    def flush(self, timeout: float = 30.0) -> bool:
+        """Wait until everything queued so far has been committed"""
+        if not self.running:
+            return self._queue.empty()
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: float = 30.0):
+        """Commit what is queued and stop the writer thread"""
+        if not self.running:
+            return
+        self.flush(timeout)
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+        logger.info("Detection write-behind queue stopped")
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        commits = stats.pop('commits')
+        total_ms = stats.pop('commit_ms_total')
+        return {
+            'running': self.running,
+            'depth': self._queue.qsize(),
+            'maxsize': self.maxsize,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'commits': commits,
+            'commit_latency_ms': {
+                'last': round(stats.pop('commit_ms_last'), 3),
+                'avg': round(total_ms / commits, 3) if commits else 0.0,
+                'max': round(stats.pop('commit_ms_max'), 3),
+            },
+            **stats,
+        }
+
+    def _gather(self) -> List[_WriteItem]:
+        """Block for the first write, then collect more until the batch is full or the interval ends"""
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        items = [first]
+        rows = len(first.rows)
+        deadline = time.time() + self.flush_interval
+        while rows < self.batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item.rows)
+        return items
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            items = self._gather()
+            if not items:
+                continue
+            try:
+                with self.app.app_context():
+                    self._commit_group(items)
+            except Exception as e:
+                logger.exception(f"Detection writer failed: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+    def _commit_group(self, items: List[_WriteItem]):
+        # Imported here: detection_services imports this module
+        from app import db
+        from app.services.detection_services import get_detection_service
+
+        service = get_detection_service()
+        rows = [row for item in items for row in item.rows]
+        started = time.perf_counter()
+        try:
+            saved = service._bulk_insert(rows)
+            offset = 0
+            for item in items:
+                if item.notify:
+                    service._enqueue_notifications(item.alert_detections(saved[offset:offset + len(item.rows)]))
+                offset += len(item.rows)
+            service._commit(saved)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Group commit of {len(rows)} rows failed ({e}); retrying writes one by one")
+            self._commit_individually(items)
+            return
+        self._record_commit(len(rows), (time.perf_counter() - started) * 1000)
+
+        offset = 0
+        for item in items:
+            detections = saved[offset:offset + len(item.rows)]
+            offset += len(item.rows)
+            self._after_commit(service, item, detections)
+
+    def _commit_individually(self, items: List[_WriteItem]):
+        from app import db
+        from app.services.detection_services import get_detection_service
+
+        service = get_detection_service()
+        for item in items:
+            started = time.perf_counter()
+            try:
+                saved = service._bulk_insert(item.rows)
+                if item.notify:
+                    service._enqueue_notifications(item.alert_detections(saved))
+                service._commit(saved)
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self._stats['failed_rows'] += len(item.rows)
+                logger.error(f"Dropping {len(item.rows)} detection rows that failed to commit: {e}")
+                if item.on_commit:
+                    item.on_commit(False)
+                continue
+            self._record_commit(len(item.rows), (time.perf_counter() - started) * 1000)
+            self._after_commit(service, item, saved)
+
+    def _after_commit(self, service, item: _WriteItem, detections):
+        try:
+            if item.on_commit:
+                item.on_commit(True)
+            service._after_commit(detections, item.socketio, item.alert_callback,
+                                  item.alert_detections(detections))
+        except Exception as e:
+            logger.exception(f"Post-commit notification failed: {e}")
+
+    def _record_commit(self, rows: int, elapsed_ms: float):
+        with self._lock:
+            self._stats['commits'] += 1
+            self._stats['committed_rows'] += rows
+            self._stats['commit_ms_total'] += elapsed_ms
+            self._stats['commit_ms_last'] = elapsed_ms
+            self._stats['commit_ms_max'] = max(self._stats['commit_ms_max'], elapsed_ms)
+
+
+# Global write queue, bound to the app in create_app
+write_queue = DetectionWriteQueue()
@@ -1,7 +1,10 @@
 class ElephantDashboard {
     constructor() {
         this.map = null;
-        this.detectionMarkers = [];
+        this.detectionMarkers = new Map();  // detection id -> marker
+        this.detections = new Map();  // detection id -> detection shown on the map
+        this.maxMapDetections = 100;
+        this.mapWatermark = null;  // /map-data watermark for delta polling
         this.cameraMarkers = [];
         this.isDemoMode = false;
         this.demoInterval = null;
@@ -95,6 +98,15 @@ class ElephantDashboard {
             maxZoom: 18
         }).addTo(this.map);
 
+        // Detection density heatmap, prebuilt by `flask build-heat-tiles` up to
+        // the server's HEAT_TILE_MAX_ZOOM and upscaled beyond it
+        this.heatLayer = L.tileLayer('/tiles/heat/{z}/{x}/{y}.png', {
+            opacity: 0.7,
+            maxNativeZoom: Number(document.getElementById('map').dataset.heatMaxZoom),
+            maxZoom: 18
+        });
+        L.control.layers(null, { 'Detection density': this.heatLayer }).addTo(this.map);
+
         // Add a marker for Taveta KRCS Office
         L.marker([-3.396443, 37.676411])
             .addTo(this.map)
@@ -127,19 +139,30 @@ class ElephantDashboard {
 
     async loadMapData() {
         try {
-            console.log('Fetching map data...');
-            const response = await fetch('/map-data');
-            console.log('Response status:', response.status);
+            // After the first snapshot only ask for what changed since the last watermark
+            const url = this.mapWatermark
+                ? `/map-data?since=${encodeURIComponent(this.mapWatermark)}`
+                : '/map-data';
+            const response = await fetch(url);
             const data = await response.json();
-            console.log('Received data:', data);
 
             if (data.status === 'success') {
-                console.log('Updating map with', data.detections?.length || 0, 'detections and', data.cameras?.length || 0, 'cameras');
-                this.updateMap(data.detections || [], data.cameras || []);
-                this.updateSidebar(data.detections || []);
-                this.updateStats(data.detections || []);
+                if (data.mode === 'delta') {
+                    this.applyMapDelta(data.detections || [], data.removed || []);
+                    this.updateCameraMarkers(data.cameras || []);
+                } else {
+                    console.log('Updating map with', data.detections?.length || 0, 'detections and', data.cameras?.length || 0, 'cameras');
+                    this.updateMap(data.detections || [], data.cameras || []);
+                }
+                this.mapWatermark = data.watermark || null;
+
+                const detections = this.currentDetections();
+                this.updateSidebar(detections);
+                this.updateStats(detections);
             } else {
                 console.error('Error in response:', data.message || 'Unknown error');
+                // Start over with a full snapshot next time
+                this.mapWatermark = null;
             }
         } catch (error) {
             console.error('Error loading map data:', error);
@@ -149,8 +172,14 @@ class ElephantDashboard {
     updateMap(detections, cameras) {
         // Clear existing detection markers
         this.detectionMarkers.forEach(marker => this.map.removeLayer(marker));
-        this.detectionMarkers = [];
+        this.detectionMarkers = new Map();
+        this.detections = new Map();
+
+        this.updateCameraMarkers(cameras);
+        detections.forEach(detection => this.upsertDetectionMarker(detection));
+    }
 
+    updateCameraMarkers(cameras) {
         // Clear existing camera markers
         this.cameraMarkers.forEach(marker => this.map.removeLayer(marker));
         this.cameraMarkers = [];
@@ -172,36 +201,66 @@ class ElephantDashboard {
             .addTo(this.map);
             this.cameraMarkers.push(marker);
         });
+    }
 
-        // Add detection markers with custom icons - ensure we display lat/lng and handle fallbacks
-        detections.forEach(detection => {
-            // Determine lat/lng from multiple possible shapes (location object or top-level fields)
-            const lat = (detection.location && detection.location.lat) || detection.latitude || detection.lat;
-            const lng = (detection.location && detection.location.lng) || detection.longitude || detection.lng;
+    applyMapDelta(detections, removed) {
+        // Drop detections marked as false positives
+        removed.forEach(id => this.removeDetectionMarker(id));
 
-            if (lat == null || lng == null) return; // skip if no coordinates
+        // Add new detections and patch changed ones in place
+        detections.forEach(detection => this.upsertDetectionMarker(detection));
 
-            const confidencePercent = (detection.confidence * 100).toFixed(1);
-            const timestamp = new Date(detection.timestamp).toLocaleString();
+        // Keep the map to the most recent detections, like the full snapshot
+        this.currentDetections()
+            .slice(this.maxMapDetections)
+            .forEach(detection => this.removeDetectionMarker(detection.id));
+    }
+
+    currentDetections() {
+        return Array.from(this.detections.values())
+            .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp));
+    }
 
+    removeDetectionMarker(id) {
+        const marker = this.detectionMarkers.get(id);
+        if (marker) this.map.removeLayer(marker);
+        this.detectionMarkers.delete(id);
+        this.detections.delete(id);
+    }
+
+    upsertDetectionMarker(detection) {
+        // Determine lat/lng from multiple possible shapes (location object or top-level fields)
+        const lat = (detection.location && detection.location.lat) || detection.latitude || detection.lat;
+        const lng = (detection.location && detection.location.lng) || detection.longitude || detection.lng;
+
+        if (lat == null || lng == null) return; // skip if no coordinates
+
+        const confidencePercent = (detection.confidence * 100).toFixed(1);
+        const timestamp = new Date(detection.timestamp).toLocaleString();
+        const popup = `
+            <div class="detection-popup">
+                <h4>Elephant Detected!</h4>
+                <p><strong>Camera:</strong> ${detection.camera_id || 'N/A'}</p>
+                <p><strong>Confidence:</strong> ${confidencePercent}%</p>
+                <p><strong>Time:</strong> ${timestamp}</p>
+                <p><strong>Latitude:</strong> ${lat.toFixed(6)}</p>
+                <p><strong>Longitude:</strong> ${lng.toFixed(6)}</p>
+                ${detection.image_path ? `<p><strong>Image:</strong> Available</p>` : ''}
+            </div>
+        `;
+
+        const existing = this.detectionMarkers.get(detection.id);
+        if (existing) {
+            existing.setLatLng([lat, lng]).setPopupContent(popup);
+        } else {
             const marker = L.marker([lat, lng], {
                 icon: this.icons.detection
             })
-            .bindPopup(`
-                <div class="detection-popup">
-                    <h4>Elephant Detected!</h4>
-                    <p><strong>Camera:</strong> ${detection.camera_id || 'N/A'}</p>
-                    <p><strong>Confidence:</strong> ${confidencePercent}%</p>
-                    <p><strong>Time:</strong> ${timestamp}</p>
-                    <p><strong>Latitude:</strong> ${lat.toFixed(6)}</p>
-                    <p><strong>Longitude:</strong> ${lng.toFixed(6)}</p>
-                    ${detection.image_path ? `<p><strong>Image:</strong> Available</p>` : ''}
-                </div>
-            `)
+            .bindPopup(popup)
             .addTo(this.map);
-
-            this.detectionMarkers.push(marker);
-        });
+            this.detectionMarkers.set(detection.id, marker);
+        }
+        this.detections.set(detection.id, detection);
     }
 
     updateSidebar(detections) {
@@ -361,8 +420,10 @@ class ElephantDashboard {
             const result = await response.json();
 
             if (result.status === 'success') {
-                const sent = result.notifications_sent != null ? result.notifications_sent : 'unknown';
-                this.showNotification(`Detection simulated — notifications sent: ${sent}`, 'success');
+                const notification = result.notification;
+                const status = !notification ? 'unknown'
+                    : notification.kind === 'digest' ? 'held for the cooldown digest' : notification.status;
+                this.showNotification(`Detection simulated — notifications ${status}`, 'success');
                 this.loadMapData(); // Refresh data
             } else {
                 this.showNotification(result.message || 'Simulation failed', 'error');
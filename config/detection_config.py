@@ -34,5 +34,88 @@ IMAGE_SIZE = int(os.environ.get('IMAGE_SIZE', 640))  # YOLOv8 inference size
 CAMERA_FRAME_INTERVAL = float(os.environ.get('CAMERA_FRAME_INTERVAL', 2.0))  # seconds
 CAMERA_TIMEOUT = int(os.environ.get('CAMERA_TIMEOUT', 30))  # seconds
 
+# Camera-trap folder ingestion
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 16))  # images per inference batch
+INGEST_BATCH_TIMEOUT = float(os.environ.get('INGEST_BATCH_TIMEOUT', 5.0))  # seconds to wait for a full batch
+INGEST_POLL_INTERVAL = float(os.environ.get('INGEST_POLL_INTERVAL', 2.0))  # seconds, polling fallback only
+INGEST_SETTLE_TIME = float(os.environ.get('INGEST_SETTLE_TIME', 1.0))  # seconds a file must be unchanged
+INGEST_MAX_ATTEMPTS = int(os.environ.get('INGEST_MAX_ATTEMPTS', 3))  # failed ingests before a file is skipped
+INGEST_RETRY_DELAY = float(os.environ.get('INGEST_RETRY_DELAY', 30.0))  # seconds before a failed file is retried; doubles per attempt
+
+# Camera-trap burst grouping
+BURST_GAP_SECONDS = float(os.environ.get('BURST_GAP_SECONDS', 10.0))  # max gap between frames of one trigger
+BURST_VOTING = os.environ.get('BURST_VOTING', 'max')  # 'max' or 'mean' confidence across frames
+
+# Stream object tracking (one detection per tracked animal instead of per frame)
+TRACKING_ENABLED = os.environ.get('TRACKING_ENABLED', 'true').lower() in ('true', '1', 'yes')
+TRACK_IOU_THRESHOLD = float(os.environ.get('TRACK_IOU_THRESHOLD', 0.3))  # min IoU to match a track
+TRACK_MIN_HITS = int(os.environ.get('TRACK_MIN_HITS', 2))  # frames before a track is reported
+TRACK_MAX_AGE = float(os.environ.get('TRACK_MAX_AGE', 30.0))  # seconds unseen before a track is dropped
+TRACK_UPDATE_INTERVAL = float(os.environ.get('TRACK_UPDATE_INTERVAL', 300.0))  # seconds between track updates
+TRACK_SMOOTHING = float(os.environ.get('TRACK_SMOOTHING', 0.3))  # EMA weight of the newest confidence
+
+# Write-behind queue for background detection writes (streams, folder watcher)
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'true').lower() in ('true', '1', 'yes')
+WRITE_QUEUE_MAXSIZE = int(os.environ.get('WRITE_QUEUE_MAXSIZE', 1000))  # queued writes before backpressure
+WRITE_QUEUE_BATCH_SIZE = int(os.environ.get('WRITE_QUEUE_BATCH_SIZE', 200))  # rows per group commit
+WRITE_QUEUE_FLUSH_INTERVAL = float(os.environ.get('WRITE_QUEUE_FLUSH_INTERVAL', 0.5))  # seconds
+WRITE_QUEUE_PUT_TIMEOUT = float(os.environ.get('WRITE_QUEUE_PUT_TIMEOUT', 5.0))  # seconds a producer may block
+
+# Detection list pagination
+PAGE_MAX_LIMIT = int(os.environ.get('PAGE_MAX_LIMIT', 500))  # largest page a client may request
+PAGE_COUNT_CAP = int(os.environ.get('PAGE_COUNT_CAP', 10000))  # rows counted before the total is estimated
+
+# Response cache for polled dashboard endpoints
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() in ('true', '1', 'yes')
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30.0))  # seconds; writes invalidate sooner
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 256))  # per process
+RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL', None)  # e.g. redis://localhost:6379/0 to share across workers
+
+# /map-data?since= deltas
+MAP_DELTA_OVERLAP = float(os.environ.get('MAP_DELTA_OVERLAP', 5.0))  # seconds re-read before the watermark
+MAP_DELTA_MAX_ROWS = int(os.environ.get('MAP_DELTA_MAX_ROWS', 1000))  # larger deltas get a full snapshot
+
+# Map clustering
+CLUSTER_CELLS_PER_TILE = int(os.environ.get('CLUSTER_CELLS_PER_TILE', 8))  # grid cells across one 256px map tile
+POI_FILE = os.environ.get('POI_FILE', None)  # JSON list of {name, type, lat, lng}; default: the KRCS/KWS offices
+
+# Heatmap tiles
+HEAT_TILE_DIR = os.environ.get('HEAT_TILE_DIR', None)  # default: <instance folder>/tiles/heat
+HEAT_TILE_MIN_ZOOM = int(os.environ.get('HEAT_TILE_MIN_ZOOM', 0))
+HEAT_TILE_MAX_ZOOM = int(os.environ.get('HEAT_TILE_MAX_ZOOM', 12))  # deeper zooms get blank tiles
+HEAT_TILE_GRID = int(os.environ.get('HEAT_TILE_GRID', 64))  # density cells across one tile (even)
+HEAT_TILE_SATURATION = int(os.environ.get('HEAT_TILE_SATURATION', 50))  # detections per cell drawn at full intensity
+
+# Notifications
+SUBSCRIBER_DEFAULT_RADIUS_KM = float(os.environ.get('SUBSCRIBER_DEFAULT_RADIUS_KM', 10.0))  # for located subscribers
+SUBSCRIBER_VERSION_CHECK = float(os.environ.get('SUBSCRIBER_VERSION_CHECK', 5.0))  # seconds between checks for subscriber changes made by other processes
+ALERT_COOLDOWN = float(os.environ.get('ALERT_COOLDOWN', 600.0))  # seconds per camera and species; later detections go into a digest
+ALERT_STALE_AFTER = float(os.environ.get('ALERT_STALE_AFTER', 600.0))  # seconds; older detections (edge relay backlogs) go into a catch-up digest
+SMS_TIMEOUT = float(os.environ.get('SMS_TIMEOUT', 10.0))  # seconds per provider request
+EMAIL_TIMEOUT = float(os.environ.get('EMAIL_TIMEOUT', 10.0))  # seconds per SMTP operation
+SMS_BATCH_SIZE = int(os.environ.get('SMS_BATCH_SIZE', 100))  # recipients per Africa's Talking bulk request
+NOTIFY_CONCURRENCY = int(os.environ.get('NOTIFY_CONCURRENCY', 32))  # provider requests in flight (and pooled connections)
+
+# Geofences
+GEOFENCE_VERSION_CHECK = float(os.environ.get('GEOFENCE_VERSION_CHECK', 5.0))  # seconds between checks for geofence changes made by other processes
+
+# Notification provider circuit breakers
+BREAKER_FAILURE_RATE = float(os.environ.get('BREAKER_FAILURE_RATE', 0.5))  # failed share of recent calls that opens the circuit
+BREAKER_MIN_CALLS = int(os.environ.get('BREAKER_MIN_CALLS', 5))  # calls needed before the rate is judged
+BREAKER_WINDOW = int(os.environ.get('BREAKER_WINDOW', 20))  # recent calls considered
+BREAKER_OPEN_SECONDS = float(os.environ.get('BREAKER_OPEN_SECONDS', 30.0))  # before a half-open probe
+
+# Notification outbox
+OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS', 4))  # notifications sent concurrently
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))  # before a notification is marked failed
+OUTBOX_RETRY_BASE = float(os.environ.get('OUTBOX_RETRY_BASE', 30.0))  # seconds; doubles per attempt
+OUTBOX_LEASE = float(os.environ.get('OUTBOX_LEASE', 300.0))  # seconds before a stuck claim is retried
+OUTBOX_NEAR_GEOFENCE_KM = float(os.environ.get('OUTBOX_NEAR_GEOFENCE_KM', 2.0))  # detections this close to a geofence are sent sooner
+OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 5.0))  # seconds between scans for due retries
+
+# Edge alert batches (/api/alerts/batch)
+ALERT_BATCH_MAX_ITEMS = int(os.environ.get('ALERT_BATCH_MAX_ITEMS', 10000))  # detections per request
+ALERT_BATCH_MAX_BYTES = int(os.environ.get('ALERT_BATCH_MAX_BYTES', 32 * 1024 * 1024))  # decoded body size, after gunzip
+
 # Logging
 LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
@@ -0,0 +1,11 @@
+from config.default import Config
+
+class TestingConfig(Config):
+    TESTING = True
+    
+    # Keep tests off the development database
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+    # The in-memory database is one connection shared by all threads, so
+    # notifications are sent in the caller's thread by notification_dispatcher.flush()
+    OUTBOX_BACKGROUND = False
@@ -0,0 +1,23 @@
+"""add frame_count to detections
+
+Revision ID: 0004_add_frame_count
+Revises: 0003_merge_heads
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_add_frame_count'
+down_revision = '0003_merge_heads'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # Number of camera-trap frames aggregated into the detection (1 for single images)
+    op.add_column('detections', sa.Column('frame_count', sa.Integer(), nullable=True, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('detections', 'frame_count')
@@ -0,0 +1,23 @@
+"""add track_id to detections
+
+Revision ID: 0005_add_track_id
+Revises: 0004_add_frame_count
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_add_track_id'
+down_revision = '0004_add_frame_count'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # Stream detections reported by the object tracker share a track id
+    op.add_column('detections', sa.Column('track_id', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    op.drop_column('detections', 'track_id')
@@ -0,0 +1,35 @@
+"""add indexes for the detection list queries
+
+Revision ID: 0006_detection_indexes
+Revises: 0005_add_track_id
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006_detection_indexes'
+down_revision = '0005_add_track_id'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # /recent, /map-data and the dashboard only read non-false-positive rows,
+    # newest first. Backends without partial indexes get a plain timestamp index.
+    op.create_index(
+        'ix_detections_active_timestamp', 'detections', ['timestamp'],
+        sqlite_where=sa.text('is_false_positive = 0'),
+        postgresql_where=sa.text('is_false_positive = false'),
+    )
+    # /by-species/<species> and the top-species breakdown
+    op.create_index('ix_detections_species_fp_timestamp', 'detections',
+                    ['species', 'is_false_positive', 'timestamp'])
+    # Per-camera history
+    op.create_index('ix_detections_camera_timestamp', 'detections', ['camera_id', 'timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_detections_camera_timestamp', table_name='detections')
+    op.drop_index('ix_detections_species_fp_timestamp', table_name='detections')
+    op.drop_index('ix_detections_active_timestamp', table_name='detections')
@@ -0,0 +1,23 @@
+"""add (timestamp, id) index for keyset pagination
+
+Revision ID: 0007_detection_keyset_index
+Revises: 0006_detection_indexes
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007_detection_keyset_index'
+down_revision = '0006_detection_indexes'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # The unfiltered detection history pages on (timestamp, id), newest first
+    op.create_index('ix_detections_timestamp_id', 'detections', ['timestamp', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_detections_timestamp_id', table_name='detections')
@@ -0,0 +1,52 @@
+"""add detection_stats counter table
+
+Revision ID: 0008_detection_stats
+Revises: 0007_detection_keyset_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0008_detection_stats'
+down_revision = '0007_detection_keyset_index'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # db.create_all() and stats_service.ensure_stats() at app startup may
+    # have created and seeded the table already
+    if 'detection_stats' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'detection_stats',
+        sa.Column('key', sa.String(length=120), primary_key=True),
+        sa.Column('value', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+    # Seed the counters from the existing rows (same keys as stats_service)
+    op.execute("""
+        INSERT INTO detection_stats (key, value)
+        SELECT 'total', COUNT(*) FROM detections
+        UNION ALL
+        SELECT 'verified', COUNT(*) FROM detections WHERE is_verified
+        UNION ALL
+        SELECT 'false_positives', COUNT(*) FROM detections WHERE is_false_positive
+        UNION ALL
+        SELECT 'high_confidence', COUNT(*) FROM detections WHERE confidence >= 0.9
+    """)
+    op.execute("""
+        INSERT INTO detection_stats (key, value)
+        SELECT 'species:' || species, COUNT(*) FROM detections GROUP BY species
+    """)
+    op.execute("""
+        INSERT INTO detection_stats (key, value)
+        SELECT 'active_species:' || species, COUNT(*) FROM detections
+        WHERE is_false_positive IS NULL OR NOT is_false_positive GROUP BY species
+    """)
+
+
+def downgrade():
+    op.drop_table('detection_stats')
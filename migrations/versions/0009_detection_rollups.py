@@ -0,0 +1,43 @@
+"""add hourly and daily detection rollup tables
+
+Revision ID: 0009_detection_rollups
+Revises: 0008_detection_stats
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0009_detection_rollups'
+down_revision = '0008_detection_stats'
+branch_labels = None
+deploy_revision = None
+
+TABLES = ('detection_rollups_hourly', 'detection_rollups_daily')
+
+
+def upgrade():
+    # Filled from existing detections on app startup (rollup_service.ensure_rollups)
+    # or with `flask rebuild-rollups`. db.create_all() at startup may have
+    # created the tables (with these indexes) already
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    for table in TABLES:
+        if table in existing:
+            continue
+        op.create_table(
+            table,
+            sa.Column('bucket', sa.DateTime(), primary_key=True),
+            sa.Column('species', sa.String(length=50), primary_key=True),
+            sa.Column('camera_id', sa.String(length=50), primary_key=True, server_default=''),
+            sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('confidence_sum', sa.Float(), nullable=False, server_default='0'),
+        )
+        op.create_index(f'ix_{table}_species_bucket', table, ['species', 'bucket'])
+        op.create_index(f'ix_{table}_camera_bucket', table, ['camera_id', 'bucket'])
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_index(f'ix_{table}_camera_bucket', table_name=table)
+        op.drop_index(f'ix_{table}_species_bucket', table_name=table)
+        op.drop_table(table)
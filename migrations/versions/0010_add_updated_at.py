@@ -0,0 +1,26 @@
+"""add updated_at to detections
+
+Revision ID: 0010_add_updated_at
+Revises: 0009_detection_rollups
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0010_add_updated_at'
+down_revision = '0009_detection_rollups'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # /map-data?since= returns rows changed after the client's watermark
+    op.add_column('detections', sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute('UPDATE detections SET updated_at = timestamp')
+    op.create_index('ix_detections_updated_at', 'detections', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_detections_updated_at', table_name='detections')
+    op.drop_column('detections', 'updated_at')
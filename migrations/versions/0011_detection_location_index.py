@@ -0,0 +1,23 @@
+"""add (latitude, longitude) index to detections
+
+Revision ID: 0011_detection_location_index
+Revises: 0010_add_updated_at
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0011_detection_location_index'
+down_revision = '0010_add_updated_at'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # Bounding-box scans for the map clustering endpoint
+    op.create_index('ix_detections_lat_lng', 'detections', ['latitude', 'longitude'])
+
+
+def downgrade():
+    op.drop_index('ix_detections_lat_lng', table_name='detections')
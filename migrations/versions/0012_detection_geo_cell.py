@@ -0,0 +1,43 @@
+"""add geo_cell spatial grid column to detections
+
+Revision ID: 0012_detection_geo_cell
+Revises: 0011_detection_location_index
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0012_detection_geo_cell'
+down_revision = '0011_detection_location_index'
+branch_labels = None
+deploy_revision = None
+
+# Must match app.models.detection.GEO_CELL_DEG / GEO_CELL_COLUMNS
+GEO_CELL_DEG = 0.01
+GEO_CELL_COLUMNS = 36001
+
+
+def upgrade():
+    # Bounding-box and radius queries prune by grid cell before the exact check
+    op.add_column('detections', sa.Column('geo_cell', sa.Integer(), nullable=True))
+
+    # SQLite has no FLOOR(); CAST truncates, which is the same for these non-negative values.
+    # PostgreSQL's CAST rounds, so FLOOR first there.
+    if op.get_bind().dialect.name == 'sqlite':
+        row = f'CAST((latitude + 90.0) / {GEO_CELL_DEG} AS INTEGER)'
+        column = f'CAST((longitude + 180.0) / {GEO_CELL_DEG} AS INTEGER)'
+    else:
+        row = f'CAST(FLOOR((latitude + 90.0) / {GEO_CELL_DEG}) AS INTEGER)'
+        column = f'CAST(FLOOR((longitude + 180.0) / {GEO_CELL_DEG}) AS INTEGER)'
+    op.execute(f'UPDATE detections SET geo_cell = {row} * {GEO_CELL_COLUMNS} + {column}')
+
+    # Supersedes the (latitude, longitude) index: the exact bounds are checked in this one
+    op.create_index('ix_detections_geo_cell', 'detections', ['geo_cell', 'latitude', 'longitude'])
+    op.drop_index('ix_detections_lat_lng', table_name='detections')
+
+
+def downgrade():
+    op.create_index('ix_detections_lat_lng', 'detections', ['latitude', 'longitude'])
+    op.drop_index('ix_detections_geo_cell', table_name='detections')
+    op.drop_column('detections', 'geo_cell')
@@ -0,0 +1,39 @@
+"""add geofences table
+
+Revision ID: 0013_geofences
+Revises: 0012_detection_geo_cell
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0013_geofences'
+down_revision = '0012_detection_geo_cell'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # db.create_all() at app startup may have created the table already
+    if 'geofences' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'geofences',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('zone_type', sa.String(length=30), nullable=True),
+        sa.Column('coordinates', sa.Text(), nullable=False),
+        sa.Column('species', sa.String(length=200), nullable=True),
+        sa.Column('min_lat', sa.Float(), nullable=False),
+        sa.Column('max_lat', sa.Float(), nullable=False),
+        sa.Column('min_lng', sa.Float(), nullable=False),
+        sa.Column('max_lng', sa.Float(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_table('geofences')
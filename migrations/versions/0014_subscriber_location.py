@@ -0,0 +1,28 @@
+"""add home location and alert radius to subscribers
+
+Revision ID: 0014_subscriber_location
+Revises: 0013_geofences
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0014_subscriber_location'
+down_revision = '0013_geofences'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # Notifications go to subscribers near the detection; existing rows have
+    # no location and keep receiving every alert
+    op.add_column('subscriber', sa.Column('latitude', sa.Float(), nullable=True))
+    op.add_column('subscriber', sa.Column('longitude', sa.Float(), nullable=True))
+    op.add_column('subscriber', sa.Column('alert_radius_km', sa.Float(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('subscriber', 'alert_radius_km')
+    op.drop_column('subscriber', 'longitude')
+    op.drop_column('subscriber', 'latitude')
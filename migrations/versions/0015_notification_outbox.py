@@ -0,0 +1,78 @@
+"""add notification outbox and per-recipient alert outcomes
+
+Revision ID: 0015_notification_outbox
+Revises: 0014_subscriber_location
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0015_notification_outbox'
+down_revision = '0014_subscriber_location'
+branch_labels = None
+deploy_revision = None
+
+ALERT_COLUMNS = [
+    ('subscriber_id', sa.Integer()),
+    ('channel', sa.String(length=10)),
+    ('status', sa.String(length=20)),
+    ('error', sa.Text()),
+    ('attempts', sa.Integer()),
+    ('idempotency_key', sa.String(length=150)),
+    ('sent_at', sa.DateTime()),
+]
+
+
+def upgrade():
+    # db.create_all() at app startup may have created either table (in its
+    # current form) already; create or extend only what is missing
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'notification_outbox' not in tables:
+        op.create_table(
+            'notification_outbox',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('detection_id', sa.Integer(), sa.ForeignKey('detections.id'), nullable=False),
+            sa.Column('idempotency_key', sa.String(length=100), nullable=False, unique=True),
+            sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+            sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+            sa.Column('locked_until', sa.DateTime(), nullable=True),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('sent_at', sa.DateTime(), nullable=True),
+        )
+        op.create_index('ix_notification_outbox_status_next_attempt', 'notification_outbox',
+                        ['status', 'next_attempt_at'])
+
+    # alerts was only ever created by db.create_all(); create it here if it is missing
+    if 'alerts' not in tables:
+        op.create_table(
+            'alerts',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('detection_id', sa.Integer(), sa.ForeignKey('detections.id'), nullable=False),
+            sa.Column('alert_type', sa.String(length=50), nullable=True),
+            sa.Column('message', sa.Text(), nullable=True),
+            sa.Column('recipients', sa.String(length=500), nullable=True),
+            sa.Column('sms_sent', sa.Boolean(), nullable=True),
+            sa.Column('email_sent', sa.Boolean(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            *(sa.Column(name, column_type, nullable=True) for name, column_type in ALERT_COLUMNS)
+        )
+    else:
+        existing = {column['name'] for column in inspector.get_columns('alerts')}
+        for name, column_type in ALERT_COLUMNS:
+            if name not in existing:
+                op.add_column('alerts', sa.Column(name, column_type, nullable=True))
+    if 'alerts' not in tables or 'ix_alerts_idempotency_key' not in \
+            {index['name'] for index in inspector.get_indexes('alerts')}:
+        op.create_index('ix_alerts_idempotency_key', 'alerts', ['idempotency_key'], unique=True)
+
+def downgrade():
+    op.drop_index('ix_alerts_idempotency_key', table_name='alerts')
+    for name, _ in reversed(ALERT_COLUMNS):
+        op.drop_column('alerts', name)
+    op.drop_index('ix_notification_outbox_status_next_attempt', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,33 @@
+"""add provider delivery status to alerts
+
+Revision ID: 0016_alert_provider_status
+Revises: 0015_notification_outbox
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0016_alert_provider_status'
+down_revision = '0015_notification_outbox'
+branch_labels = None
+deploy_revision = None
+
+ALERT_COLUMNS = [
+    ('provider', sa.String(length=20)),
+    ('provider_status', sa.String(length=50)),
+    ('provider_message_id', sa.String(length=100)),
+]
+
+
+def upgrade():
+    # alerts may have been created with these columns by db.create_all() at app startup
+    existing = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('alerts')}
+    for name, column_type in ALERT_COLUMNS:
+        if name not in existing:
+            op.add_column('alerts', sa.Column(name, column_type, nullable=True))
+
+
+def downgrade():
+    for name, _ in reversed(ALERT_COLUMNS):
+        op.drop_column('alerts', name)
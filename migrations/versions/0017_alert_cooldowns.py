@@ -0,0 +1,43 @@
+"""add alert cooldown windows and digest notifications
+
+Revision ID: 0017_alert_cooldowns
+Revises: 0016_alert_provider_status
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0017_alert_cooldowns'
+down_revision = '0016_alert_provider_status'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # db.create_all() at app startup may have created the table and columns already
+    inspector = sa.inspect(op.get_bind())
+    existing = {column['name'] for column in inspector.get_columns('notification_outbox')}
+    if 'kind' not in existing:
+        op.add_column('notification_outbox', sa.Column('kind', sa.String(length=20), nullable=False,
+                                                       server_default='detection'))
+    if 'digest_count' not in existing:
+        op.add_column('notification_outbox', sa.Column('digest_count', sa.Integer(), nullable=True))
+    if 'digest_since' not in existing:
+        op.add_column('notification_outbox', sa.Column('digest_since', sa.DateTime(), nullable=True))
+
+    if 'alert_cooldowns' not in inspector.get_table_names():
+        op.create_table(
+            'alert_cooldowns',
+            sa.Column('camera_id', sa.String(length=50), primary_key=True),
+            sa.Column('species', sa.String(length=50), primary_key=True),
+            sa.Column('window_start', sa.DateTime(), nullable=False),
+            sa.Column('window_end', sa.DateTime(), nullable=False),
+            sa.Column('digest_id', sa.Integer(), sa.ForeignKey('notification_outbox.id'), nullable=True),
+        )
+
+def downgrade():
+    op.drop_table('alert_cooldowns')
+    op.drop_column('notification_outbox', 'digest_since')
+    op.drop_column('notification_outbox', 'digest_count')
+    op.drop_column('notification_outbox', 'kind')
@@ -0,0 +1,34 @@
+"""add notification priority to the outbox
+
+Revision ID: 0018_outbox_priority
+Revises: 0017_alert_cooldowns
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0018_outbox_priority'
+down_revision = '0017_alert_cooldowns'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # db.create_all() at app startup may have created the table in this form already
+    inspector = sa.inspect(op.get_bind())
+    if 'priority' not in {column['name'] for column in inspector.get_columns('notification_outbox')}:
+        op.add_column('notification_outbox', sa.Column('priority', sa.Integer(), nullable=False, server_default='0'))
+    indexes = {index['name'] for index in inspector.get_indexes('notification_outbox')}
+    if 'ix_notification_outbox_status_next_attempt' in indexes:
+        op.drop_index('ix_notification_outbox_status_next_attempt', table_name='notification_outbox')
+    if 'ix_notification_outbox_status_priority' not in indexes:
+        op.create_index('ix_notification_outbox_status_priority', 'notification_outbox',
+                        ['status', 'priority', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_status_priority', table_name='notification_outbox')
+    op.create_index('ix_notification_outbox_status_next_attempt', 'notification_outbox',
+                    ['status', 'next_attempt_at'])
+    op.drop_column('notification_outbox', 'priority')
@@ -0,0 +1,30 @@
+"""add registry version stamps
+
+Revision ID: 0019_registry_versions
+Revises: 0018_outbox_priority
+Create Date: 2026-10-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0019_registry_versions'
+down_revision = '0018_outbox_priority'
+branch_labels = None
+deploy_revision = None
+
+
+def upgrade():
+    # db.create_all() at app startup may have created the table already
+    if 'registry_versions' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'registry_versions',
+        sa.Column('name', sa.String(length=50), primary_key=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('registry_versions')
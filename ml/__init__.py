@@ -3,5 +3,6 @@ ML Module - Wildlife Detection
 """
 
 from .detector import WildlifeDetector, get_detector, DetectionResult
+from .tracker import ObjectTracker
 
-__all__ = ['WildlifeDetector', 'get_detector', 'DetectionResult']
+__all__ = ['WildlifeDetector', 'get_detector', 'DetectionResult', 'ObjectTracker']
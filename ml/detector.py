@@ -48,12 +48,14 @@ class DetectionResult:
     """Represents a single detection result"""
     
     def __init__(self, species: str, confidence: float, latitude: float, 
-                 longitude: float, image_path: str = None):
+                 longitude: float, image_path: str = None,
+                 bbox: Optional[Tuple[float, float, float, float]] = None):
         self.species = species
         self.confidence = confidence
         self.latitude = latitude
         self.longitude = longitude
         self.image_path = image_path
+        self.bbox = bbox  # (x1, y1, x2, y2) in image pixels, if known
         self.timestamp = datetime.utcnow()
     
     def to_dict(self) -> Dict:
@@ -64,6 +66,7 @@ class DetectionResult:
             'latitude': self.latitude,
             'longitude': self.longitude,
             'image_path': self.image_path,
+            'bbox': list(self.bbox) if self.bbox else None,
             'timestamp': self.timestamp.isoformat()
         }
 
@@ -132,6 +135,31 @@ class WildlifeDetector:
         else:
             return self._detect_yolov8(image_path, latitude, longitude, conf_threshold)
     
+    def detect_batch(self, image_paths: List[str], latitude: float = None,
+                     longitude: float = None, conf_threshold: float = 0.5) -> List[List[DetectionResult]]:
+        """
+        Run detection on several images in one call
+        
+        In YOLOv8 mode all images go through a single ``predict`` call so the
+        model can batch them on the device; in mock mode each image is
+        simulated independently.
+        
+        Args:
+            image_paths: Paths to the image files
+            latitude: GPS latitude (optional)
+            longitude: GPS longitude (optional)
+            conf_threshold: Confidence threshold (0-1)
+        
+        Returns:
+            One list of DetectionResult objects per input image, in input order
+        """
+        if not image_paths:
+            return []
+        
+        if self.use_mock:
+            return [self._detect_mock(p, latitude, longitude, conf_threshold) for p in image_paths]
+        return self._detect_yolov8_batch(image_paths, latitude, longitude, conf_threshold)
+    
     def _detect_mock(self, image_path: str, latitude: float = None, 
                      longitude: float = None, conf_threshold: float = 0.5) -> List[DetectionResult]:
         """Simulate detections for testing"""
@@ -160,12 +188,21 @@ class WildlifeDetector:
                         confidence=confidence,
                         latitude=latitude + random.uniform(-0.01, 0.01),
                         longitude=longitude + random.uniform(-0.01, 0.01),
-                        image_path=image_path
+                        image_path=image_path,
+                        bbox=self._mock_bbox(species)
                     ))
         
         logger.info(f"Mock detection: Found {len(detections)} objects in {image_path}")
         return detections
     
+    @staticmethod
+    def _mock_bbox(species: str) -> Tuple[float, float, float, float]:
+        """A jittered box at a fixed spot per species, so a mock animal 'lingers'"""
+        slot = sorted(MOCK_SPECIES).index(species)
+        x, y = 60 + slot * 110, 120 + (slot % 2) * 120
+        j = [random.uniform(-8, 8) for _ in range(4)]
+        return (x + j[0], y + j[1], x + 100 + j[2], y + 90 + j[3])
+    
     def _detect_yolov8(self, image_path: str, latitude: float = None, 
                        longitude: float = None, conf_threshold: float = 0.5) -> List[DetectionResult]:
         """Run real YOLOv8 detection with wildlife class filtering"""
@@ -183,8 +220,6 @@ class WildlifeDetector:
         if longitude is None:
             longitude = 35.3
         
-        detections = []
-        
         try:
             # Run YOLOv8 inference with confidence threshold
             results = self.model.predict(
@@ -194,25 +229,9 @@ class WildlifeDetector:
                 device=0  # Use GPU if available, CPU otherwise
             )
             
-            # Process results
+            detections = []
             for r in results:
-                for box in r.boxes:
-                    class_id = int(box.cls[0])
-                    class_name = r.names[class_id].lower().strip()
-                    confidence = float(box.conf[0])
-                    
-                    # Map YOLO class to our wildlife taxonomy
-                    mapped_species = self._map_yolo_class(class_name)
-                    
-                    # Only include if it's a wildlife class we care about
-                    if mapped_species:
-                        detections.append(DetectionResult(
-                            species=mapped_species,
-                            confidence=confidence,
-                            latitude=latitude + random.uniform(-0.001, 0.001),  # Add slight variation
-                            longitude=longitude + random.uniform(-0.001, 0.001),
-                            image_path=image_path
-                        ))
+                detections.extend(self._parse_yolov8_result(r, image_path, latitude, longitude))
             
             logger.info(f"YOLOv8 detection: Found {len(detections)} wildlife in {image_path}")
         
@@ -222,6 +241,71 @@ class WildlifeDetector:
         
         return detections
     
+    def _detect_yolov8_batch(self, image_paths: List[str], latitude: float = None,
+                             longitude: float = None, conf_threshold: float = 0.5) -> List[List[DetectionResult]]:
+        """Run YOLOv8 on a list of images in a single predict call"""
+        
+        if self.model is None:
+            raise ValueError("Model not loaded. Cannot run real detection.")
+        
+        missing = [p for p in image_paths if not os.path.exists(p)]
+        if missing:
+            logger.error(f"Images not found: {missing}")
+            raise FileNotFoundError(f"Images not found: {missing}")
+        
+        if latitude is None:
+            latitude = -1.5
+        if longitude is None:
+            longitude = 35.3
+        
+        try:
+            results = self.model.predict(
+                source=list(image_paths),
+                conf=conf_threshold,
+                verbose=False,
+                device=0
+            )
+            
+            # ultralytics returns one Results object per source, in order
+            batch = [
+                self._parse_yolov8_result(r, image_path, latitude, longitude)
+                for r, image_path in zip(results, image_paths)
+            ]
+            
+            total = sum(len(d) for d in batch)
+            logger.info(f"YOLOv8 batch detection: Found {total} wildlife in {len(image_paths)} images")
+        
+        except Exception as e:
+            logger.error(f"Error during YOLOv8 batch detection: {e}")
+            raise
+        
+        return batch
+    
+    def _parse_yolov8_result(self, r, image_path: str, latitude: float,
+                             longitude: float) -> List[DetectionResult]:
+        """Convert one ultralytics Results object into DetectionResults"""
+        detections = []
+        for box in r.boxes:
+            class_id = int(box.cls[0])
+            class_name = r.names[class_id].lower().strip()
+            confidence = float(box.conf[0])
+            x1, y1, x2, y2 = (float(v) for v in box.xyxy[0].tolist())
+            
+            # Map YOLO class to our wildlife taxonomy
+            mapped_species = self._map_yolo_class(class_name)
+            
+            # Only include if it's a wildlife class we care about
+            if mapped_species:
+                detections.append(DetectionResult(
+                    species=mapped_species,
+                    confidence=confidence,
+                    latitude=latitude + random.uniform(-0.001, 0.001),  # Add slight variation
+                    longitude=longitude + random.uniform(-0.001, 0.001),
+                    image_path=image_path,
+                    bbox=(x1, y1, x2, y2)
+                ))
+        return detections
+    
     def _map_yolo_class(self, class_name: str) -> Optional[str]:
         """
         Map YOLO class name to our wildlife taxonomy.
@@ -116,6 +116,43 @@ class SpeciesClassifier:
             'threat_level': threat_level
         }
     
+    def classify_batch(self, detections: List[Dict]) -> List[Dict]:
+        """
+        Classify several detections in one call.
+        
+        Args:
+            detections: Detection dicts with 'class_id', 'class_name', 'confidence'
+        
+        Returns:
+            Enhanced detection dicts, in input order
+        """
+        if self.mode != 'yolo':
+            return [self.classify_from_detection(d) for d in detections]
+        
+        lookup = self._common_name_lookup()
+        classified = []
+        for detection in detections:
+            class_name = detection.get('class_name', 'unknown').lower()
+            species = lookup.get(class_name, class_name)
+            classified.append({
+                **detection,
+                'species': species,
+                'confidence': round(detection.get('confidence', 0.5), 2),
+                'threat_level': self.WILDLIFE_SPECIES.get(species, {}).get('threat_level', 'unknown')
+            })
+        return classified
+    
+    @classmethod
+    def _common_name_lookup(cls) -> Dict[str, str]:
+        """Map every common name to its species (built once per class)"""
+        if '_lookup' not in cls.__dict__:
+            cls._lookup = {
+                name: species
+                for species, info in cls.WILDLIFE_SPECIES.items()
+                for name in info['common_names']
+            }
+        return cls._lookup
+    
     def get_species_list(self) -> List[str]:
         """Return list of all recognized wildlife species."""
         return list(self.WILDLIFE_SPECIES.keys())
@@ -0,0 +1,201 @@
+"""
+Multi-Object Tracker for Stream Detections
+
+Links detections across consecutive frames of one camera so an animal that
+stays in view becomes a single track instead of a new detection every frame.
+Boxes are matched to tracks by IoU (Hungarian assignment with SciPy, greedy
+where it is missing); tracks carry an exponentially smoothed
+confidence and report themselves once when confirmed and then periodically.
+A report only counts once the caller has stored it (``confirm``); a report
+that failed to store (``release``) is made again on the next frame.
+"""
+
+import time
+import uuid
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of (x1, y1, x2, y2) boxes.
+
+    Returns:
+        Array of shape (len(boxes_a), len(boxes_b))
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)))
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def _assign(scores: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """Match rows to columns maximising total score; pairs below threshold are dropped"""
+    if scores.size == 0:
+        return []
+    try:
+        from scipy.optimize import linear_sum_assignment
+        rows, cols = linear_sum_assignment(-scores)
+        pairs = zip(rows.tolist(), cols.tolist())
+    except ImportError:
+        # Greedy: take the best remaining pair until nothing clears the threshold
+        pairs = []
+        order = np.dstack(np.unravel_index(np.argsort(-scores, axis=None), scores.shape))[0]
+        used_rows, used_cols = set(), set()
+        for r, c in order.tolist():
+            if r in used_rows or c in used_cols:
+                continue
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((r, c))
+    return [(r, c) for r, c in pairs if scores[r, c] >= threshold]
+
+
+class Track:
+    """A single animal followed across frames"""
+
+    def __init__(self, result, now: float, camera_id: Optional[str] = None):
+        self.track_id = f"{camera_id or 'trk'}-{uuid.uuid4().hex[:10]}"
+        self.species = result.species
+        self.bbox = result.bbox
+        self.confidence = result.confidence
+        self.result = result
+        self.hits = 1
+        self.first_seen = now
+        self.last_seen = now
+        self.last_reported = None
+        self.report_at = None  # frame time of a report the caller has not confirmed yet
+        self.species_info = None  # classifier output, filled in by the caller
+
+    @property
+    def reported(self) -> bool:
+        return self.last_reported is not None
+
+    def update(self, result, now: float, smoothing: float):
+        self.bbox = result.bbox
+        self.confidence = smoothing * result.confidence + (1 - smoothing) * self.confidence
+        self.result = result
+        self.hits += 1
+        self.last_seen = now
+
+
+class ObjectTracker:
+    """IoU tracker for the detections of one camera"""
+
+    def __init__(self, camera_id: str = None, iou_threshold: float = 0.3, min_hits: int = 2,
+                 max_age: float = 30.0, update_interval: float = 300.0, smoothing: float = 0.3):
+        """
+        Initialize tracker.
+
+        Args:
+            camera_id: Camera the tracker belongs to (used in track ids)
+            iou_threshold: Minimum IoU for a box to continue a track
+            min_hits: Frames a track must be seen in before it is reported
+            max_age: Seconds a track may go unseen before it is dropped
+            update_interval: Seconds between periodic reports of a live track
+            smoothing: EMA weight given to the newest frame's confidence
+        """
+        self.camera_id = camera_id
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_age = max_age
+        self.update_interval = update_interval
+        self.smoothing = smoothing
+        self.tracks: List[Track] = []
+
+    def update(self, results, now: float = None) -> List[Tuple[Track, str]]:
+        """
+        Feed one frame of detector results.
+
+        Args:
+            results: DetectionResult objects for the frame
+            now: Frame time (defaults to time.time())
+
+        Returns:
+            List of (track, event) pairs to persist, where event is 'new' for a
+            track confirmed in this frame and 'update' for a periodic report.
+            Pass them to confirm() once stored, or to release() if storing failed
+        """
+        now = time.time() if now is None else now
+
+        # Drop tracks that have been out of view too long
+        self.tracks = [t for t in self.tracks if now - t.last_seen <= self.max_age]
+
+        boxed = [r for r in results if r.bbox is not None]
+        unboxed = [r for r in results if r.bbox is None]
+
+        matched_tracks = set()
+        unmatched = list(unboxed)
+        if boxed:
+            candidates = [t for t in self.tracks if t.bbox is not None]
+            scores = iou_matrix(np.array([t.bbox for t in candidates], dtype=float).reshape(-1, 4),
+                                np.array([r.bbox for r in boxed], dtype=float))
+            # Never continue a track with a different species
+            for i, track in enumerate(candidates):
+                for j, result in enumerate(boxed):
+                    if track.species != result.species:
+                        scores[i, j] = 0.0
+            pairs = _assign(scores, self.iou_threshold)
+            for i, j in pairs:
+                candidates[i].update(boxed[j], now, self.smoothing)
+                matched_tracks.add(id(candidates[i]))
+            matched_results = {j for _, j in pairs}
+            unmatched.extend(r for j, r in enumerate(boxed) if j not in matched_results)
+
+        for result in unmatched:
+            # Without a box the best we can do is one track per species
+            existing = None
+            if result.bbox is None:
+                existing = next((t for t in self.tracks if t.bbox is None and t.species == result.species
+                                 and id(t) not in matched_tracks), None)
+            if existing:
+                existing.update(result, now, self.smoothing)
+                matched_tracks.add(id(existing))
+            else:
+                track = Track(result, now, self.camera_id)
+                self.tracks.append(track)
+                matched_tracks.add(id(track))
+
+        events = []
+        for track in self.tracks:
+            if id(track) not in matched_tracks or track.hits < self.min_hits:
+                continue
+            # One report in flight per track; one never confirmed is presumed lost
+            if track.report_at is not None and now - track.report_at <= self.max_age:
+                continue
+            if not track.reported:
+                events.append((track, 'new'))
+            elif now - track.last_reported >= self.update_interval:
+                events.append((track, 'update'))
+            else:
+                continue
+            track.report_at = now
+        return events
+
+    @staticmethod
+    def confirm(events: List[Tuple[Track, str]]):
+        """Mark reports returned by update() as stored"""
+        for track, _event in events:
+            if track.report_at is not None:
+                track.last_reported = track.report_at
+                track.report_at = None
+
+    @staticmethod
+    def release(events: List[Tuple[Track, str]]):
+        """Give up reports returned by update() that were not stored; the next frame reports again"""
+        for track, _event in events:
+            track.report_at = None
+
+    def reset(self):
+        self.tracks = []
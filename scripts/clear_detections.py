@@ -57,8 +57,19 @@ def clear_detections(app, remove_images: bool = False):
                 image_paths.append(candidate)
 
         # Delete all detection rows
+        from app.services.stats_service import rebuild_stats
+        from app.services.rollup_service import rebuild_rollups
+        from app.services.tile_service import reset_tiles
+        from app.models import AlertCooldown, OutboxMessage
+
+        # Notifications still owed for the deleted detections go with them
+        db.session.query(AlertCooldown).delete()
+        db.session.query(OutboxMessage).delete()
         deleted = db.session.query(Detection).delete()
-        db.session.commit()
+        # Bulk deletes bypass the counter hooks; rebuilding also commits the delete
+        rebuild_stats()
+        rebuild_rollups()
+        reset_tiles()
         print(f"Deleted {deleted} detection rows.")
 
         # Optionally remove image files
@@ -0,0 +1,108 @@
+import sys
+
+import numpy as np
+import pytest
+
+from ml.detector import WildlifeDetector, DetectionResult
+from ml.tracker import ObjectTracker, _assign
+from ml.species_classifier import SpeciesClassifier
+
+
+def test_detect_batch_returns_results_per_image():
+    detector = WildlifeDetector(use_mock=True)
+    paths = ['trap_001.jpg', 'trap_002.jpg', 'trap_003.jpg']
+
+    batch = detector.detect_batch(paths, latitude=-3.39, longitude=38.55, conf_threshold=0.5)
+
+    assert len(batch) == len(paths)
+    for path, results in zip(paths, batch):
+        assert all(r.image_path == path for r in results)
+
+
+def test_detect_batch_empty():
+    detector = WildlifeDetector(use_mock=True)
+    assert detector.detect_batch([]) == []
+
+
+def _result(species, bbox, confidence=0.9):
+    return DetectionResult(species, confidence, -3.39, 38.55, image_path='frame.jpg', bbox=bbox)
+
+
+def test_tracker_reports_lingering_animal_once():
+    tracker = ObjectTracker(camera_id='cam_001', min_hits=2, update_interval=60, max_age=120)
+
+    events = []
+    for i in range(10):
+        bbox = (100 + i, 100, 200 + i, 180)
+        frame_events = tracker.update([_result('lion', bbox)], now=i * 2.0)
+        tracker.confirm(frame_events)
+        events.extend(frame_events)
+
+    assert [e for _, e in events] == ['new']
+    assert len(tracker.tracks) == 1
+
+    # A periodic update once the interval has passed
+    events = tracker.update([_result('lion', (110, 100, 210, 180))], now=70.0)
+    assert [e for _, e in events] == ['update']
+
+
+def test_tracker_reports_again_until_stored():
+    tracker = ObjectTracker(min_hits=1, max_age=120)
+    bbox = (0, 0, 100, 100)
+
+    events = tracker.update([_result('lion', bbox)], now=0.0)
+    assert [e for _, e in events] == ['new']
+    # Still in flight: no second report for the same track
+    assert tracker.update([_result('lion', bbox)], now=1.0) == []
+
+    # The write failed, so the next frame reports the track again
+    tracker.release(events)
+    events = tracker.update([_result('lion', bbox)], now=2.0)
+    assert [e for _, e in events] == ['new']
+
+    tracker.confirm(events)
+    assert tracker.tracks[0].last_reported == 2.0
+    assert tracker.update([_result('lion', bbox)], now=3.0) == []
+
+
+def test_tracker_separates_species_and_expires_tracks():
+    tracker = ObjectTracker(min_hits=1, max_age=5)
+    bbox = (0, 0, 100, 100)
+
+    events = tracker.update([_result('lion', bbox), _result('zebra', bbox)], now=0.0)
+    assert sorted(t.species for t, _ in events) == ['lion', 'zebra']
+
+    events = tracker.update([_result('lion', bbox)], now=30.0)
+    assert [e for _, e in events] == ['new']  # old track expired, new one started
+
+
+def test_assign_maximises_total_overlap(monkeypatch):
+    scores = np.array([[0.9, 0.8], [0.7, 0.0]])
+    with monkeypatch.context() as m:
+        m.setitem(sys.modules, 'scipy.optimize', None)  # import fails
+        # Greedy takes 0.9 first and strands row 1
+        assert _assign(scores, 0.3) == [(0, 0)]
+
+    pytest.importorskip('scipy.optimize')
+    assert sorted(_assign(scores, 0.3)) == [(0, 1), (1, 0)]
+
+
+def test_tracker_smooths_confidence():
+    tracker = ObjectTracker(min_hits=1, smoothing=0.5)
+    bbox = (0, 0, 100, 100)
+    tracker.update([_result('elephant', bbox, 0.9)], now=0.0)
+    tracker.update([_result('elephant', bbox, 0.5)], now=1.0)
+    assert tracker.tracks[0].confidence == 0.7
+
+
+def test_classify_batch_maps_common_names():
+    classifier = SpeciesClassifier(mode='yolo')
+    classified = classifier.classify_batch([
+        {'class_name': 'Loxodonta', 'confidence': 0.912},
+        {'class_name': 'impala', 'confidence': 0.8},
+        {'class_name': 'dog', 'confidence': 0.7},
+    ])
+
+    assert [c['species'] for c in classified] == ['elephant', 'antelope', 'dog']
+    assert [c['threat_level'] for c in classified] == ['medium', 'low', 'unknown']
+    assert classified[0]['confidence'] == 0.91
@@ -0,0 +1,104 @@
+import pytest
+from app import create_app, db
+from app.models import Detection
+from app.models.detection import geo_cell
+
+ROWS = 1_000_000
+
+
+@pytest.fixture(scope='module')
+def app():
+    """In-memory database filled with 1M detections"""
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.execute(db.text(f"""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < {ROWS})
+            INSERT INTO detections (species, confidence, camera_id, latitude, longitude, timestamp,
+                                    is_verified, is_false_positive, frame_count, geo_cell)
+            SELECT CASE i % 5 WHEN 0 THEN 'elephant' WHEN 1 THEN 'lion' WHEN 2 THEN 'zebra'
+                              WHEN 3 THEN 'buffalo' ELSE 'rhino' END,
+                   (i % 100) / 100.0, 'CAM_' || (i % 20), -1.29, 36.82,
+                   datetime('2025-01-01', '+' || (i * 7 % {ROWS}) || ' minutes'),
+                   i % 7 = 0, i % 10 = 0, 1, {geo_cell(-1.29, 36.82)}
+            FROM n
+        """))
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+    yield app
+
+
+def _plan(query):
+    conn = db.session.connection()
+    compiled = query.statement.compile(conn)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def _assert_uses(plan, index):
+    assert any(f'INDEX {index}' in step for step in plan), plan
+    assert not any(step == 'SCAN detections' for step in plan), plan
+
+
+def test_recent_detections_use_partial_index(app):
+    with app.app_context():
+        # /api/detections/recent, /map-data and the dashboard's recent list
+        plan = _plan(Detection.query.filter_by(is_false_positive=False)
+                     .order_by(Detection.timestamp.desc()).limit(100))
+    _assert_uses(plan, 'ix_detections_active_timestamp')
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_detections_by_species_use_composite_index(app):
+    with app.app_context():
+        plan = _plan(Detection.query.filter_by(species='lion', is_false_positive=False)
+                     .order_by(Detection.timestamp.desc()).limit(50))
+    _assert_uses(plan, 'ix_detections_species_fp_timestamp')
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_top_species_reads_covering_index(app):
+    with app.app_context():
+        plan = _plan(db.session.query(Detection.species, db.func.count(Detection.id))
+                     .filter_by(is_false_positive=False)
+                     .group_by(Detection.species)
+                     .order_by(db.func.count(Detection.id).desc())
+                     .limit(5))
+    _assert_uses(plan, 'ix_detections_species_fp_timestamp')
+    assert any('COVERING INDEX' in step for step in plan), plan
+
+
+def test_camera_history_uses_camera_index(app):
+    with app.app_context():
+        plan = _plan(Detection.query.filter_by(camera_id='CAM_3')
+                     .order_by(Detection.timestamp.desc()).limit(50))
+        assert Detection.query.filter_by(camera_id='CAM_3').count() == ROWS // 20
+    _assert_uses(plan, 'ix_detections_camera_timestamp')
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_history_pages_by_keyset(app):
+    from app.services.pagination import keyset_page, keyset_query
+
+    with app.app_context():
+        first = keyset_page(Detection.query, limit=50)
+        second = keyset_page(Detection.query, limit=50, cursor=first['next_cursor'])
+        last = first['items'][-1]
+        plan = _plan(keyset_query(Detection.query, first['next_cursor']).limit(51))
+    assert first['has_more'] and len(second['items']) == 50
+    assert (second['items'][0].timestamp, second['items'][0].id) < (last.timestamp, last.id)
+    assert any('INDEX ix_detections_timestamp_id (timestamp<?)' in step for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+
+
+def test_radius_search_prunes_by_geo_cell(app):
+    from app.services.map_services import map_service
+
+    with app.app_context():
+        bbox = map_service.get_bounding_box(-1.3, 36.8, radius_km=5)
+        plan = _plan(Detection.query.filter(*map_service.bbox_filter(bbox)))
+        nearby = map_service.detections_within(-1.3, 36.8, radius_km=5, limit=10)
+    assert any('INDEX ix_detections_geo_cell' in step for step in plan), plan
+    assert not any(step == 'SCAN detections' for step in plan), plan
+    assert len(nearby) == 10 and all(distance <= 5 for _, distance in nearby)
@@ -3,6 +3,7 @@ import json
 from app import create_app, db
 from app.models import Detection, Subscriber
 
+
 @pytest.fixture
 def client():
     app = create_app('testing')
@@ -14,6 +15,7 @@ def client():
             db.create_all()
         yield client
 
+
 def test_receive_alert(client):
     """Test receiving an alert"""
     detection_data = {
@@ -35,6 +37,7 @@ def test_receive_alert(client):
     assert data['status'] == 'success'
     assert 'detection_id' in data
 
+
 def test_get_detections(client):
     """Test getting detections"""
     response = client.get('/api/detections')
@@ -44,6 +47,7 @@ def test_get_detections(client):
     assert data['status'] == 'success'
     assert 'detections' in data
 
+
 def test_create_subscriber(client):
     """Test creating a subscriber"""
     subscriber_data = {
@@ -59,4 +63,410 @@ def test_create_subscriber(client):
     assert response.status_code == 201
     data = json.loads(response.data)
     assert data['status'] == 'success'
-    assert data['subscriber']['name'] == 'Test Ranger'
\ No newline at end of file
+    assert data['subscriber']['name'] == 'Test Ranger'
+
+
+def test_get_detections_cursor_pagination(client):
+    """Test walking the detection history with next_cursor"""
+    from datetime import datetime, timedelta
+    with client.application.app_context():
+        start = datetime(2025, 1, 1, 12, 0, 0)
+        for i in range(5):
+            # Pairs share a timestamp so the id tie-break is exercised
+            db.session.add(Detection(species='lion', confidence=0.9, latitude=-1.5, longitude=35.3,
+                                     timestamp=start + timedelta(minutes=i // 2)))
+        db.session.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/detections?limit=2&include_total=true' + (f'&cursor={cursor}' if cursor else '')
+        data = json.loads(client.get(url).data)
+        assert data['status'] == 'success'
+        assert data['total'] == 5 and data['total_is_estimate'] is False
+        seen.extend(d['id'] for d in data['detections'])
+        cursor = data['next_cursor']
+        if not data['has_more']:
+            break
+    assert seen == [5, 4, 3, 2, 1]
+
+    response = client.get('/api/detections/recent?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_analytics_timeseries_from_rollups(client):
+    """Test hourly counts, late data and false-positive correction"""
+    from datetime import datetime
+    from app.services.rollup_service import rebuild_rollups
+    with client.application.app_context():
+        for hour, camera_id in [(10, 'cam_001'), (10, 'cam_002'), (12, 'cam_001')]:
+            db.session.add(Detection(species='elephant', confidence=0.8, camera_id=camera_id,
+                                     latitude=-1.5, longitude=35.3,
+                                     timestamp=datetime(2025, 1, 1, hour, 30)))
+        db.session.commit()
+        # A late upload from the morning and a false positive
+        db.session.add(Detection(species='elephant', confidence=0.6, camera_id='cam_001',
+                                 latitude=-1.5, longitude=35.3, timestamp=datetime(2025, 1, 1, 9, 5)))
+        Detection.query.filter_by(camera_id='cam_002').one().is_false_positive = True
+        db.session.commit()
+
+    url = '/api/analytics/timeseries?species=elephant&start=2025-01-01T09:00&end=2025-01-01T12:59'
+    data = json.loads(client.get(url).data)
+    assert data['status'] == 'success'
+    assert [p['count'] for p in data['series']] == [1, 1, 0, 1]
+    assert data['series'][0]['avg_confidence'] == 0.6
+
+    data = json.loads(client.get(url + '&bucket=day&camera_id=cam_001').data)
+    assert [p['count'] for p in data['series']] == [3]
+
+    with client.application.app_context():
+        rebuild_rollups()
+    assert json.loads(client.get(url).data)['total'] == 3
+    assert client.get(url + '&bucket=week').status_code == 400
+
+
+def test_map_data_cached_until_write(client):
+    """Test that polled endpoints are cached and invalidated by writes"""
+    with client.application.app_context():
+        db.session.add(Detection(species='elephant', confidence=0.9, latitude=-3.4, longitude=38.5))
+        db.session.commit()
+        detection_id = Detection.query.one().id
+
+    first = client.get('/map-data')
+    second = client.get('/map-data')
+    assert first.headers['X-Cache'] == 'MISS' and second.headers['X-Cache'] == 'HIT'
+    assert json.loads(second.data)['status'] == 'success'
+    assert len(json.loads(second.data)['detections']) == 1
+
+    client.post(f'/api/detections/{detection_id}/false-positive')
+    third = client.get('/map-data')
+    assert third.headers['X-Cache'] == 'MISS'
+    assert json.loads(third.data)['detections'] == []
+
+    metrics = json.loads(client.get('/api/system/cache').data)['cache']
+    assert metrics['endpoints']['dashboard.map_data'] == {'hits': 1, 'misses': 2, 'hit_ratio': 0.3333}
+
+
+def test_map_data_deltas_since_watermark(client):
+    """Test that /map-data?since= returns only changes and tombstones"""
+    from datetime import datetime, timedelta, timezone
+    with client.application.app_context():
+        old = datetime.utcnow() - timedelta(hours=1)
+        for i in range(3):
+            db.session.add(Detection(species='elephant', confidence=0.9, latitude=-3.4, longitude=38.5,
+                                     timestamp=old, updated_at=old))
+        db.session.commit()
+
+    snapshot = json.loads(client.get('/map-data').data)
+    assert snapshot['mode'] == 'full' and len(snapshot['detections']) == 3
+    watermark = snapshot['watermark']
+
+    data = json.loads(client.get(f'/map-data?since={watermark}').data)
+    assert data['mode'] == 'delta' and data['detections'] == [] and data['removed'] == []
+    assert data['cameras'] == snapshot['cameras']
+
+    client.post('/api/detections/2/false-positive')
+    client.post('/api/alert', json={'species': 'elephant', 'confidence': 0.9,
+                                    'location': {'lat': -3.4, 'lng': 38.5}})
+    data = json.loads(client.get(f'/map-data?since={watermark}').data)
+    assert data['removed'] == [2]
+    assert [d['id'] for d in data['detections']] == [4]
+    assert client.get('/map-data?since=yesterday').status_code == 400
+
+    # A watermark with an offset is the same instant in UTC
+    local = datetime.fromisoformat(watermark).replace(tzinfo=timezone.utc)\
+        .astimezone(timezone(timedelta(hours=3))).isoformat()
+    data = json.loads(client.get('/map-data', query_string={'since': local}).data)
+    assert data['removed'] == [2]
+    assert [d['id'] for d in data['detections']] == [4]
+
+
+def test_map_clusters_aggregate_grid_cells(client):
+    """Test that /api/map/clusters groups nearby detections into cells"""
+    with client.application.app_context():
+        for species, lat, lng in [('elephant', -3.401, 38.501), ('elephant', -3.402, 38.502),
+                                  ('lion', -3.403, 38.503), ('zebra', -1.29, 36.82)]:
+            db.session.add(Detection(species=species, confidence=0.9, latitude=lat, longitude=lng))
+        db.session.add(Detection(species='lion', confidence=0.9, latitude=-3.401, longitude=38.501,
+                                 is_false_positive=True))
+        db.session.commit()
+
+    data = json.loads(client.get('/api/map/clusters?zoom=6').data)
+    assert data['status'] == 'success' and data['total'] == 4
+    assert [(c['count'], c['dominant_species']) for c in data['clusters']] == [(3, 'elephant'), (1, 'zebra')]
+    assert data['clusters'][0]['species'] == {'elephant': 2, 'lion': 1}
+
+    data = json.loads(client.get('/api/map/clusters?lat=-3.4&lng=38.5&radius_km=5&zoom=6').data)
+    assert data['total'] == 3
+    assert client.get('/api/map/clusters?min_lat=10&max_lat=0').status_code == 400
+
+
+def test_dashboard_gets_heat_tile_max_zoom(client):
+    """Test that the dashboard reads the heatmap's native zoom limit from the server"""
+    from config.detection_config import HEAT_TILE_MAX_ZOOM
+    html = client.get('/').data.decode()
+    assert f'data-heat-max-zoom="{HEAT_TILE_MAX_ZOOM}"' in html
+
+
+def test_heat_tiles_build_incrementally(client, tmp_path):
+    """Test that heatmap tiles are served with ETags and rebuilt only where detections changed"""
+    from datetime import datetime, timedelta
+    from app.services import tile_service
+    app = client.application
+    app.config['HEAT_TILE_DIR'] = str(tmp_path)
+    with app.app_context():
+        old = datetime.utcnow() - timedelta(hours=1)
+        db.session.add(Detection(species='elephant', confidence=0.9, latitude=-3.4, longitude=38.5,
+                                 timestamp=old, updated_at=old))
+        db.session.add(Detection(species='lion', confidence=0.9, latitude=-1.29, longitude=36.82,
+                                 timestamp=old, updated_at=old))
+        db.session.commit()
+        first = tile_service.build_tiles()
+        assert first['detections'] == 2 and first['rendered'] > 0
+        assert tile_service.build_tiles()['detections'] == 0
+        (z, x, y), = tile_service.tiles_for([-3.4], [38.5], z=10)
+
+    response = client.get(f'/tiles/heat/{z}/{x}/{y}')
+    assert response.status_code == 200 and response.mimetype == 'image/png'
+    blank = client.get(f'/tiles/heat/{z}/{x + 1}/{y}').data
+    assert response.data != blank
+    etag = response.headers['ETag']
+    assert client.get(f'/tiles/heat/{z}/{x}/{y}.png', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post('/api/detections/1/false-positive')
+    with app.app_context():
+        # Only the elephant's tiles are redrawn: emptied where it was alone
+        second = tile_service.build_tiles()
+        assert second['detections'] == 1 and second['removed'] > 0
+    assert client.get(f'/tiles/heat/{z}/{x}/{y}').data == blank
+    assert client.get('/tiles/heat/1/5/0').status_code == 404
+
+
+def test_nearby_detections_within_radius(client):
+    """Test that /api/map/nearby returns detections inside the radius, nearest first"""
+    with client.application.app_context():
+        # The third point is inside the 10 km bounding box but 12.6 km away
+        for lat, lng in [(-3.40, 38.50), (-3.43, 38.50), (-3.48, 38.58), (-3.60, 38.50)]:
+            db.session.add(Detection(species='elephant', confidence=0.9, latitude=lat, longitude=lng))
+        db.session.commit()
+
+    data = json.loads(client.get('/api/map/nearby?lat=-3.4&lng=38.5&radius_km=10').data)
+    assert [d['id'] for d in data['detections']] == [1, 2]
+    assert data['detections'][1]['distance_km'] == pytest.approx(3.336, abs=0.01)
+    data = json.loads(client.get('/api/map/nearby?lat=-3.4&lng=38.5&radius_km=13').data)
+    assert [d['id'] for d in data['detections']] == [1, 2, 3]
+    assert client.get('/api/map/nearby?lat=-3.4').status_code == 400
+
+
+def test_nearby_detections_near_pole(client):
+    """Test that /api/map/nearby handles circles that reach a pole"""
+    with client.application.app_context():
+        # Across the pole from the query point, 22 km away
+        db.session.add(Detection(species='polar_bear', confidence=0.9, latitude=89.9, longitude=-144.0))
+        db.session.commit()
+
+    response = client.get('/api/map/nearby?lat=89.9&lng=36&radius_km=50')
+    assert response.status_code == 200
+    assert [d['id'] for d in json.loads(response.data)['detections']] == [1]
+    assert client.get('/api/map/nearby?lat=90&lng=0&radius_km=50').status_code == 200
+    assert client.get('/api/map/nearby?lat=-90&lng=0&radius_km=50').status_code == 200
+
+
+def test_nearest_cameras_and_points_of_interest(client):
+    """Test that /api/map/nearest ranks cameras and points of interest by distance"""
+    from app.models import Camera
+    with client.application.app_context():
+        db.session.add(Camera(camera_id='CAM_FAR', name='Far', latitude=-3.0, longitude=38.0))
+        db.session.add(Camera(camera_id='CAM_NEAR', name='Near', latitude=-3.39, longitude=37.68))
+        db.session.commit()
+
+    data = json.loads(client.get('/api/map/nearest?lat=-3.4&lng=37.67&k=1').data)
+    assert [c['camera_id'] for c in data['cameras']] == ['CAM_NEAR']
+    assert data['points_of_interest'][0]['name'] == 'KRCS Taveta Office'
+    data = json.loads(client.get('/api/map/nearest?lat=-3.4&lng=37.67&k=5&radius_km=10').data)
+    assert [c['camera_id'] for c in data['cameras']] == ['CAM_NEAR']
+    assert client.get('/api/map/nearest').status_code == 400
+
+
+def test_geofence_breach_on_alert(client):
+    """Test that an alert inside a geofence polygon reports the breach"""
+    village = {'name': 'Mwatate', 'zone_type': 'village', 'species': ['elephant'],
+               'coordinates': [[-3.40, 38.50], [-3.40, 38.52], [-3.42, 38.52], [-3.42, 38.50]]}
+    response = client.post('/api/geofences', json=village)
+    assert response.status_code == 201
+    fence_id = json.loads(response.data)['geofence']['id']
+    assert client.post('/api/geofences', json={'name': 'x', 'coordinates': [[0, 0]]}).status_code == 400
+
+    alert = {'species': 'elephant', 'confidence': 0.9, 'location': {'lat': -3.41, 'lng': 38.51}}
+    data = json.loads(client.post('/api/alert', json=alert).data)
+    assert data['geofence_breaches'] == [{'id': fence_id, 'name': 'Mwatate', 'zone_type': 'village'}]
+
+    # Inside the bounding box but outside the triangle; and a species the fence ignores
+    client.put(f'/api/geofences/{fence_id}', json={'coordinates': [[-3.40, 38.50], [-3.40, 38.52], [-3.42, 38.52]]})
+    alert['location'] = {'lat': -3.419, 'lng': 38.501}
+    assert json.loads(client.post('/api/alert', json=alert).data)['geofence_breaches'] == []
+    alert.update(species='zebra', location={'lat': -3.401, 'lng': 38.519})
+    assert json.loads(client.post('/api/alert', json=alert).data)['geofence_breaches'] == []
+
+    assert client.delete(f'/api/geofences/{fence_id}').status_code == 200
+    assert json.loads(client.get('/api/geofences/check?lat=-3.401&lng=38.519').data)['geofences'] == []
+
+
+def test_alert_notifies_nearby_subscribers(client, monkeypatch):
+    """Test that alerts go to subscribers within their radius and to those without a location"""
+    from app.services import notification_services
+    from app.services.outbox_service import notification_dispatcher
+    sent = []
+    monkeypatch.setattr(notification_services, 'send_sms', lambda message, to: sent.append(to) or True)
+
+    client.post('/api/subscribers', json={'name': 'Anywhere', 'phone': '+254700000001'})
+    client.post('/api/subscribers', json={'name': 'Voi', 'phone': '+254700000002',
+                                          'location': {'lat': -3.40, 'lng': 38.55}, 'alert_radius_km': 5})
+    client.post('/api/subscribers', json={'name': 'Taveta', 'phone': '+254700000003',
+                                          'latitude': -3.40, 'longitude': 37.68})
+    assert client.post('/api/subscribers', json={'name': 'Bad', 'phone': '+254700000004',
+                                                 'latitude': -3.4}).status_code == 400
+
+    data = json.loads(client.post('/api/alert', json={'species': 'elephant', 'confidence': 0.9,
+                                                      'location': {'lat': -3.42, 'lng': 38.56}}).data)
+    assert data['notification']['idempotency_key'] == f"detection:{data['detection_id']}"
+    assert notification_dispatcher.flush(timeout=10)
+    assert sorted(sent) == ['+254700000001', '+254700000002']
+
+    # The subscriber index is rebuilt after the Voi subscriber leaves
+    voi = [s for s in json.loads(client.get('/api/subscribers').data)['subscribers'] if s['name'] == 'Voi'][0]
+    client.delete(f"/api/subscribers/{voi['id']}")
+    sent.clear()
+    client.post('/api/alert', json={'species': 'elephant', 'confidence': 0.9, 'camera_id': 'cam_002',
+                                    'location': {'lat': -3.42, 'lng': 38.56}})
+    assert notification_dispatcher.flush(timeout=10)
+    assert sent == ['+254700000001']
+
+
+def test_alert_cooldown_folds_into_digest(client, monkeypatch):
+    """Test that repeat detections from one camera go into a digest sent when the cooldown ends"""
+    from datetime import datetime
+    from app.models import OutboxMessage
+    from app.services import notification_services
+    from app.services.outbox_service import notification_dispatcher
+    sent = []
+    monkeypatch.setattr(notification_services, 'send_sms', lambda message, to: sent.append(message) or True)
+    client.post('/api/subscribers', json={'name': 'Ranger', 'phone': '+254700000001'})
+
+    alert = {'species': 'elephant', 'confidence': 0.9, 'camera_id': 'cam_001',
+             'location': {'lat': -3.42, 'lng': 38.56}}
+    statuses = [json.loads(client.post('/api/alert', json=alert).data) for _ in range(4)]
+    assert [s['status'] for s in statuses] == ['success', 'cooldown', 'cooldown', 'cooldown']
+    digest = statuses[-1]['notification']
+    assert digest['kind'] == 'digest' and digest['digest_count'] == 3
+
+    # Other cameras and species have windows of their own
+    assert json.loads(client.post('/api/alert', json=dict(alert, camera_id='cam_002')).data)['status'] == 'success'
+    assert json.loads(client.post('/api/alert', json=dict(alert, species='lion')).data)['status'] == 'success'
+
+    assert notification_dispatcher.flush(timeout=10)
+    assert len(sent) == 3 and not any(m.startswith('DIGEST') for m in sent)
+
+    # Close the window: the digest goes out once
+    with client.application.app_context():
+        db.session.get(OutboxMessage, digest['id']).next_attempt_at = datetime.utcnow()
+        db.session.commit()
+    assert notification_dispatcher.flush(timeout=10)
+    assert [m for m in sent if m.startswith('DIGEST')] == [sent[-1]]
+    assert sent[-1].startswith('DIGEST: 3 more elephant detections at camera cam_001')
+
+
+def test_high_threat_notifications_sent_first(client, monkeypatch):
+    """Test that a lion in a village is sent ahead of a backlog of zebras"""
+    from app.services import notification_services
+    from app.services.outbox_service import notification_dispatcher
+    sent = []
+    monkeypatch.setattr(notification_services, 'send_sms', lambda message, to: sent.append(message) or True)
+    client.post('/api/subscribers', json={'name': 'Ranger', 'phone': '+254700000001'})
+    client.post('/api/geofences', json={'name': 'Mwatate', 'zone_type': 'village',
+                                        'coordinates': [[-3.40, 38.50], [-3.40, 38.54], [-3.44, 38.54], [-3.44, 38.50]]})
+
+    for i in range(6):
+        client.post('/api/alert', json={'species': 'zebra', 'confidence': 0.95, 'camera_id': f'zebra_{i}',
+                                        'location': {'lat': -3.2, 'lng': 38.3}})
+    data = json.loads(client.post('/api/alert', json={'species': 'lion', 'confidence': 0.85, 'camera_id': 'lion_cam',
+                                                      'location': {'lat': -3.42, 'lng': 38.52}}).data)
+    assert data['notification']['priority'] > 300
+
+    assert notification_dispatcher.flush(timeout=10)
+    assert len(sent) == 7
+    assert 'Camera: lion_cam' in sent[0]
+
+    metrics = json.loads(client.get('/api/system/notifications').data)['notifications']
+    assert metrics['latency_by_priority']['high']['samples'] == 1
+    assert metrics['latency_by_priority']['low']['samples'] == 6
+
+
+def test_alert_batch_stores_valid_items_in_one_request(client):
+    """Test that a gzip JSON batch is stored in one go, with invalid items rejected by index"""
+    import gzip
+    from app.models import OutboxMessage
+    batch = [
+        {'species': 'elephant', 'confidence': 0.9, 'camera_id': 'relay_01',
+         'location': {'lat': -3.42, 'lng': 38.56}, 'timestamp': '2026-10-18T04:12:00Z'},
+        {'species': 'lion', 'confidence': 0.7, 'latitude': -3.40, 'longitude': 38.50},
+        {'species': 'elephant', 'confidence': 0.9, 'location': {'lat': 95.0, 'lng': 38.56}},
+        {'species': 'buffalo', 'confidence': 'high', 'location': {'lat': -3.40, 'lng': 38.50}},
+        'not a detection',
+    ]
+    response = client.post('/api/alerts/batch', data=gzip.compress(json.dumps({'detections': batch}).encode()),
+                           headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['status'] == 'partial' and data['stored'] == 2 and data['rejected'] == 3
+    # The first was seen a day ago: it goes into a catch-up digest instead of alerting
+    assert [r['status'] for r in data['results']] == ['late', 'created', 'rejected', 'rejected', 'rejected']
+    assert data['results'][2]['error'] == 'Invalid or missing latitude'
+
+    with client.application.app_context():
+        first = db.session.get(Detection, data['results'][0]['detection_id'])
+        assert first.camera_id == 'relay_01' and first.timestamp.isoformat() == '2026-10-18T04:12:00'
+        assert db.session.get(Detection, data['results'][1]['detection_id']).species == 'lion'
+        assert OutboxMessage.query.count() == 2
+
+    # Bodies that are not a batch are refused as a whole
+    assert client.post('/api/alerts/batch', data=b'{"detections": 1}',
+                       content_type='application/json').status_code == 400
+    assert client.post('/api/alerts/batch', data=b'x', content_type='text/plain').status_code == 415
+
+
+def test_alert_batch_routes_cooldowns_by_detection_time(client, monkeypatch):
+    """Test that a relay backlog is digested by detection time and cannot mute a live alert"""
+    from datetime import datetime, timedelta
+    from app.models import OutboxMessage
+    from app.services import notification_services
+    from app.services.outbox_service import notification_dispatcher
+    sent = []
+    monkeypatch.setattr(notification_services, 'send_sms', lambda message, to: sent.append(message) or True)
+    client.post('/api/subscribers', json={'name': 'Ranger', 'phone': '+254700000001'})
+
+    now = datetime.utcnow()
+    live = {'species': 'elephant', 'confidence': 0.9, 'camera_id': 'cam_001', 'location': {'lat': -3.42, 'lng': 38.56}}
+    stale = dict(live, camera_id='cam_002')
+    # Sent newest first; hours-old sightings from cam_002 and six recent ones from cam_001
+    batch = [dict(stale, timestamp=(now - timedelta(hours=h)).isoformat()) for h in (1, 3, 2)]
+    batch += [dict(live, timestamp=(now - timedelta(seconds=s)).isoformat()) for s in (5, 10, 15, 20, 25, 30)]
+    data = json.loads(client.post('/api/alerts/batch', json=batch).data)
+    statuses = [r['status'] for r in data['results']]
+    assert statuses[:3] == ['late'] * 3
+    # The oldest recent sighting alerts; the rest join its window's digest
+    assert statuses[3:] == ['cooldown'] * 5 + ['created']
+
+    with client.application.app_context():
+        digest = OutboxMessage.query.filter(OutboxMessage.idempotency_key.like('digest:%')).one()
+        late = OutboxMessage.query.filter(OutboxMessage.idempotency_key.like('late:%')).one()
+        assert digest.digest_count == 5 and late.digest_count == 3
+        assert late.digest_since.replace(microsecond=0) == (now - timedelta(hours=3)).replace(microsecond=0)
+        assert late.detection_id == data['results'][0]['detection_id']
+
+    assert notification_dispatcher.flush(timeout=10)
+    assert sum(m.startswith('LATE REPORT: 3 elephant detections at camera cam_002') for m in sent) == 1
+    assert not any(m.startswith('DIGEST') for m in sent)
+
+    # The backlog opened no window for cam_002: a live sighting there alerts right away
+    assert json.loads(client.post('/api/alert', json=stale).data)['status'] == 'success'
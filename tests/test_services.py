@@ -0,0 +1,512 @@
+import os
+import time
+import pytest
+from app import create_app, db
+from app.models import Detection
+from app.services.ingest_service import FolderWatcher
+from app.services.burst_service import group_bursts, aggregate_burst
+from ml.detector import DetectionResult
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+
+
+def _drop_image(folder, name, age=30.0):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(b'\xff\xd8\xff\xe0fake-jpeg')
+    past = time.time() - age
+    os.utime(path, (past, past))
+    return path
+
+
+def test_folder_watcher_ingests_batches_per_camera(app, tmp_path):
+    watch_dir = str(tmp_path)
+    watcher = FolderWatcher(app, watch_dir, batch_size=2, batch_timeout=0,
+                            force_polling=True, include_existing=True, write_behind=False)
+    for i in range(3):
+        _drop_image(os.path.join(watch_dir, 'cam_001'), f'IMG_{i:04d}.JPG')
+    _drop_image(os.path.join(watch_dir, 'cam_002'), 'IMG_0001.jpg')
+    _drop_image(watch_dir, 'notes.txt')
+
+    watcher.scan()
+    ingested = watcher.poll_once()
+
+    assert ingested == 4
+    assert watcher.stats['files_ingested'] == 4
+    assert watcher.stats['failed_batches'] == 0
+    with app.app_context():
+        cameras = {d.camera_id for d in Detection.query.all()}
+    assert cameras <= {'cam_001', 'cam_002'}
+
+    # Already ingested files are not picked up again
+    watcher.scan()
+    assert watcher.poll_once() == 0
+
+
+def test_folder_watcher_waits_for_files_to_settle(app, tmp_path):
+    watcher = FolderWatcher(app, str(tmp_path), camera_id='cam_001', batch_timeout=0,
+                            settle_time=60, force_polling=True, include_existing=True,
+                            write_behind=False)
+    _drop_image(str(tmp_path), 'IMG_0001.jpg', age=0)
+
+    watcher.scan()
+    assert watcher.poll_once() == 0
+
+
+def test_folder_watcher_retries_failed_batches(app, tmp_path, monkeypatch):
+    from app.services import ingest_service
+    calls = []
+
+    class FlakyService:
+        def process_bursts(self, bursts, **kwargs):
+            frames = [os.path.basename(p) for b in bursts for p in b.frames]
+            calls.append(frames)
+            # The first batch hits a passing database error; BAD.jpg never reads
+            return [], len(calls) > 1 and 'BAD.jpg' not in frames
+
+    monkeypatch.setattr(ingest_service, 'get_detection_service', lambda use_mock: FlakyService())
+    watch_dir = str(tmp_path)
+    watcher = FolderWatcher(app, watch_dir, batch_size=8, batch_timeout=0, burst_gap=0, force_polling=True,
+                            include_existing=True, write_behind=False, max_attempts=3, retry_delay=60)
+    _drop_image(os.path.join(watch_dir, 'cam_001'), 'IMG_0001.jpg')
+    _drop_image(os.path.join(watch_dir, 'cam_002'), 'BAD.jpg')
+
+    watcher.scan()
+    assert watcher.poll_once() == 0
+    # Both files wait out the retry delay
+    assert watcher.poll_once() == 0 and len(calls) == 1
+
+    # Retried one burst at a time: the good image goes in, the bad one is skipped after three tries
+    watcher.retry_delay = 0
+    watcher._retry_at.clear()
+    assert watcher.poll_once() == 1
+    assert sorted(map(len, calls)) == [1, 1, 1, 2]
+    assert watcher.stats['files_ingested'] == 1 and watcher.stats['failed_files'] == 1
+    assert watcher.poll_once() == 0 and len(calls) == 4
+
+    # Files removed from the folder are forgotten
+    os.remove(os.path.join(watch_dir, 'cam_002', 'BAD.jpg'))
+    watcher.scan()
+    assert watcher._seen == {os.path.join(watch_dir, 'cam_001', 'IMG_0001.jpg')}
+
+
+def test_group_bursts_splits_on_camera_and_gap():
+    times = {'a1': 0, 'a2': 2, 'a3': 4, 'a4': 60, 'b1': 1}
+    bursts = group_bursts(list(times), camera_for=lambda p: p[0], gap=10,
+                          time_for=times.get)
+
+    frames = sorted(b.frames for b in bursts)
+    assert frames == [['a1', 'a2', 'a3'], ['a4'], ['b1']]
+
+
+def test_aggregate_burst_voting():
+    def result(species, confidence):
+        return DetectionResult(species, confidence, -3.39, 38.55, image_path=f'{species}_{confidence}.jpg')
+
+    frames = [
+        [result('elephant', 0.6), result('elephant', 0.9)],
+        [result('elephant', 0.7)],
+        [result('lion', 0.8)],
+    ]
+
+    by_species = {e['species']: e for e in aggregate_burst(frames, voting='max')}
+    assert by_species['elephant']['confidence'] == 0.9
+    assert by_species['elephant']['frame_count'] == 2
+    assert by_species['elephant']['image_path'] == 'elephant_0.9.jpg'
+    assert by_species['lion']['frame_count'] == 1
+
+    by_species = {e['species']: e for e in aggregate_burst(frames, voting='mean')}
+    assert by_species['elephant']['confidence'] == pytest.approx(0.8)
+
+
+def test_process_batch_inserts_in_one_statement(app):
+    from sqlalchemy import event
+    from app.services.detection_services import get_detection_service
+
+    service = get_detection_service(use_mock=True)
+    inserts = []
+
+    with app.app_context():
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO detections'):
+                inserts.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count_inserts)
+        try:
+            saved = []
+            while not saved:  # the mock detector finds nothing ~30% of the time
+                saved, success = service.process_batch(
+                    [f'trap_{i}.jpg' for i in range(5)], camera_id='cam_001')
+                assert success
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_inserts)
+
+        assert len(inserts) == 1
+        assert [d.id for d in saved] == sorted(d.id for d in saved)
+        assert Detection.query.count() == len(saved)
+
+
+def test_write_queue_group_commits_queued_rows(app):
+    from app.services.write_queue import DetectionWriteQueue
+
+    write_queue = DetectionWriteQueue(maxsize=10, batch_size=100, flush_interval=0.2)
+    write_queue.init_app(app)
+    row = {'species': 'elephant', 'confidence': 0.9, 'latitude': -3.39,
+           'longitude': 38.55, 'camera_id': 'cam_001'}
+
+    for _ in range(5):
+        assert write_queue.submit([dict(row)])
+    assert write_queue.flush(timeout=10)
+
+    metrics = write_queue.metrics()
+    assert metrics['depth'] == 0
+    assert metrics['enqueued_rows'] == metrics['committed_rows'] == 5
+    assert 1 <= metrics['commits'] <= 5
+    write_queue.shutdown()
+    assert not write_queue.running
+
+    with app.app_context():
+        assert Detection.query.filter_by(camera_id='cam_001').count() == 5
+
+
+def test_detection_stats_follow_writes(app):
+    from app.services import stats_service
+    from app.services.detection_services import get_detection_service
+
+    service = get_detection_service(use_mock=True)
+    with app.app_context():
+        db.session.add_all([
+            Detection(species='elephant', confidence=0.95, latitude=-1.5, longitude=35.3),
+            Detection(species='lion', confidence=0.7, latitude=-1.5, longitude=35.3),
+        ])
+        db.session.commit()
+        service._commit(service._bulk_insert([
+            {'species': 'lion', 'confidence': 0.92, 'latitude': -1.5, 'longitude': 35.3},
+        ]))
+
+        lion = Detection.query.filter_by(species='lion', confidence=0.7).one()
+        lion.is_false_positive = True
+        elephant = Detection.query.filter_by(species='elephant').one()
+        elephant.is_verified = True
+        db.session.commit()
+
+        assert service.get_stats() == {
+            'total_detections': 3,
+            'verified': 1,
+            'false_positives': 1,
+            'species': {'elephant': 1, 'lion': 2},
+        }
+        assert stats_service.top_species() == [{'species': 'elephant', 'count': 1},
+                                               {'species': 'lion', 'count': 1}]
+        assert stats_service.get_counters()['high_confidence'] == 2
+
+        db.session.delete(elephant)
+        db.session.commit()
+        counters = {k: v for k, v in stats_service.get_counters().items() if v}
+        assert {k: v for k, v in stats_service.rebuild_stats().items() if v} == counters
+
+
+def test_point_index_matches_haversine(app):
+    import numpy as np
+    from app.models import Camera
+    from app.services.map_services import map_service, PointIndex
+
+    rng = np.random.default_rng(7)
+    lats, lngs = rng.uniform(-5, 5, 500), rng.uniform(33, 43, 500)
+    index = PointIndex([{'id': i} for i in range(500)], lats, lngs)
+
+    distances = map_service.distances_from(-1.0, 37.0, lats, lngs)
+    assert distances[0] == pytest.approx(map_service.calculate_distance(-1.0, 37.0, lats[0], lngs[0]))
+    assert map_service.distance_matrix(lats[:3], lngs[:3], lats, lngs).shape == (3, 500)
+
+    nearest = index.nearest(-1.0, 37.0, k=5)
+    assert [item['id'] for item, _ in nearest] == np.argsort(distances)[:5].tolist()
+    assert [d for _, d in nearest] == pytest.approx(np.sort(distances)[:5].tolist())
+    within = index.within(-1.0, 37.0, radius_km=100)
+    assert sorted(item['id'] for item, _ in within) == np.flatnonzero(distances <= 100).tolist()
+
+    # The brute-force fallback answers the same
+    brute = PointIndex([{'id': i} for i in range(500)], lats, lngs)
+    brute._tree = None
+    for fast, slow in ((nearest, brute.nearest(-1.0, 37.0, k=5)),
+                       (within, brute.within(-1.0, 37.0, radius_km=100))):
+        assert [item for item, _ in slow] == [item for item, _ in fast]
+        assert [d for _, d in slow] == pytest.approx([d for _, d in fast])
+
+    with app.app_context():
+        assert len(map_service.camera_index()) == 0
+        db.session.add(Camera(camera_id='CAM_1', name='Gate', latitude=-3.4, longitude=38.5))
+        db.session.commit()
+        (camera, distance), = map_service.camera_index().nearest(-3.41, 38.5)
+    assert camera['camera_id'] == 'CAM_1' and distance == pytest.approx(1.112, abs=0.001)
+
+
+def test_str_tree_matches_brute_force():
+    import random
+    from app.services.geofence_service import STRTree, point_in_polygon
+
+    rng = random.Random(3)
+    boxes = []
+    for i in range(300):
+        lat, lng = rng.uniform(-5, 5), rng.uniform(33, 43)
+        boxes.append(((lat, lng, lat + rng.uniform(0.01, 0.5), lng + rng.uniform(0.01, 0.5)), i))
+    tree = STRTree(boxes)
+    for _ in range(200):
+        lat, lng = rng.uniform(-5, 5.5), rng.uniform(33, 43.5)
+        expected = {i for (a, b, c, d), i in boxes if a <= lat <= c and b <= lng <= d}
+        assert set(tree.query_point(lat, lng)) == expected
+
+    square = [(0, 0), (0, 2), (2, 2), (2, 0)]
+    assert point_in_polygon(1, 1, square) and not point_in_polygon(3, 1, square)
+    # Concave: the notch of a U shape is outside
+    u_shape = [(0, 0), (0, 3), (3, 3), (3, 2), (1, 2), (1, 1), (3, 1), (3, 0)]
+    assert point_in_polygon(0.5, 1.5, u_shape) and not point_in_polygon(2, 1.5, u_shape)
+
+
+def test_outbox_retries_only_failed_recipients(app, monkeypatch):
+    from app.models import Alert, OutboxMessage, Subscriber
+    from app.services import notification_services
+    from app.services.outbox_service import NotificationDispatcher
+
+    attempts = []
+    failing = {'+254700000002'}
+    monkeypatch.setattr(notification_services, 'send_sms',
+                        lambda message, to: attempts.append(to) or to not in failing)
+
+    dispatcher = NotificationDispatcher(max_attempts=2, retry_base=0)
+    dispatcher.init_app(app)
+    with app.app_context():
+        db.session.add_all([Subscriber(name='A', phone='+254700000001'),
+                            Subscriber(name='B', phone='+254700000002')])
+        detection = Detection(species='elephant', confidence=0.9, latitude=-3.39, longitude=38.55)
+        db.session.add(detection)
+        db.session.flush()
+        message = OutboxMessage(detection_id=detection.id, idempotency_key=f'detection:{detection.id}')
+        db.session.add(message)
+        db.session.commit()
+
+        assert dispatcher.deliver(message.id) == 'pending'
+        assert sorted(attempts) == ['+254700000001', '+254700000002']
+
+        # The retry skips the subscriber already reached
+        failing.clear()
+        attempts.clear()
+        assert dispatcher.deliver(message.id) == 'sent'
+        assert attempts == ['+254700000002']
+
+        alerts = Alert.query.filter_by(detection_id=detection.id).order_by(Alert.subscriber_id).all()
+        assert [(a.status, a.attempts, a.channel) for a in alerts] == [('sent', 1, 'sms'), ('sent', 2, 'sms')]
+        assert db.session.get(OutboxMessage, message.id).attempts == 2
+
+
+def test_fan_out_sends_concurrently(monkeypatch):
+    from app.services import notification_services
+
+    def slow_sms(message, to):
+        time.sleep(0.2)
+        return to != 'bad'
+
+    monkeypatch.setattr(notification_services, 'send_sms', slow_sms)
+    recipients = [{'id': i, 'phone': 'bad' if i == 7 else f'+2547000000{i:02d}', 'email': None}
+                  for i in range(20)]
+
+    started = time.perf_counter()
+    results = list(notification_services.fan_out(recipients, {'sms': 'Elephant'}))
+    assert time.perf_counter() - started < 1.0
+    assert sorted(r['id'] for r, _ in results) == list(range(20))
+    assert [r['id'] for r, outcome in results if not outcome['success']] == [7]
+
+
+def test_africastalking_bulk_sends_batches(app, monkeypatch):
+    from app.models import Alert, OutboxMessage, Subscriber
+    from app.services import notification_services, sms_service
+    from app.services.outbox_service import NotificationDispatcher
+
+    requests_made = []
+
+    class FakeResponse:
+        def __init__(self, numbers):
+            self.numbers = numbers
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'SMSMessageData': {'Recipients': [
+                {'number': '+254' + number[-9:], 'statusCode': 403 if number.endswith('13') else 101,
+                 'status': 'InvalidPhoneNumber' if number.endswith('13') else 'Success',
+                 'messageId': 'None' if number.endswith('13') else f'ATXid_{number[-2:]}'}
+                for number in self.numbers]}}
+
+    class FakeSession:
+        def post(self, url, headers, data, timeout):
+            requests_made.append(data['to'].split(','))
+            return FakeResponse(data['to'].split(','))
+
+    app.config.update(AFRICASTALKING_API_KEY='key', AFRICASTALKING_USERNAME='sandbox')
+    monkeypatch.setattr(sms_service, 'http_session', lambda: FakeSession())
+    monkeypatch.setattr(notification_services, 'SMS_BATCH_SIZE', 10)
+
+    dispatcher = NotificationDispatcher(max_attempts=1)
+    dispatcher.init_app(app)
+    with app.app_context():
+        db.session.add_all([Subscriber(name=f'Ranger {i}', phone=f'07000000{i:02d}') for i in range(25)])
+        detection = Detection(species='elephant', confidence=0.9, latitude=-3.39, longitude=38.55)
+        db.session.add(detection)
+        db.session.flush()
+        message = OutboxMessage(detection_id=detection.id, idempotency_key=f'detection:{detection.id}')
+        db.session.add(message)
+        db.session.commit()
+
+        assert dispatcher.deliver(message.id) == 'failed'
+        assert sorted(len(batch) for batch in requests_made) == [5, 10, 10]
+
+        alerts = {a.recipients: a for a in Alert.query.filter_by(detection_id=detection.id).all()}
+        assert len(alerts) == 25
+        assert alerts['0700000001'].provider == 'africastalking'
+        assert (alerts['0700000001'].status, alerts['0700000001'].provider_message_id) == ('sent', 'ATXid_01')
+        assert (alerts['0700000013'].status, alerts['0700000013'].provider_status) == ('failed', 'InvalidPhoneNumber')
+
+
+def test_circuit_breaker_opens_probes_and_falls_back(app, monkeypatch):
+    from app.services import circuit_breaker, notification_services
+    from app.services.circuit_breaker import CircuitBreaker
+
+    breakers = {name: CircuitBreaker(name, min_calls=4, window=10, open_seconds=0.2)
+                for name in ('twilio', 'africastalking')}
+    monkeypatch.setattr(circuit_breaker, '_breakers', breakers)
+    calls = []
+    healthy = {'ok': False}
+    monkeypatch.setattr(notification_services, 'send_sms', lambda message, to: calls.append(to) or healthy['ok'])
+    recipients = [{'id': i, 'phone': f'+2547000000{i:02d}', 'email': None} for i in range(6)]
+
+    def send():
+        return [outcome for _, outcome in notification_services.fan_out(recipients, {'sms': 'Lion'})]
+
+    # Four failures open the circuit; the remaining sends fail fast without a request
+    outcomes = send()
+    assert breakers['twilio'].state == 'open'
+    assert len(calls) == 4
+    assert sorted(o['status'] for o in outcomes if o['status']) == ['CircuitOpen', 'CircuitOpen']
+
+    # After open_seconds a single probe goes through and closes the circuit
+    time.sleep(0.25)
+    healthy['ok'] = True
+    calls.clear()
+    outcomes = send()
+    assert breakers['twilio'].state == 'closed'
+    assert 1 <= len(calls) <= 6 and any(o['success'] for o in outcomes)
+
+    # With Africa's Talking's circuit open, SMS falls back to a configured Twilio
+    app.config.update(AFRICASTALKING_API_KEY='key', AFRICASTALKING_USERNAME='sandbox')
+    monkeypatch.setattr(notification_services, 'twilio_client', lambda: object())
+    for _ in range(4):
+        breakers['africastalking'].record(False, 1.0)
+    calls.clear()
+    with app.app_context():
+        outcomes = send()
+    assert len(calls) == 6
+    assert {o['provider'] for o in outcomes} == {'twilio'}
+    assert circuit_breaker.metrics()['africastalking']['state'] == 'open'
+
+
+def test_subscriber_index_follows_version_stamp(app, monkeypatch):
+    from sqlalchemy import text
+    from app.models import Subscriber
+    from app.services import notification_services
+    from app.services.notification_services import subscriber_index, subscriber_index_metrics
+    with app.app_context():
+        db.session.add(Subscriber(name='Anywhere', phone='+254700000001'))
+        db.session.commit()
+        index = subscriber_index()
+        assert index.version == 1 and [c['name'] for c in index.recipients(-3.4, 38.5)] == ['Anywhere']
+        with pytest.raises(TypeError):
+            index.everywhere[0]['phone'] = '+254799999999'
+
+        # Unchanged stamp: the snapshot is reused without reloading subscribers
+        monkeypatch.setattr(notification_services, 'SUBSCRIBER_VERSION_CHECK', 0.0)
+        rebuilds = subscriber_index_metrics()['rebuilds']
+        assert subscriber_index() is index
+        assert subscriber_index_metrics()['rebuilds'] == rebuilds
+
+        # Another process adds a subscriber and bumps the stamp
+        db.session.execute(text("INSERT INTO subscriber (name, phone, is_active) VALUES ('Voi', '+254700000002', 1)"))
+        db.session.execute(text("UPDATE registry_versions SET version = version + 1 WHERE name = 'subscribers'"))
+        db.session.commit()
+        index = subscriber_index()
+        assert index.version == 2 and sorted(c['name'] for c in index.recipients(-3.4, 38.5)) == ['Anywhere', 'Voi']
+        assert subscriber_index_metrics()['subscribers'] == 2
+
+
+def test_geofence_tree_follows_version_stamp(app, monkeypatch):
+    from sqlalchemy import text
+    from app.models import Geofence
+    from app.services import geofence_service as geofence_module
+    from app.services.geofence_service import geofence_service
+    square = [[-3.5, 38.4], [-3.5, 38.6], [-3.3, 38.6], [-3.3, 38.4]]
+    with app.app_context():
+        fence = Geofence(name='Mwatate')
+        fence.set_vertices(square)
+        db.session.add(fence)
+        db.session.commit()
+        assert [f.name for f in geofence_service.find(-3.4, 38.5)] == ['Mwatate']
+        tree = geofence_service.tree()
+
+        # Unchanged stamp: the tree is kept
+        monkeypatch.setattr(geofence_module, 'GEOFENCE_VERSION_CHECK', 0.0)
+        assert geofence_service.tree() is tree
+
+        # Another process deactivates the fence and bumps the stamp
+        db.session.execute(text("UPDATE geofences SET is_active = 0"))
+        db.session.execute(text("UPDATE registry_versions SET version = version + 1 WHERE name = 'geofences'"))
+        db.session.commit()
+        assert geofence_service.find(-3.4, 38.5) == []
+
+
+def test_digest_counts_every_fold_in_one_transaction(app):
+    from app.models import OutboxMessage
+    from app.services import outbox_service
+    with app.app_context():
+        detections = [Detection(species='elephant', confidence=0.9, camera_id='cam_001',
+                                latitude=-3.42, longitude=38.56) for _ in range(6)]
+        db.session.add_all(detections)
+        db.session.flush()
+        messages = outbox_service.enqueue(detections)
+        db.session.commit()
+
+        assert [m.kind for m in messages] == ['detection'] + ['digest'] * 5
+        digest = db.session.get(OutboxMessage, messages[-1].id)
+        assert digest.digest_count == 5 and digest.detection_id == detections[-1].id
+
+
+def test_cooldown_windows_are_shared_between_processes(app):
+    from app.models import AlertCooldown, OutboxMessage
+    from app.services.cooldown_service import ALERT, COOLDOWN, CooldownEngine
+    # Two engines stand in for two web workers with their own memory
+    first, second = CooldownEngine(600), CooldownEngine(600)
+    with app.app_context():
+        def route(engine):
+            detection = Detection(species='elephant', confidence=0.9, camera_id='cam_001',
+                                  latitude=-3.42, longitude=38.56)
+            db.session.add(detection)
+            db.session.flush()
+            outcome, message = engine.route(detection, db.session)
+            db.session.commit()
+            return outcome, message.id
+
+        assert route(first)[0] == ALERT
+        outcome, digest_id = route(second)
+        assert outcome == COOLDOWN
+        assert route(first) == (COOLDOWN, digest_id)
+        assert route(second) == (COOLDOWN, digest_id)
+
+        assert db.session.get(OutboxMessage, digest_id).digest_count == 3
+        assert AlertCooldown.query.one().digest_id == digest_id
+        assert OutboxMessage.query.filter_by(kind='detection').count() == 1